@@ -0,0 +1,115 @@
+import asyncio
+import logging
+import os
+from typing import Optional
+
+import speech_recognition as sr
+
+logger = logging.getLogger(__name__)
+
+# Розпізнавачу потрібен 16-бітний моно PCM
+SAMPLE_WIDTH = 2
+
+class AudioDecodeError(Exception):
+    """Помилка декодування аудіо через ffmpeg"""
+
+class AudioDecoder:
+    """
+    Декодування медіафайлів у сирий 16-бітний моно PCM в пам'яті.
+
+    Один виклик ffmpeg читає байти зі stdin і віддає PCM у stdout,
+    без тимчасових файлів і проміжного WAV. Відео з індексом у кінці
+    файлу (mp4) не читається з каналу, тому для нього є decode_file.
+    Відеопотоки відкидаються ще демультиплексором і не декодуються.
+    Для великих файлів decode_to_file пише PCM одразу на диск, повз
+    пам'ять процесу.
+    """
+
+    def __init__(self, sample_rate: int = 16000, ffmpeg_path: str = 'ffmpeg',
+                 timeout: float = 120.0):
+        self.sample_rate = sample_rate
+        self.ffmpeg_path = ffmpeg_path
+        self.timeout = timeout
+
+    def _command(self, source: str = 'pipe:0', max_seconds: Optional[float] = None,
+                 output: str = 'pipe:1'):
+        command = [
+            self.ffmpeg_path, '-nostdin', '-hide_banner', '-loglevel', 'error', '-y',
+            '-discard:v', 'all',
+            '-i', source,
+            '-vn', '-sn', '-dn'
+        ]
+        if max_seconds:
+            command += ['-t', str(max_seconds)]
+        return command + [
+            '-f', 's16le', '-acodec', 'pcm_s16le',
+            '-ac', '1', '-ar', str(self.sample_rate),
+            output
+        ]
+
+    async def decode(self, data, max_seconds: Optional[float] = None) -> bytes:
+        """
+        Декодування байтів медіафайлу в PCM
+
+        Args:
+            data: Вміст файлу (bytes, bytearray або memoryview)
+            max_seconds: Декодувати не більше стількох секунд аудіо
+
+        Returns:
+            bytes: Сирий PCM s16le, моно, з частотою self.sample_rate
+        """
+        return await self._run(self._command('pipe:0', max_seconds), data)
+
+    async def decode_file(self, path: str, max_seconds: Optional[float] = None) -> bytes:
+        """Декодування файлу на диску (ffmpeg може переходити по ньому)"""
+        return await self._run(self._command(path, max_seconds), None)
+
+    async def decode_to_file(self, source: str, output: str, max_seconds: Optional[float] = None) -> int:
+        """
+        Декодування файлу на диску в файл сирого PCM
+
+        Returns:
+            int: Розмір PCM у байтах
+        """
+        await self._run(self._command(source, max_seconds, output), None, capture=False)
+        size = os.path.getsize(output)
+        if not size:
+            raise AudioDecodeError("ffmpeg не повернув аудіоданих")
+        return size
+
+    async def _run(self, command, data, capture: bool = True) -> bytes:
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdin=asyncio.subprocess.PIPE if data is not None else asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE if capture else asyncio.subprocess.DEVNULL,
+            stderr=asyncio.subprocess.PIPE
+        )
+        try:
+            pcm, stderr = await asyncio.wait_for(process.communicate(data), self.timeout)
+        except asyncio.TimeoutError:
+            raise AudioDecodeError(f"ffmpeg не завершився за {self.timeout} с") from None
+        finally:
+            # Тайм-аут або скасування завдання: ffmpeg не має працювати далі
+            if process.returncode is None:
+                try:
+                    process.kill()
+                except ProcessLookupError:
+                    pass
+                await process.wait()
+
+        if process.returncode != 0:
+            raise AudioDecodeError(stderr.decode('utf-8', errors='replace').strip()
+                                   or f"ffmpeg завершився з кодом {process.returncode}")
+        if capture and not pcm:
+            raise AudioDecodeError("ffmpeg не повернув аудіоданих")
+        return pcm
+
+    async def decode_audio_data(self, data, max_seconds: Optional[float] = None) -> sr.AudioData:
+        """Декодування байтів одразу в sr.AudioData для розпізнавача"""
+        pcm = await self.decode(data, max_seconds)
+        return sr.AudioData(pcm, self.sample_rate, SAMPLE_WIDTH)
+
+    async def decode_file_audio_data(self, path: str, max_seconds: Optional[float] = None) -> sr.AudioData:
+        """Декодування файлу на диску одразу в sr.AudioData"""
+        pcm = await self.decode_file(path, max_seconds)
+        return sr.AudioData(pcm, self.sample_rate, SAMPLE_WIDTH)
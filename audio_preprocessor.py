@@ -0,0 +1,167 @@
+import logging
+from typing import Tuple
+
+import numpy as np
+import speech_recognition as sr
+
+logger = logging.getLogger(__name__)
+
+# Відліків на один прохід: проміжні масиви float32 не залежать від довжини запису
+CHUNK_SAMPLES = 1 << 16
+
+def frame_rms(samples: np.ndarray, frame_len: int) -> np.ndarray:
+    """RMS енергія кадрів по frame_len відліків (у частках повної шкали)"""
+    n_frames = -(-len(samples) // frame_len)
+    energy = np.empty(n_frames, dtype=np.float32)
+    # Шматками по цілому числу кадрів, щоб не копіювати весь запис у float32
+    step = max(1, CHUNK_SAMPLES // frame_len)
+    for first in range(0, n_frames, step):
+        last = min(n_frames, first + step)
+        chunk = samples[first * frame_len:last * frame_len]
+        padded = np.zeros((last - first) * frame_len, dtype=np.float32)
+        padded[:len(chunk)] = chunk
+        padded /= 32768.0
+        frames = padded.reshape(last - first, frame_len)
+        energy[first:last] = np.sqrt(np.mean(frames * frames, axis=1))
+    return energy
+
+def peak_amplitude(samples: np.ndarray) -> float:
+    """
+    Найбільша амплітуда за модулем
+
+    int16 переводиться в int32 шматками по CHUNK_SAMPLES: np.abs(-32768)
+    в int16 переповнюється і дає -32768, тож повна шкала губилась би.
+    """
+    peak = 0.0
+    for first in range(0, len(samples), CHUNK_SAMPLES):
+        chunk = samples[first:first + CHUNK_SAMPLES]
+        if chunk.dtype.kind == 'i':
+            chunk = chunk.astype(np.int32)
+        peak = max(peak, float(np.abs(chunk).max()))
+    return peak
+
+class AudioPreprocessor:
+    """
+    Підготовка PCM до розпізнавання: 16 кГц, без тиші на краях, з
+    нормалізованим піком. Моно PCM дає вже декодер (ffmpeg -ac 1).
+
+    Усі кроки векторизовані в numpy. Менше відліків - менший FLAC, який
+    бекенд відправляє в API, і швидша відповідь.
+    """
+
+    def __init__(self, target_rate: int = 16000, trim_threshold_db: float = -40.0,
+                 trim_padding_ms: int = 200, peak_dbfs: float = -1.0, max_gain_db: float = 20.0,
+                 frame_ms: int = 10):
+        self.target_rate = target_rate
+        self.trim_threshold_db = trim_threshold_db
+        self.trim_padding_ms = trim_padding_ms
+        self.peak_dbfs = peak_dbfs
+        self.max_gain_db = max_gain_db
+        self.frame_ms = frame_ms
+
+    def resample(self, samples: np.ndarray, rate: int) -> np.ndarray:
+        """Передискретизація до target_rate (з НЧ-фільтром при зниженні частоти)"""
+        if rate == self.target_rate or len(samples) == 0:
+            return samples
+        samples = samples.astype(np.float32, copy=False)
+        if rate > self.target_rate:
+            # Віконний sinc-фільтр проти аліасингу
+            cutoff = 0.45 * self.target_rate / rate
+            taps = np.arange(-32, 33, dtype=np.float32)
+            kernel = 2 * cutoff * np.sinc(2 * cutoff * taps) * np.hamming(len(taps)).astype(np.float32)
+            samples = np.convolve(samples, kernel / kernel.sum(), mode='same')
+        n_out = int(round(len(samples) * self.target_rate / rate))
+        positions = np.arange(n_out, dtype=np.float64) * (rate / self.target_rate)
+        return np.interp(positions, np.arange(len(samples)), samples).astype(np.float32)
+
+    def trim(self, samples: np.ndarray, rate: int) -> np.ndarray:
+        """Обрізання тиші на початку і в кінці запису"""
+        start, end = self.trim_bounds(samples, rate)
+        return samples[start:end]
+
+    def trim_bounds(self, samples: np.ndarray, rate: int) -> Tuple[int, int]:
+        """Межі запису без тиші на краях [start, end) у відліках"""
+        frame_len = max(1, rate * self.frame_ms // 1000)
+        energy = frame_rms(samples, frame_len)
+        peak = energy.max() if len(energy) else 0.0
+        if peak <= 0:
+            return 0, 0
+        voiced = np.flatnonzero(energy > peak * 10 ** (self.trim_threshold_db / 20))
+        padding = self.trim_padding_ms // self.frame_ms
+        start = max(0, voiced[0] - padding) * frame_len
+        end = min(len(energy), voiced[-1] + 1 + padding) * frame_len
+        return start, min(end, len(samples))
+
+    def normalize(self, samples: np.ndarray) -> np.ndarray:
+        """Нормалізація піку до peak_dbfs з обмеженням підсилення"""
+        if len(samples) == 0:
+            return samples
+        peak = peak_amplitude(samples)
+        if peak == 0:
+            return samples
+        return samples.astype(np.float32, copy=False) * self._gain(peak)
+
+    def _gain(self, peak: float) -> float:
+        return min(10 ** (self.peak_dbfs / 20) * 32767 / peak, 10 ** (self.max_gain_db / 20))
+
+    def process(self, pcm, sample_rate: int) -> Tuple[bytes, int]:
+        """
+        Повна обробка 16-бітного моно PCM
+
+        Returns:
+            Tuple[bytes, int]: Оброблений моно PCM і його частота
+        """
+        samples = np.frombuffer(pcm, dtype=np.int16)
+        before_bytes = len(samples) * 2
+        before_seconds = len(samples) / sample_rate
+
+        samples = self.resample(samples, sample_rate)
+        samples = self.trim(samples, self.target_rate)
+        samples = self.normalize(samples)
+        result = np.clip(samples, -32768, 32767).astype(np.int16).tobytes()
+
+        after_seconds = len(result) / 2 / self.target_rate
+        if before_bytes:
+            logger.info(
+                f"Попередня обробка: {before_bytes / 1024:.0f} -> {len(result) / 1024:.0f} КБ, "
+                f"{before_seconds:.1f} -> {after_seconds:.1f} с "
+                f"(-{100 * (1 - len(result) / before_bytes):.0f}%)"
+            )
+        return result, self.target_rate
+
+    def process_file(self, path: str, sample_rate: int) -> Tuple[int, int]:
+        """
+        Обробка моно PCM у файлі на місці, шматками по CHUNK_SAMPLES
+
+        Пам'ять не залежить від довжини запису. Файл відкривається тут,
+        тож метод однаково працює в пулі потоків і процесів.
+
+        Returns:
+            Tuple[int, int]: Межі запису без тиші [start, end) у відліках
+        """
+        if sample_rate != self.target_rate:
+            raise ValueError(f"Обробка на диску потребує частоти {self.target_rate} Гц")
+        samples = np.memmap(path, dtype=np.int16, mode='r+')
+        total = len(samples)
+
+        start, end = self.trim_bounds(samples, sample_rate)
+
+        # Нормалізація піку на місці
+        peak = peak_amplitude(samples[start:end])
+        if peak > 0:
+            gain = self._gain(peak)
+            for first in range(start, end, CHUNK_SAMPLES):
+                chunk = samples[first:min(end, first + CHUNK_SAMPLES)]
+                chunk[:] = np.clip(chunk * np.float32(gain), -32768, 32767).astype(np.int16)
+            samples.flush()
+
+        logger.info(
+            f"Попередня обробка на диску: {total * 2 / 1024:.0f} -> {(end - start) * 2 / 1024:.0f} КБ, "
+            f"{total / sample_rate:.1f} -> {(end - start) / sample_rate:.1f} с"
+        )
+        return start, end
+
+    def process_audio_data(self, audio: sr.AudioData) -> sr.AudioData:
+        """Обробка sr.AudioData (16-бітний моно PCM після декодера)"""
+        pcm, rate = self.process(audio.get_raw_data(convert_width=2), audio.sample_rate)
+        return sr.AudioData(pcm, rate, 2)
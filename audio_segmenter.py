@@ -0,0 +1,99 @@
+import logging
+from typing import List, Tuple
+
+import numpy as np
+
+from audio_preprocessor import frame_rms
+
+logger = logging.getLogger(__name__)
+
+class SilenceSegmenter:
+    """
+    Розбиття 16-бітного моно PCM на сегменти обмеженої довжини по паузах.
+
+    Енергія рахується по коротких кадрах, згладжується вікном мінімальної
+    паузи, і кожен розріз ставиться в найтихіше місце між мінімальною та
+    максимальною довжиною сегмента. Сегменти без жодного голосового кадру
+    відкидаються.
+    """
+
+    def __init__(self, max_segment_seconds: float = 30.0, min_segment_seconds: float = 5.0,
+                 frame_ms: int = 20, min_silence_ms: int = 300,
+                 silence_threshold_db: float = -35.0, noise_floor_db: float = -55.0):
+        if min_segment_seconds >= max_segment_seconds:
+            raise ValueError("Мінімальна довжина сегмента має бути меншою за максимальну")
+
+        self.max_segment_seconds = max_segment_seconds
+        self.min_segment_seconds = min_segment_seconds
+        self.frame_ms = frame_ms
+        self.min_silence_ms = min_silence_ms
+        # Поріг тиші відносно гучних кадрів і абсолютний поріг шуму (dBFS)
+        self.silence_threshold_db = silence_threshold_db
+        self.noise_floor_db = noise_floor_db
+
+    def frame_energy(self, samples: np.ndarray, sample_rate: int) -> np.ndarray:
+        """RMS енергія кожного кадру (у частках повної шкали)"""
+        return frame_rms(samples, max(1, sample_rate * self.frame_ms // 1000))
+
+    def split(self, pcm, sample_rate: int) -> List[Tuple[int, int]]:
+        """
+        Пошук меж сегментів
+
+        Args:
+            pcm: Сирий PCM s16le (bytes, memoryview або масив int16)
+            sample_rate: Частота дискретизації
+
+        Returns:
+            List[Tuple[int, int]]: Межі сегментів у відліках [start, end)
+        """
+        samples = pcm if isinstance(pcm, np.ndarray) else np.frombuffer(pcm, dtype=np.int16)
+        total = len(samples)
+        if total == 0:
+            return []
+
+        frame_len = max(1, sample_rate * self.frame_ms // 1000)
+        energy = self.frame_energy(samples, sample_rate)
+
+        # Поріг тиші: відносно гучної частини запису, але не нижче шумової межі
+        loud = np.percentile(energy, 95)
+        threshold = max(loud * 10 ** (self.silence_threshold_db / 20),
+                        10 ** (self.noise_floor_db / 20))
+        voiced = energy > threshold
+
+        # Згладжена енергія: мінімум припадає на середину найглибшої паузи
+        window = max(1, self.min_silence_ms // self.frame_ms)
+        smoothed = np.convolve(energy, np.ones(window, dtype=np.float32) / window, mode='same')
+
+        max_frames = max(1, int(self.max_segment_seconds * 1000 // self.frame_ms))
+        min_frames = max(1, int(self.min_segment_seconds * 1000 // self.frame_ms))
+
+        cuts = [0]
+        n_frames = len(energy)
+        while n_frames - cuts[-1] > max_frames:
+            start = cuts[-1]
+            lo, hi = start + min_frames, start + max_frames
+            cuts.append(lo + int(np.argmin(smoothed[lo:hi])))
+        cuts.append(n_frames)
+
+        segments = []
+        for start, end in zip(cuts[:-1], cuts[1:]):
+            if not voiced[start:end].any():
+                continue
+            segments.append((start * frame_len, min(end * frame_len, total)))
+
+        logger.info(f"Аудіо {total / sample_rate:.1f} с розбито на {len(segments)} сегм.")
+        return segments
+
+    def split_file(self, path: str, start: int, end: int, sample_rate: int) -> List[Tuple[int, int]]:
+        """
+        Пошук меж сегментів у вікні [start, end) файлу PCM на диску
+
+        Файл відображається в пам'ять тут, тож у пул процесів передається
+        лише шлях і межі вікна, а не весь запис.
+
+        Returns:
+            List[Tuple[int, int]]: Межі сегментів у відліках відносно start
+        """
+        if end <= start:
+            return []
+        return self.split(np.memmap(path, dtype=np.int16, mode='r')[start:end], sample_rate)
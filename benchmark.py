@@ -0,0 +1,367 @@
+"""
+Офлайн-бенчмарк конвеєра VoiceBot.
+
+Вимірює час і пікову пам'ять кожного етапу на згенерованих даних:
+розстановку розділових знаків, розбиття аудіо на сегменти, завантаження
+з декодуванням (download_and_convert_audio) і розпізнавання
+(recognize_speech) через локальну заміну Google Speech API.
+
+    python3 benchmark.py                    # запуск і вивід результатів
+    python3 benchmark.py --save-baseline    # зберегти benchmarks/baseline.json
+    python3 benchmark.py --compare          # порівняти з базовою лінією
+    python3 benchmark.py --update-golden    # перегенерувати еталони розділових знаків
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+from unittest import mock
+
+import numpy as np
+
+from fake_speech_server import FakeSpeechServer
+from punctuation_model import NgramCounter, PunctuationModel, build_table, write_model
+from ukrainian_punctuation import IncrementalPunctuator, UkrainianPunctuationProcessor, improve_ukrainian_text
+
+logger = logging.getLogger(__name__)
+
+BENCHMARK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks')
+BASELINE_PATH = os.path.join(BENCHMARK_DIR, 'baseline.json')
+GOLDEN_PATH = os.path.join(BENCHMARK_DIR, 'golden_punctuation.json')
+
+SAMPLE_RATE = 16000
+
+# Словник для генерації транскриптів, схожих на вихід розпізнавача
+VOCABULARY = (
+    'я ти ми ви вони він вона це той така мене тебе нас вас '
+    'думаю знаю хочу можу бачу кажу йду роблю працюю говорю чекаю пишу читаю '
+    'добре погано швидко повільно сьогодні завтра вчора тут там зараз потім '
+    'дім робота місто країна друг мама тато діти школа лекція питання відповідь '
+    'і а але або чи що як коли де чому тому бо якщо щоб хоча тільки '
+    'так ні можливо звичайно наприклад тобто отже до речі на жаль '
+    'вау ура давай зроби напиши закрий відкрий'
+).split()
+
+README_EXAMPLES = (
+    'привіт як справи',
+    'я йду додому',
+    'що ти робиш',
+    'вау це дивовижно',
+    'так я знаю',
+    'я хочу піти додому але маю роботу',
+    'по-перше це неправильно по-друге це несправедливо',
+    'друже як справи',
+    'закрий двері',
+    'так я знаю що ти правий але я не згоден',
+    'привіт як справи я йду додому'
+)
+
+def generate_transcript(n_words: int, seed: int = 0) -> str:
+    """Детермінований транскрипт без розділових знаків, як від розпізнавача"""
+    rng = random.Random(seed)
+    return ' '.join(rng.choice(VOCABULARY) for _ in range(n_words))
+
+def generate_speech_pcm(seconds: float, seed: int = 0, sample_rate: int = SAMPLE_RATE) -> bytes:
+    """Синтетичний 16-бітний моно PCM: тональні "слова" з шумом і паузи між ними"""
+    rng = np.random.default_rng(seed)
+    total = int(seconds * sample_rate)
+    out = np.zeros(total, dtype=np.float32)
+    position = 0
+    while position < total:
+        word = int(rng.uniform(0.2, 0.8) * sample_rate)
+        end = min(total, position + word)
+        t = np.arange(end - position, dtype=np.float32) / sample_rate
+        pitch = rng.uniform(100, 250)
+        envelope = np.sin(np.pi * t / max(t[-1], 1e-3)) if len(t) > 1 else 1.0
+        out[position:end] = envelope * (
+            0.4 * np.sin(2 * np.pi * pitch * t) + 0.2 * np.sin(4 * np.pi * pitch * t)
+        ) + rng.normal(0, 0.02, end - position)
+        position = end + int(rng.uniform(0.05, 0.9) * sample_rate)
+    out += rng.normal(0, 0.002, total).astype(np.float32)
+    return (np.clip(out, -1, 1) * 32000).astype(np.int16).tobytes()
+
+def encode_ogg(pcm: bytes, sample_rate: int = SAMPLE_RATE, ffmpeg_path: str = 'ffmpeg') -> Optional[bytes]:
+    """Кодування PCM в OGG/Opus (як голосові повідомлення Telegram)"""
+    if not shutil.which(ffmpeg_path):
+        return None
+    result = subprocess.run(
+        [ffmpeg_path, '-nostdin', '-hide_banner', '-loglevel', 'error',
+         '-f', 's16le', '-ar', str(sample_rate), '-ac', '1', '-i', 'pipe:0',
+         '-c:a', 'libopus', '-b:a', '32k', '-f', 'ogg', 'pipe:1'],
+        input=pcm, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False
+    )
+    return result.stdout if result.returncode == 0 else None
+
+class _FixtureServer:
+    """Локальний HTTP-сервер, що віддає фікстури замість файлового сервера Telegram"""
+
+    def __init__(self, files: Dict[str, bytes]):
+        files = dict(files)
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = files.get(self.path.lstrip('/'))
+                if body is None:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}/'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+def measure(func: Callable[[], object], repeat: int) -> Dict[str, float]:
+    """Час виконання (секунди на операцію) і пік виділеної пам'яті"""
+    func()  # прогрів
+    timings = []
+    tracemalloc.start()
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {
+        'repeat': repeat,
+        'mean_s': statistics.mean(timings),
+        'p50_s': statistics.median(timings),
+        'p95_s': sorted(timings)[max(0, int(len(timings) * 0.95) - 1)],
+        'peak_alloc_bytes': peak
+    }
+
+def _require(value, stage: str):
+    """Етап без результату - помилка бенчмарку, а не швидкий прогін"""
+    if not value:
+        raise RuntimeError(f"Етап {stage} не повернув результату")
+    return value
+
+def bench_punctuation(results: Dict, quick: bool, workdir: str):
+    # Модель, навчена на еталонних текстах: вимірюється вартість пошуку в таблиці
+    counter = NgramCounter()
+    with open(GOLDEN_PATH, encoding='utf-8') as f:
+        for case in json.load(f):
+            counter.add_text(case['output'])
+    model_path = os.path.join(workdir, 'punctuation.bin')
+    write_model(model_path, build_table(counter.counts, min_count=1), min_count=1)
+    model_processor = UkrainianPunctuationProcessor(model=PunctuationModel(model_path))
+
+    for n_words in (10, 100, 1000) if quick else (10, 100, 1000, 10000):
+        text = generate_transcript(n_words, seed=n_words)
+        repeat = max(3, 2000 // n_words)
+        stats = measure(lambda: improve_ukrainian_text(text), repeat)
+        stats['words_per_s'] = n_words / stats['mean_s']
+        results[f'punctuation/batch/{n_words}w'] = stats
+
+        stats = measure(lambda: model_processor.process_text(text), repeat)
+        stats['words_per_s'] = n_words / stats['mean_s']
+        results[f'punctuation/model/{n_words}w'] = stats
+
+        fragments = [' '.join(text.split()[i:i + 20]) for i in range(0, n_words, 20)]
+
+        def incremental():
+            punctuator = IncrementalPunctuator()
+            for fragment in fragments:
+                punctuator.feed(fragment)
+                punctuator.flush()
+
+        stats = measure(incremental, repeat)
+        stats['words_per_s'] = n_words / stats['mean_s']
+        results[f'punctuation/incremental/{n_words}w'] = stats
+
+def bench_segmentation(results: Dict, transcriber, quick: bool):
+    for seconds in (5, 60) if quick else (5, 60, 600):
+        pcm = generate_speech_pcm(seconds, seed=seconds)
+        split = lambda: _require(transcriber.segmenter.split(pcm, SAMPLE_RATE), f'segmentation/{seconds}s')
+        stats = measure(split, 5)
+        stats['audio_s_per_s'] = seconds / stats['mean_s']
+        stats['segments'] = len(split())
+        results[f'segmentation/{seconds}s'] = stats
+
+def bench_pipeline(results: Dict, transcriber, quick: bool):
+    durations = (5, 60) if quick else (5, 60, 300)
+    fixtures = {}
+    for seconds in durations:
+        ogg = encode_ogg(generate_speech_pcm(seconds, seed=seconds), ffmpeg_path=transcriber.decoder.ffmpeg_path)
+        if ogg is None:
+            logger.warning("ffmpeg недоступний - етапи декодування і розпізнавання пропущено")
+            return
+        fixtures[f'{seconds}s.ogg'] = ogg
+
+    loop = asyncio.new_event_loop()
+    try:
+        with _FixtureServer(fixtures) as server:
+            for seconds in durations:
+                url = server.base_url + f'{seconds}s.ogg'
+                size = len(fixtures[f'{seconds}s.ogg'])
+
+                def download_and_decode():
+                    return _require(loop.run_until_complete(transcriber.download_and_convert_audio(url)),
+                                    f'download_and_convert_audio/{seconds}s')
+
+                def recognize(audio):
+                    return _require(loop.run_until_complete(transcriber.recognize_speech(audio)),
+                                    f'recognize_speech/{seconds}s')
+
+                stats = measure(download_and_decode, 5)
+                stats['input_bytes'] = size
+                stats['audio_s_per_s'] = seconds / stats['mean_s']
+                audio = download_and_decode()
+                stats['output_bytes'] = len(audio.frame_data)
+                results[f'download_and_convert_audio/{seconds}s'] = stats
+
+                stats = measure(lambda: recognize(audio), 3)
+                stats['audio_s_per_s'] = seconds / stats['mean_s']
+                stats['text_chars'] = len(recognize(audio))
+                results[f'recognize_speech/{seconds}s'] = stats
+
+                # Той самий запис через PCM на диску (numpy.memmap)
+                def spool_and_recognize():
+                    buffer = _require(
+                        loop.run_until_complete(transcriber.download_and_convert_audio(url, spool=True)),
+                        f'spooled_pipeline/{seconds}s'
+                    )
+                    try:
+                        return recognize(buffer)
+                    finally:
+                        buffer.close()
+
+                stats = measure(spool_and_recognize, 3)
+                stats['audio_s_per_s'] = seconds / stats['mean_s']
+                stats['text_chars'] = len(spool_and_recognize())
+                results[f'spooled_pipeline/{seconds}s'] = stats
+        loop.run_until_complete(transcriber.downloader.close())
+    finally:
+        loop.close()
+
+def build_transcriber(speech_endpoint: str):
+    """Конвеєр розпізнавання з локальною заміною Google Speech API (оточення процесу не змінюється)"""
+    from transcriber import Transcriber
+
+    with mock.patch.dict(os.environ, {'RECOGNIZER_BACKEND': 'google',
+                                      'GOOGLE_SPEECH_ENDPOINT': speech_endpoint}):
+        return Transcriber.from_env()
+
+def run(quick: bool = False, speech_latency: float = 0.05) -> Dict:
+    results: Dict[str, Dict] = {}
+    with tempfile.TemporaryDirectory() as workdir, \
+            FakeSpeechServer(latency=speech_latency) as speech_server:
+        bench_punctuation(results, quick, workdir)
+        transcriber = build_transcriber(speech_server.endpoint)
+        try:
+            bench_segmentation(results, transcriber, quick)
+            bench_pipeline(results, transcriber, quick)
+        finally:
+            asyncio.run(transcriber.close())
+    return results
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Етапи, що стали повільнішими за базову лінію більше ніж на tolerance"""
+    regressions = []
+    for name, stats in results.items():
+        reference = baseline.get(name)
+        if not reference:
+            continue
+        ratio = stats['mean_s'] / reference['mean_s']
+        if ratio > 1 + tolerance:
+            regressions.append(f"{name}: {reference['mean_s'] * 1000:.2f} мс -> "
+                               f"{stats['mean_s'] * 1000:.2f} мс (x{ratio:.2f})")
+    return regressions
+
+def update_golden():
+    """Перегенерація еталонних результатів розстановки розділових знаків"""
+    inputs = list(README_EXAMPLES)
+    for n_words in (3, 5, 8, 12, 20, 40, 80, 200):
+        for seed in range(5):
+            inputs.append(generate_transcript(n_words, seed=seed))
+    golden = [{'input': text, 'output': improve_ukrainian_text(text)} for text in inputs]
+    os.makedirs(BENCHMARK_DIR, exist_ok=True)
+    with open(GOLDEN_PATH, 'w', encoding='utf-8') as f:
+        json.dump(golden, f, ensure_ascii=False, indent=1)
+    print(f"Збережено {len(golden)} еталонів у {GOLDEN_PATH}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Офлайн-бенчмарк конвеєра VoiceBot")
+    parser.add_argument('--quick', action='store_true', help="Менші розміри вхідних даних")
+    parser.add_argument('--output', help="Зберегти результати у JSON-файл")
+    parser.add_argument('--save-baseline', action='store_true', help="Записати результати як базову лінію")
+    parser.add_argument('--compare', action='store_true', help="Порівняти з базовою лінією")
+    parser.add_argument('--speech-latency', type=float, default=0.05,
+                        help="Затримка локальної заміни Google Speech API, с")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="Допустиме сповільнення (частка)")
+    parser.add_argument('--update-golden', action='store_true', help="Перегенерувати еталони")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    if args.update_golden:
+        update_golden()
+        return 0
+
+    results = run(quick=args.quick, speech_latency=args.speech_latency)
+    report = {
+        'python': sys.version.split()[0],
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results
+    }
+
+    for name, stats in results.items():
+        extra = ', '.join(f"{key}={value:.1f}" for key, value in stats.items()
+                          if key.endswith('_per_s'))
+        print(f"{name:45s} {stats['mean_s'] * 1000:10.2f} мс  "
+              f"пік {stats['peak_alloc_bytes'] / 1024:10.1f} КБ  {extra}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+
+    if args.save_baseline:
+        os.makedirs(BENCHMARK_DIR, exist_ok=True)
+        with open(BASELINE_PATH, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+        print(f"Базову лінію збережено в {BASELINE_PATH}")
+
+    if args.compare:
+        if not os.path.exists(BASELINE_PATH):
+            print("Базова лінія відсутня, запустіть з --save-baseline")
+            return 1
+        with open(BASELINE_PATH, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.tolerance)
+        for line in regressions:
+            print(f"РЕГРЕСІЯ {line}")
+        return 1 if regressions else 0
+
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
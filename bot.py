@@ -1,14 +1,30 @@
+import time
+# Відлік часу запуску - до імпорту решти модулів
+_started = time.perf_counter()
 import os
+import asyncio
+import functools
 import logging
-import tempfile
-import requests
+import signal
+from typing import TYPE_CHECKING, Dict, Optional, Set
 from telegram import Update
-from telegram.ext import Application, MessageHandler, filters, ContextTypes
+from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
 from dotenv import load_dotenv
-import speech_recognition as sr
-from pydub import AudioSegment
-import numpy as np
-from ukrainian_punctuation import improve_ukrainian_text
+from transcript_cache import TranscriptCache
+from delivery import (NOT_RECOGNIZED_TEXT, RESTART_FAILED_TEXT, RESTART_TEXT, RESULT_HEADER,
+                      UNAVAILABLE_TEXT, ChatRateLimiter, ProgressiveMessage)
+from job_queue import Job, JobQueue
+from job_journal import JobJournal
+from chat_sequencer import ChatSequencer
+from scheduler import DurationScheduler, SchedulingRejected
+from metrics import REGISTRY, MetricsServer, track_stage
+
+# Конвеєр розпізнавання (numpy, speech_recognition) імпортується під час прогріву
+if TYPE_CHECKING:
+    from transcriber import Transcriber
+
+# Імпорт модулів бота, без конвеєра розпізнавання
+IMPORT_SECONDS = time.perf_counter() - _started
 
 # Налаштування логування
 logging.basicConfig(
@@ -20,169 +36,476 @@ logger = logging.getLogger(__name__)
 # Завантаження змінних середовища
 load_dotenv()
 
+BUSY_TEXT = "⏳ Бот зараз перевантажений, спробуйте пізніше"
+TOO_LARGE_TEXT = "❌ Файл завеликий для розпізнавання (максимум {limit} МБ)"
+TOO_LONG_TEXT = "❌ Запис задовгий для розпізнавання (максимум {limit} хв)"
+QUOTA_TEXT = "⏳ Забагато файлів в обробці, дочекайтеся результату попередніх"
+
+MESSAGES = REGISTRY.counter(
+    'voicebot_messages_total', 'Оброблені медіаповідомлення за типом і результатом', ['kind', 'outcome']
+)
+
 class VoiceBot:
     def __init__(self):
+        init_started = time.perf_counter()
         self.bot_token = os.getenv('BOT_TOKEN')
         if not self.bot_token:
             raise ValueError("BOT_TOKEN не знайдено в .env файлі")
         
-        self.application = Application.builder().token(self.bot_token).build()
+        # Оновлення обробляються паралельно, порядок відповідей у межах чату зберігає ChatSequencer
+        self.application = (
+            Application.builder()
+            .token(self.bot_token)
+            .base_url(os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org/bot'))
+            .base_file_url(os.getenv('TELEGRAM_FILE_URL', 'https://api.telegram.org/file/bot'))
+            .concurrent_updates(int(os.getenv('CONCURRENT_UPDATES', '64')))
+            .post_init(self._on_startup)
+            .post_shutdown(self._on_shutdown)
+            .build()
+        )
+        self.sequencer = ChatSequencer()
         
-        # Ініціалізація SpeechRecognition
-        logger.info("Ініціалізація SpeechRecognition...")
-        try:
-            self.recognizer = sr.Recognizer()
-            logger.info("SpeechRecognition ініціалізовано")
-        except Exception as e:
-            logger.error(f"Помилка ініціалізації SpeechRecognition: {e}")
-            self.recognizer = None
+        # Обмеження, що перевіряються до завантаження файлу (20 МБ - ліміт getFile у Bot API)
+        self.max_file_size = int(os.getenv('MEDIA_MAX_FILE_SIZE', str(20 * 1024 * 1024)))
+        self.video_max_seconds = float(os.getenv('VIDEO_MAX_SECONDS', '600'))
         
-
+        # Поступова доставка результату з бюджетом редагувань на чат
+        self.rate_limiter = ChatRateLimiter(float(os.getenv('DELIVERY_MIN_INTERVAL', '1.0')))
+        self.max_messages = int(os.getenv('DELIVERY_MAX_MESSAGES', '3'))
+        
+        # Спочатку короткі записи (зі старінням), завдання понад м'яку квоту чату чи користувача -
+        # пізніше, понад жорстку - відмова, бюджет секунд аудіо
+        aging_rate = float(os.getenv('SCHEDULER_AGING_RATE', '1.0'))
+        self.scheduler = DurationScheduler(
+            aging_rate=aging_rate,
+            max_queued_seconds=float(os.getenv('SCHEDULER_MAX_QUEUED_SECONDS', '3600')),
+            max_jobs_per_chat=int(os.getenv('SCHEDULER_MAX_JOBS_PER_CHAT', '5')),
+            max_jobs_per_user=int(os.getenv('SCHEDULER_MAX_JOBS_PER_USER', '3')),
+            hard_jobs_per_chat=int(os.getenv('SCHEDULER_HARD_JOBS_PER_CHAT', '20')),
+            hard_jobs_per_user=int(os.getenv('SCHEDULER_HARD_JOBS_PER_USER', '10')),
+            overquota_penalty=float(os.getenv('SCHEDULER_OVERQUOTA_PENALTY', '600'))
+        )
+        
+        # Кеш готових транскриптів (пам'ять + SQLite)
+        self.cache = TranscriptCache(
+            db_path=os.getenv('CACHE_DB_PATH', 'transcripts.db'),
+            max_entries=int(os.getenv('CACHE_MAX_ENTRIES', '1000')),
+            ttl=float(os.getenv('CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+        )
+        
+        # TRANSCRIBE_MODE=inline - розпізнавання в процесі бота,
+        # queue - завдання в JobQueue для окремих воркерів (worker.py)
+        self.mode = os.getenv('TRANSCRIBE_MODE', 'inline')
+        self.transcriber: Optional['Transcriber'] = None
+        self.jobs: Optional[JobQueue] = None
+        self.journal: Optional[JobJournal] = None
+        if self.mode == 'inline':
+            # Журнал завдань у роботі: після перезапуску вони продовжуються
+            self.journal = JobJournal(os.getenv('JOURNAL_PATH', 'journal.db'))
+            self.journal_max_resumes = int(os.getenv('JOURNAL_MAX_RESUMES', '2'))
+            self.journal_max_age = float(os.getenv('JOURNAL_MAX_AGE', '3600'))
+        elif self.mode == 'queue':
+            self.jobs = JobQueue(
+                db_path=os.getenv('JOB_QUEUE_PATH', 'jobs.db'),
+                lease_seconds=float(os.getenv('JOB_LEASE_SECONDS', '600')),
+                max_attempts=int(os.getenv('JOB_MAX_ATTEMPTS', '3')),
+                aging_rate=aging_rate
+            )
+            self.max_queued_jobs = int(os.getenv('JOB_QUEUE_MAX_DEPTH', '1000'))
+            # Квиток звільняється після постановки в чергу, тож бюджет і квоти
+            # враховують незавершені завдання черги
+            self.scheduler.backlog = functools.partial(
+                self.jobs.backlog, default_duration=self.scheduler.default_duration
+            )
+        else:
+            raise ValueError(f"Невідомий режим TRANSCRIBE_MODE: {self.mode}")
+        
+        # Користувачі з доступом до службових команд (/profile)
+        self.admin_ids = {int(user_id) for user_id in os.getenv('ADMIN_IDS', '').replace(',', ' ').split()}
+        
+        # Після SIGTERM завдання в роботі отримують стільки секунд на завершення
+        self.shutdown_grace = float(os.getenv('SHUTDOWN_GRACE_SECONDS', '30'))
+        self._in_flight: Set[asyncio.Task] = set()
+        self._stopping: Optional[asyncio.Task] = None
+        
+        # Конвеєр розпізнавання створюється і прогрівається після запуску (WARMUP_MODE):
+        # background - оновлення приймаються одразу, завдання чекають на готовність;
+        # blocking - оновлення беруться лише після прогріву; off - без прогріву
+        self.warmup_mode = os.getenv('WARMUP_MODE', 'background')
+        if self.warmup_mode not in ('background', 'blocking', 'off'):
+            raise ValueError(f"Невідомий режим WARMUP_MODE: {self.warmup_mode}")
+        self.ready = asyncio.Event()
+        self._warmup_task: Optional[asyncio.Task] = None
+        self._warmup_error: Optional[Exception] = None
+        # Тривалість етапів запуску і обробки першого медіаповідомлення, секунди
+        self.startup_seconds: Dict[str, float] = {'import': IMPORT_SECONDS}
+        self.first_message_seconds: Optional[float] = None
+        
+        self.metrics_server: Optional[MetricsServer] = None
+        self._register_gauges()
         
         # Налаштування обробників повідомлень
-        self.application.add_handler(MessageHandler(filters.VOICE, self.handle_voice))
-        self.application.add_handler(MessageHandler(filters.AUDIO, self.handle_audio))
-        self.application.add_handler(MessageHandler(filters.VIDEO, self.handle_video))
-        self.application.add_handler(MessageHandler(filters.VIDEO_NOTE, self.handle_video_note))
-        self.application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.handle_text))
+        self.application.add_handler(MessageHandler(filters.VOICE, self._media_handler(self.handle_voice)))
+        self.application.add_handler(MessageHandler(filters.AUDIO, self._media_handler(self.handle_audio)))
+        self.application.add_handler(MessageHandler(filters.VIDEO, self._media_handler(self.handle_video)))
+        self.application.add_handler(MessageHandler(filters.VIDEO_NOTE, self._media_handler(self.handle_video_note)))
+        self.application.add_handler(CommandHandler('profile', self.handle_profile))
+        self.application.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, self.sequencer.wrap(self.handle_text)))
         
-        logger.info("VoiceBot з SpeechRecognition ініціалізовано")
+        self.startup_seconds['init'] = time.perf_counter() - init_started
+        logger.info(f"VoiceBot ініціалізовано (імпорт {IMPORT_SECONDS:.2f} с, "
+                    f"ініціалізація {self.startup_seconds['init']:.2f} с)")
+    
+    @property
+    def is_ready(self) -> bool:
+        """Конвеєр готовий і бот не зупиняється"""
+        return self.ready.is_set() and not self._stopping
+    
+    def _register_gauges(self):
+        """Поточний стан черг і кешу для /metrics"""
+        REGISTRY.gauge('voicebot_ready', 'Конвеєр розпізнавання готовий, бот не зупиняється',
+                       lambda: int(self.is_ready))
+        REGISTRY.gauge('voicebot_startup_seconds', 'Тривалість етапів запуску',
+                       lambda: {(phase, ): seconds for phase, seconds in self.startup_seconds.items()},
+                       labelnames=('phase', ))
+        REGISTRY.gauge('voicebot_first_message_seconds',
+                       'Обробка першого розпізнаного медіаповідомлення після запуску (0 - ще не було)',
+                       lambda: self.first_message_seconds or 0)
+        if self.jobs:
+            REGISTRY.gauge('voicebot_job_queue_depth', 'Завдання в JobQueue, що чекають на воркера',
+                           self.jobs.depth)
+        REGISTRY.gauge('voicebot_scheduler_jobs', 'Прийняті планувальником завдання',
+                       lambda: self.scheduler.jobs)
+        REGISTRY.gauge('voicebot_scheduler_queued_seconds', 'Секунди аудіо в обробці',
+                       lambda: self.scheduler.queued_seconds)
+        REGISTRY.gauge('voicebot_active_chats', 'Чати з повідомленнями в обробці',
+                       lambda: self.sequencer.active_chats)
+        for name in ('memory_hits', 'disk_hits', 'coalesced', 'misses'):
+            REGISTRY.gauge(f'voicebot_cache_{name}', f'Кеш транскриптів: {name}',
+                           lambda name=name: self.cache.stats()[name])
+    
+    def _register_pipeline_gauges(self):
+        """Стан пулу, бюджету пам'яті і запобіжників - після створення конвеєра"""
+        executor = self.transcriber.executor
+        REGISTRY.gauge('voicebot_recognition_pending', 'Задачі розпізнавання, що зайняли воркера',
+                       lambda: executor.pending)
+        REGISTRY.gauge('voicebot_recognition_queue_depth', 'Задачі, що чекають на воркера',
+                       lambda: executor.queue_depth)
+        budget = self.transcriber.memory_budget
+        REGISTRY.gauge('voicebot_memory_budget_used_bytes', "Пам'ять, зарезервована завданнями",
+                       lambda: budget.used)
+        REGISTRY.gauge('voicebot_memory_budget_waiting', "Завдання, що чекають на пам'ять",
+                       lambda: budget.waiting)
+        resilient = self.transcriber.resilient
+        if resilient:
+            REGISTRY.gauge('voicebot_circuit_state',
+                           'Стан запобіжника бекенда: 0 - замкнено, 1 - пробний виклик, 2 - розімкнено',
+                           resilient.circuit_states, labelnames=('backend',))
+    
+    def _media_handler(self, callback):
+        """
+        Планувальник приймає завдання до черги чату, далі - по черзі в межах
+        чату в окремій задачі (обробник PTB одразу звільняється)
+        """
+        return self.scheduler.wrap(self.sequencer.wrap(callback), self._media_duration, self._reject_media)
+    
+    def _media_duration(self, update: Update) -> Optional[float]:
+        """Тривалість, яку реально буде розпізнано (відео обрізається до VIDEO_MAX_SECONDS)"""
+        message = update.effective_message
+        if message.video or message.video_note:
+            media = message.video or message.video_note
+            if media.duration and self.video_max_seconds:
+                return min(media.duration, self.video_max_seconds)
+            return media.duration
+        media = message.voice or message.audio
+        return media.duration if media else None
+    
+    async def _reject_media(self, update: Update, error: SchedulingRejected):
+        """Відповідь на завдання, яке не прийняв планувальник"""
+        message = update.effective_message
+        media = message.voice or message.audio or message.video or message.video_note
+        MESSAGES.inc(kind=type(media).__name__.lower(), outcome=error.reason)
+        if error.reason == 'too_long':
+            text = TOO_LONG_TEXT.format(limit=int(self.scheduler.max_queued_seconds // 60))
+        elif error.reason == 'budget':
+            text = BUSY_TEXT
+        else:
+            text = QUOTA_TEXT
+        await message.reply_text(text)
     
     async def handle_voice(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обробка голосових повідомлень"""
-        try:
-            if not self.recognizer:
-                await update.message.reply_text("❌ Розпізнавач не ініціалізований")
-                return
-            
-            # Отримання файлу
-            voice_file = await context.bot.get_file(update.message.voice.file_id)
-            
-            # Відправляємо повідомлення про обробку
-            user_name = update.message.from_user.first_name or "Користувач"
-            processing_msg = await update.message.reply_text(f"🎵 Обробляю голосове повідомлення від {user_name}...")
-            
-            # Завантаження та конвертація
-            audio_file_path = await self.download_and_convert_audio(voice_file.file_path)
-            
-            if audio_file_path:
-                try:
-                    # Розпізнавання мови
-                    text = await self.recognize_speech(audio_file_path)
-                    if text:
-                        # Редагуємо повідомлення з результатом
-                        await processing_msg.edit_text(f"📝 **Розпізнаний текст від {user_name}:**\n\n{text}")
-                    else:
-                        await processing_msg.edit_text("❌ Не вдалося розпізнати мову")
-                finally:
-                    # Видалення тимчасового WAV файлу
-                    if os.path.exists(audio_file_path):
-                        os.unlink(audio_file_path)
-            else:
-                await processing_msg.edit_text("❌ Помилка обробки аудіо")
-                
-        except Exception as e:
-            logger.error(f"Помилка обробки голосового повідомлення: {e}")
-            await update.message.reply_text("❌ Помилка обробки голосового повідомлення")
+        await self._process_media(
+            update, context, update.message.voice,
+            processing_text="🎵 Обробляю голосове повідомлення від {user_name}...",
+            convert_error_text="Помилка обробки аудіо",
+            error_text="Помилка обробки голосового повідомлення"
+        )
     
     async def handle_audio(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обробка аудіо файлів"""
+        await self._process_media(
+            update, context, update.message.audio,
+            processing_text="🎵 Обробляю аудіо файл від {user_name}...",
+            convert_error_text="Помилка обробки аудіо",
+            error_text="Помилка обробки аудіо файлу"
+        )
+    
+    async def handle_video(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обробка відео файлів (тільки аудіо)"""
+        await self._process_media(
+            update, context, update.message.video,
+            processing_text="🎬 Обробляю аудіо з відео від {user_name}...",
+            convert_error_text="Помилка обробки аудіо з відео",
+            error_text="Помилка обробки відео",
+            video=True
+        )
+    
+    async def handle_video_note(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Обробка відео повідомлень (кружечки)"""
+        await self._process_media(
+            update, context, update.message.video_note,
+            processing_text="🎬 Обробляю відео повідомлення від {user_name}...",
+            convert_error_text="Помилка обробки аудіо з відео повідомлення",
+            error_text="Помилка обробки відео повідомлення",
+            video=True
+        )
+    
+    async def _process_media(self, update: Update, context: ContextTypes.DEFAULT_TYPE, media,
+                             processing_text: str, convert_error_text: str, error_text: str,
+                             video: bool = False):
+        """Спільний конвеєр для всіх типів медіа: завантаження, декодування, розпізнавання"""
+        kind = type(media).__name__.lower()
+        started, warm = time.perf_counter(), self.ready.is_set()
         try:
-            if not self.recognizer:
+            if self.transcriber and not self.transcriber.recognizer:
                 await update.message.reply_text("❌ Розпізнавач не ініціалізований")
                 return
             
-            audio_file = await context.bot.get_file(update.message.audio.file_id)
-            
-            # Відправляємо повідомлення про обробку
             user_name = update.message.from_user.first_name or "Користувач"
-            processing_msg = await update.message.reply_text(f"🎵 Обробляю аудіо файл від {user_name}...")
             
-            audio_file_path = await self.download_and_convert_audio(audio_file.file_path)
+            # Той самий файл уже розпізнавали - відповідаємо з кешу
+            cached_text = self.cache.get(media.file_unique_id)
+            if cached_text:
+                logger.info(f"Транскрипт знайдено в кеші: {self.cache.stats()}")
+                MESSAGES.inc(kind=kind, outcome='cache_hit')
+                reply = ProgressiveMessage(
+                    context.bot, update.message.chat_id, None, self.rate_limiter,
+                    header=RESULT_HEADER.format(user_name=user_name),
+                    max_messages=self.max_messages, reply_to=update.message.message_id
+                )
+                await reply.finish(cached_text)
+                return
             
-            if audio_file_path:
-                try:
-                    text = await self.recognize_speech(audio_file_path)
-                    if text:
-                        await processing_msg.edit_text(f"📝 **Розпізнаний текст від {user_name}:**\n\n{text}")
-                    else:
-                        await processing_msg.edit_text("❌ Не вдалося розпізнати мову")
-                finally:
-                    # Видалення тимчасового WAV файлу
-                    if os.path.exists(audio_file_path):
-                        os.unlink(audio_file_path)
-            else:
-                await processing_msg.edit_text("❌ Помилка обробки аудіо")
-                
-        except Exception as e:
-            logger.error(f"Помилка обробки аудіо файлу: {e}")
-            await update.message.reply_text("❌ Помилка обробки аудіо файлу")
-    
-    async def handle_video(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Обробка відео файлів (тільки аудіо)"""
-        try:
-            if not self.recognizer:
-                await update.message.reply_text("❌ Розпізнавач не ініціалізований")
+            # Завеликі файли відхиляємо за метаданими, не завантажуючи
+            if media.file_size and media.file_size > self.max_file_size:
+                logger.warning(f"Файл {media.file_size} байт перевищує ліміт {self.max_file_size}")
+                MESSAGES.inc(kind=kind, outcome='too_large')
+                await update.message.reply_text(
+                    TOO_LARGE_TEXT.format(limit=self.max_file_size // (1024 * 1024))
+                )
                 return
             
-            video_file = await context.bot.get_file(update.message.video.file_id)
+            # Не завантажуємо файл, якщо розпізнавання вже переповнене
+            if self._is_busy(media):
+                MESSAGES.inc(kind=kind, outcome='busy')
+                await update.message.reply_text(BUSY_TEXT)
+                return
             
             # Відправляємо повідомлення про обробку
-            user_name = update.message.from_user.first_name or "Користувач"
-            processing_msg = await update.message.reply_text(f"🎬 Обробляю аудіо з відео від {user_name}...")
+            processing_text = processing_text.format(user_name=user_name)
+            if video and self.video_max_seconds and (media.duration or 0) > self.video_max_seconds:
+                # Довге відео розпізнається лише до межі, решта не декодується
+                processing_text += f"\n⚠️ Розпізнаю лише перші {self.video_max_seconds:.0f} с з {media.duration} с"
+            processing_msg = await update.message.reply_text(processing_text)
+            # Заглушка вже стоїть у порядку повідомлень чату - наступні повідомлення
+            # чату не чекають на розпізнавання цього
+            self.sequencer.end_turn()
             
-            audio_file_path = await self.download_and_convert_audio(video_file.file_path)
+            ticket = self.scheduler.current()
+            payload = {
+                'kind': kind,
+                'file_id': media.file_id,
+                'file_unique_id': media.file_unique_id,
+                'chat_id': processing_msg.chat_id,
+                'message_id': processing_msg.message_id,
+                'user_id': update.message.from_user.id,
+                'user_name': user_name,
+                'convert_error_text': convert_error_text,
+                'error_text': error_text,
+                'video': video,
+                'duration': self._media_duration(update),
+                'accepted_at': time.time()
+            }
             
-            if audio_file_path:
-                try:
-                    text = await self.recognize_speech(audio_file_path)
-                    if text:
-                        await processing_msg.edit_text(f"📝 **Розпізнаний текст від {user_name}:**\n\n{text}")
-                    else:
-                        await processing_msg.edit_text("❌ Не вдалося розпізнати мову")
-                finally:
-                    # Видалення тимчасового WAV файлу
-                    if os.path.exists(audio_file_path):
-                        os.unlink(audio_file_path)
-            else:
-                await processing_msg.edit_text("❌ Помилка обробки аудіо з відео")
+            # Режим черги: заглушку відредагує воркер
+            if self.jobs:
+                # Штраф за квоту переноситься в пріоритет черги
+                job_id = self.jobs.enqueue(payload, duration=ticket.duration + ticket.penalty if ticket else 0.0)
+                logger.info(f"Завдання {job_id} додано в чергу")
+                MESSAGES.inc(kind=kind, outcome='queued')
+                if self.first_message_seconds is None:
+                    self._record_first_message(started, warm)
+                return
+            
+            entry_id = self.journal.record(payload)
+            if self._stopping:
+                # Бот уже зупиняється: завдання продовжиться після перезапуску
+                await processing_msg.edit_text(RESTART_TEXT)
+                return
+            # Окреме завдання: під час зупинки скасовується воно, а не обробник PTB
+            job = asyncio.ensure_future(
+                self._run_job(context.bot, entry_id, payload, ticket.priority if ticket else 0.0)
+            )
+            await asyncio.wait({job})
+            if not job.cancelled() and job.result() and self.first_message_seconds is None:
+                self._record_first_message(started, warm)
                 
         except Exception as e:
-            logger.error(f"Помилка обробки відео: {e}")
-            await update.message.reply_text("❌ Помилка обробки відео")
+            MESSAGES.inc(kind=kind, outcome='error')
+            logger.error(f"{error_text}: {e}")
+            await update.message.reply_text(f"❌ {error_text}")
     
-    async def handle_video_note(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Обробка відео повідомлень (кружечки)"""
+    def _record_first_message(self, started: float, warm: bool):
+        """
+        Затримка першого розпізнаного медіаповідомлення (у режимі черги - до
+        постановки в чергу). Відповіді з кешу, відмови і помилки не рахуються.
+        """
+        self.first_message_seconds = time.perf_counter() - started
+        logger.info(f"Перше повідомлення оброблено за {self.first_message_seconds:.2f} с "
+                    f"({time.perf_counter() - _started:.1f} с від запуску, "
+                    f"конвеєр {'був готовий' if warm else 'ще прогрівався'})")
+    
+    async def _run_job(self, bot, entry_id: int, payload: dict, priority: float) -> bool:
+        """
+        Розпізнавання завдання з журналу і результат у його заглушці
+
+        Повертає True, якщо розпізнавання завершилось (з текстом або без),
+        і False, якщо файл не декодувався або бекенди недоступні.
+
+        Запис журналу видаляється після остаточної відповіді. Якщо завдання
+        скасовано під час зупинки бота, запис лишається, а заглушка
+        повідомляє про перезапуск.
+        """
+        kind = payload['kind']
+        task = asyncio.current_task()
+        self._in_flight.add(task)
+        finished = True
+        # Проміжний текст з'являється в заглушці в міру розпізнавання сегментів
+        delivery = ProgressiveMessage(
+            bot, payload['chat_id'], payload['message_id'], self.rate_limiter,
+            header=RESULT_HEADER.format(user_name=payload['user_name']), max_messages=self.max_messages
+        )
         try:
-            if not self.recognizer:
-                await update.message.reply_text("❌ Розпізнавач не ініціалізований")
-                return
-            
-            video_note_file = await context.bot.get_file(update.message.video_note.file_id)
-            
-            # Відправляємо повідомлення про обробку
-            user_name = update.message.from_user.first_name or "Користувач"
-            processing_msg = await update.message.reply_text(f"🎬 Обробляю відео повідомлення від {user_name}...")
+            # Під час прогріву завдання чекає на готовий конвеєр
+            await self.ready.wait()
+            if not self.transcriber or not self.transcriber.recognizer:
+                raise RuntimeError("Розпізнавач не ініціалізований")
+            from transcriber import MediaConversionError, RecognitionUnavailableError
+            try:
+                # Однакові файли, що обробляються одночасно, розпізнаються один раз
+                text = await self.cache.get_or_compute(
+                    payload['file_unique_id'],
+                    lambda: self.transcriber.transcribe(bot, payload['file_id'], video=payload['video'],
+                                                        on_progress=delivery.update, priority=priority,
+                                                        duration=payload['duration'])
+                )
+            except MediaConversionError:
+                MESSAGES.inc(kind=kind, outcome='conversion_error')
+                with track_stage('edit_text'):
+                    await delivery.show(f"❌ {payload['convert_error_text']}")
+                return False
+            except RecognitionUnavailableError:
+                # Бекенди не відповіли попри повтори - не кешується, можна надіслати ще раз
+                MESSAGES.inc(kind=kind, outcome='unavailable')
+                with track_stage('edit_text'):
+                    await delivery.show(UNAVAILABLE_TEXT)
+                return False
             
-            audio_file_path = await self.download_and_convert_audio(video_note_file.file_path)
-            
-            if audio_file_path:
-                try:
-                    text = await self.recognize_speech(audio_file_path)
-                    if text:
-                        await processing_msg.edit_text(f"📝 **Розпізнаний текст від {user_name}:**\n\n{text}")
-                    else:
-                        await processing_msg.edit_text("❌ Не вдалося розпізнати мову")
-                finally:
-                    # Видалення тимчасового WAV файлу
-                    if os.path.exists(audio_file_path):
-                        os.unlink(audio_file_path)
-            else:
-                await processing_msg.edit_text("❌ Помилка обробки аудіо з відео повідомлення")
-                
+            MESSAGES.inc(kind=kind, outcome='ok' if text else 'not_recognized')
+            with track_stage('edit_text'):
+                if text:
+                    # Редагуємо повідомлення з результатом (довгий - кількома частинами)
+                    await delivery.finish(text)
+                else:
+                    await delivery.show(NOT_RECOGNIZED_TEXT)
+            return True
+        except asyncio.CancelledError:
+            delivery.cancel()
+            finished = False
+            logger.warning(f"Завдання {entry_id} перервано зупинкою бота, продовжиться після перезапуску")
+            try:
+                await bot.edit_message_text(RESTART_TEXT, chat_id=payload['chat_id'],
+                                            message_id=payload['message_id'])
+            except Exception as e:
+                logger.error(f"Не вдалося оновити заглушку завдання {entry_id}: {e}")
+            raise
+        except Exception:
+            delivery.cancel()
+            raise
+        finally:
+            self._in_flight.discard(task)
+            if finished:
+                self.journal.finish(entry_id)
+    
+    async def _resume_job(self, bot, entry: Job):
+        """Продовження завдання, перерваного перезапуском бота"""
+        payload = entry.payload
+        chat_id, message_id = payload['chat_id'], payload['message_id']
+        age = time.time() - payload['accepted_at']
+        if entry.attempts >= self.journal_max_resumes or age > self.journal_max_age:
+            # Завдання вже кілька разів переривалось або користувач давно не чекає
+            logger.warning(f"Завдання {entry.id} не продовжується (спроба {entry.attempts + 1}, {age:.0f} с)")
+            MESSAGES.inc(kind=payload['kind'], outcome='restart_failed')
+            try:
+                await bot.edit_message_text(RESTART_FAILED_TEXT, chat_id=chat_id, message_id=message_id)
+            except Exception as e:
+                logger.error(f"Не вдалося оновити заглушку завдання {entry.id}: {e}")
+            self.journal.finish(entry.id)
+            return
+        
+        self.journal.resumed(entry.id)
+        logger.info(f"Продовжую завдання {entry.id} після перезапуску")
+        try:
+            ticket = self.scheduler.admit(chat_id, payload['user_id'], payload['duration'])
+        except SchedulingRejected as e:
+            logger.warning(f"Завдання {entry.id} відхилено планувальником: {e}")
+            MESSAGES.inc(kind=payload['kind'], outcome=e.reason)
+            try:
+                await bot.edit_message_text(BUSY_TEXT, chat_id=chat_id, message_id=message_id)
+            except Exception as edit_error:
+                logger.error(f"Не вдалося оновити заглушку завдання {entry.id}: {edit_error}")
+            self.journal.finish(entry.id)
+            return
+        try:
+            # Заглушка вже надіслана, черга чату не потрібна
+            await self._run_job(bot, entry.id, payload, ticket.priority)
         except Exception as e:
-            logger.error(f"Помилка обробки відео повідомлення: {e}")
-            await update.message.reply_text("❌ Помилка обробки відео повідомлення")
+            MESSAGES.inc(kind=payload['kind'], outcome='error')
+            logger.error(f"{payload['error_text']} (завдання {entry.id}): {e}")
+            try:
+                await bot.edit_message_text(f"❌ {payload['error_text']}", chat_id=chat_id, message_id=message_id)
+            except Exception as edit_error:
+                logger.error(f"Не вдалося повідомити про помилку завдання {entry.id}: {edit_error}")
+        finally:
+            self.scheduler.release(ticket)
+    
+    def _is_busy(self, media) -> bool:
+        """Перевірка заповненості черги завдань або, у режимі inline, черги пулу розпізнавання"""
+        if self.jobs:
+            depth = self.jobs.depth()
+            if depth >= self.max_queued_jobs:
+                logger.warning(f"Черга завдань переповнена ({depth})")
+                return True
+            return False
+        # Під час прогріву конвеєра ще немає - завдання чекає на нього в _run_job
+        if self.transcriber is None:
+            return False
+        executor = self.transcriber.executor
+        if executor.is_full and not self.cache.is_inflight(media.file_unique_id):
+            logger.warning(f"Пул розпізнавання переповнений (черга: {executor.queue_depth})")
+            return True
+        return False
     
     async def handle_text(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обробка текстових повідомлень"""
@@ -200,76 +523,181 @@ class VoiceBot:
             )
         # В групах бот не відповідає на текстові повідомлення
     
-    async def download_and_convert_audio(self, file_path: str) -> str:
-        """Завантаження та конвертація аудіо в WAV"""
-        try:
-            # Завантаження файлу
-            response = requests.get(file_path)
-            response.raise_for_status()
-            
-            # Збереження в тимчасовий файл
-            with tempfile.NamedTemporaryFile(suffix='.ogg', delete=False) as temp_file:
-                temp_file.write(response.content)
-                temp_file_path = temp_file.name
-            
-            # Конвертація в WAV за допомогою pydub
-            audio = AudioSegment.from_file(temp_file_path)
-            
-            # Експорт в WAV
-            with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as wav_file:
-                audio.export(wav_file.name, format='wav')
-                wav_path = wav_file.name
-            
-            # Видалення тимчасового OGG файлу
-            os.unlink(temp_file_path)
-            
-            return wav_path
-            
-        except Exception as e:
-            logger.error(f"Помилка конвертації аудіо: {e}")
-            return None
+    async def handle_profile(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Команда адміністратора /profile [частка|off]: профілювання частки завдань"""
+        user = update.effective_user
+        if not user or user.id not in self.admin_ids:
+            return
+        if self.mode == 'queue':
+            await update.message.reply_text(
+                "ℹ️ У режимі черги профілювання вмикається у воркерах змінною PROFILE_SAMPLE_RATE"
+            )
+            return
+        if not self.transcriber:
+            await update.message.reply_text("⏳ Конвеєр розпізнавання ще готується, спробуйте пізніше")
+            return
+        
+        profiler = self.transcriber.profiler
+        if context.args:
+            try:
+                rate = 0.0 if context.args[0] == 'off' else float(context.args[0])
+                if not 0 <= rate <= 1:
+                    raise ValueError(rate)
+            except ValueError:
+                await update.message.reply_text("❌ Використання: /profile [частка від 0 до 1 | off]")
+                return
+            profiler.sample_rate = rate
+            logger.info(f"Профілювання {rate:.1%} завдань увімкнув користувач {user.id}")
+        
+        status = f"{profiler.sample_rate:.1%} завдань" if profiler.enabled else "вимкнено"
+        await update.message.reply_text(
+            f"🔬 Профілювання: {status}\n"
+            f"Профільовано завдань: {profiler.jobs}\n"
+            f"Звіти: {os.path.abspath(profiler.directory)}"
+        )
     
-    async def recognize_speech(self, audio_file_path: str) -> str:
-        """Розпізнавання мови за допомогою Google Speech API"""
+    async def _on_startup(self, application: Application):
+        """Запуск допоміжних сервісів після ініціалізації бота"""
+        metrics_port = int(os.getenv('METRICS_PORT', '9100'))
+        if metrics_port:
+            # Зайнятий порт не має зупиняти бота - він працює і без метрик
+            try:
+                self.metrics_server = MetricsServer(
+                    host=os.getenv('METRICS_HOST', '127.0.0.1'), port=metrics_port,
+                    ready=lambda: self.is_ready
+                ).start()
+            except OSError as e:
+                logger.error(f"Не вдалося запустити сервер метрик на порту {metrics_port}: {e}")
+        
+        # Сигнали зупинки обробляє бот сам (run_* викликаються з stop_signals=None)
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM, signal.SIGABRT):
+            loop.add_signal_handler(sig, self._request_stop)
+        
+        if self.mode == 'queue':
+            self._set_ready()
+        elif self.warmup_mode == 'blocking':
+            await self._warm_up()
+        else:
+            self._warmup_task = asyncio.create_task(self._warm_up())
+        
+        if self.journal:
+            for entry in self.journal.pending():
+                task = asyncio.create_task(self._resume_job(application.bot, entry))
+                self._in_flight.add(task)
+                task.add_done_callback(self._in_flight.discard)
+    
+    async def _warm_up(self):
+        """
+        Імпорт і створення конвеєра розпізнавання в окремому потоці та його прогрів
+
+        Без конвеєра бот не може працювати, тож помилка його створення, як і
+        раніше, зупиняє бот (прийняті завдання лишаються в журналі).
+        """
+        started = time.perf_counter()
         try:
-            logger.info("Початок розпізнавання з Google Speech API")
-            
-            # Читаємо аудіо файл
-            with sr.AudioFile(audio_file_path) as source:
-                audio = self.recognizer.record(source)
-            
-            # Розпізнаємо текст
-            text = self.recognizer.recognize_google(
-                audio, 
-                language='uk-UA'  # Українська мова
-            )
-            
-            logger.info(f"Google Speech API розпізнав текст: {text}")
-            
-            if text and text.strip():
-                # Покращуємо український текст
-                text = improve_ukrainian_text(text.strip())
-                return text
-            else:
-                logger.warning("Google Speech API повернув порожній текст")
-                return None
-                
-        except sr.UnknownValueError:
-            logger.warning("Google Speech API не зміг розпізнати мову")
-            return None
-        except sr.RequestError as e:
-            logger.error(f"Помилка запиту до Google Speech API: {e}")
-            return None
+            self.transcriber = await asyncio.to_thread(self._load_transcriber)
         except Exception as e:
-            logger.error(f"Помилка розпізнавання з Google Speech API: {e}")
-            return None
+            logger.error(f"Помилка створення конвеєра розпізнавання: {e}")
+            if self.warmup_mode == 'blocking':
+                raise
+            self._warmup_error = e
+            self._request_stop()
+            return
+        self.startup_seconds['pipeline'] = time.perf_counter() - started
+        self._register_pipeline_gauges()
+        
+        if self.warmup_mode != 'off':
+            warmup_started = time.perf_counter()
+            timings = await self.transcriber.warm_up(
+                os.getenv('TELEGRAM_FILE_URL', 'https://api.telegram.org/file/bot')
+            )
+            self.startup_seconds['warmup'] = time.perf_counter() - warmup_started
+            self.startup_seconds.update((f'warmup_{step}', seconds) for step, seconds in timings.items())
+        self._set_ready()
     
-
+    @staticmethod
+    def _load_transcriber() -> 'Transcriber':
+        from transcriber import Transcriber
+        return Transcriber.from_env()
+    
+    def _set_ready(self):
+        self.startup_seconds['ready'] = time.perf_counter() - _started
+        self.ready.set()
+        phases = ', '.join(f"{phase} {seconds:.2f} с" for phase, seconds in self.startup_seconds.items())
+        logger.info(f"Бот готовий до розпізнавання: {phases}")
+    
+    def _request_stop(self):
+        """Перший сигнал - м'яка зупинка з очікуванням завдань, повторний - негайна"""
+        loop = asyncio.get_running_loop()
+        if self._stopping:
+            logger.warning("Повторний сигнал зупинки, завдання в роботі перериваються")
+            loop.stop()
+            return
+        self._stopping = loop.create_task(self._drain_and_stop())
+    
+    async def _drain_and_stop(self):
+        """Нові оновлення більше не беруться, завдання в роботі завершуються за SHUTDOWN_GRACE_SECONDS"""
+        logger.info(f"Зупинка: чекаю на {len(self._in_flight)} завдань до {self.shutdown_grace:.0f} с")
+        updater = self.application.updater
+        if updater and updater.running:
+            await updater.stop()
+        # Завдання в роботі і прийняті повідомлення, що ще чекають своєї черги в чаті
+        tasks = self._in_flight | self.sequencer.tasks
+        if tasks:
+            # Поки конвеєр не готовий, завдання не можуть завершитися - не чекаємо
+            _, pending = await asyncio.wait(tasks,
+                                            timeout=self.shutdown_grace if self.ready.is_set() else 0)
+            if pending:
+                # Записи в журналі лишаються - завдання продовжаться після перезапуску
+                logger.warning(f"{len(pending)} завдань не встигли завершитись, переривання")
+                for task in pending:
+                    task.cancel()
+                await asyncio.wait(pending, timeout=10)
+        asyncio.get_running_loop().stop()
+    
+    async def _on_shutdown(self, application: Application):
+        """Звільнення ресурсів після зупинки бота"""
+        if self._warmup_task:
+            self._warmup_task.cancel()
+        if self.metrics_server:
+            self.metrics_server.stop()
+        if self.transcriber:
+            await self.transcriber.close()
+        if self.jobs:
+            self.jobs.close()
+        if self.journal:
+            self.journal.close()
+        self.cache.close()
     
     def run(self):
-        """Запуск бота"""
-        logger.info("Запуск VoiceBot з Google Speech API...")
-        self.application.run_polling()
+        """Запуск бота (BOT_MODE=polling або webhook)"""
+        if self.mode == 'inline':
+            logger.info(f"Запуск VoiceBot з розпізнаванням у процесі (прогрів: {self.warmup_mode})...")
+        else:
+            logger.info(f"Запуск VoiceBot у режимі черги завдань ({self.jobs.db_path})...")
+        mode = os.getenv('BOT_MODE', 'polling')
+        if mode == 'webhook':
+            webhook_url = os.getenv('WEBHOOK_URL')
+            if not webhook_url:
+                raise ValueError("WEBHOOK_URL не знайдено в .env файлі")
+            url_path = os.getenv('WEBHOOK_PATH', 'telegram')
+            logger.info(f"Режим webhook: {webhook_url.rstrip('/')}/{url_path}")
+            self.application.run_webhook(
+                listen=os.getenv('WEBHOOK_LISTEN', '0.0.0.0'),
+                port=int(os.getenv('WEBHOOK_PORT', '8443')),
+                url_path=url_path,
+                webhook_url=f"{webhook_url.rstrip('/')}/{url_path}",
+                secret_token=os.getenv('WEBHOOK_SECRET') or None,
+                max_connections=int(os.getenv('WEBHOOK_MAX_CONNECTIONS', '40')),
+                stop_signals=None
+            )
+        elif mode == 'polling':
+            self.application.run_polling(stop_signals=None)
+        else:
+            raise ValueError(f"Невідомий режим BOT_MODE: {mode}")
+        if self._warmup_error:
+            raise self._warmup_error
 
 if __name__ == "__main__":
     bot = VoiceBot()
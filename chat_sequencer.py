@@ -0,0 +1,108 @@
+import asyncio
+import contextvars
+import functools
+import logging
+from contextlib import asynccontextmanager
+from typing import Dict, Hashable, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+_current_turn: contextvars.ContextVar = contextvars.ContextVar('voicebot_chat_turn', default=None)
+
+class _Turn:
+    """Черга, яку зараз займає задача; end() віддає її наступному повідомленню чату"""
+
+    __slots__ = ('lock', 'ended')
+
+    def __init__(self, lock: asyncio.Lock):
+        self.lock = lock
+        self.ended = False
+
+    def end(self):
+        if not self.ended:
+            self.ended = True
+            self.lock.release()
+
+class ChatSequencer:
+    """
+    Порядок обробки повідомлень у межах одного чату.
+
+    Кожен чат отримує власний asyncio.Lock: повідомлення одного чату
+    проходять свою чергу в порядку надходження (Lock справедливий, FIFO),
+    а різні чати - паралельно. Обгортка wrap не чекає на чергу в обробнику
+    PTB: оновлення передається в окрему задачу, і обробник одразу
+    повертається, тож повідомлення, що чекають у зайнятому чаті, не
+    займають місць concurrent_updates і не гальмують інші чати. Обробник
+    може віддати чергу раніше свого завершення (end_turn), наприклад після
+    відповіді-заглушки, щоб довге розпізнавання не затримувало наступні
+    повідомлення чату. Блокування видаляється, коли на нього ніхто не чекає.
+    """
+
+    def __init__(self):
+        self._locks: Dict[Hashable, asyncio.Lock] = {}
+        self._waiters: Dict[Hashable, int] = {}
+        self._tasks: Set[asyncio.Task] = set()
+
+    @property
+    def active_chats(self) -> int:
+        return len(self._locks)
+
+    @property
+    def tasks(self) -> Set[asyncio.Task]:
+        """Задачі оновлень, що чекають на чергу або ще обробляються"""
+        return set(self._tasks)
+
+    @asynccontextmanager
+    async def turn(self, chat_id: Hashable):
+        """Очікування своєї черги в чаті"""
+        lock = self._locks.get(chat_id)
+        if lock is None:
+            lock = self._locks[chat_id] = asyncio.Lock()
+        self._waiters[chat_id] = self._waiters.get(chat_id, 0) + 1
+        try:
+            await lock.acquire()
+            turn = _Turn(lock)
+            token = _current_turn.set(turn)
+            try:
+                yield
+            finally:
+                _current_turn.reset(token)
+                turn.end()
+        finally:
+            self._waiters[chat_id] -= 1
+            if not self._waiters[chat_id]:
+                del self._waiters[chat_id]
+                del self._locks[chat_id]
+
+    @staticmethod
+    def end_turn():
+        """Передача черги чату наступному повідомленню до завершення поточного обробника"""
+        turn: Optional[_Turn] = _current_turn.get()
+        if turn is not None:
+            turn.end()
+
+    def wrap(self, callback):
+        """
+        Обгортка обробника PTB: обробка в черзі свого чату в окремій задачі
+
+        Повертає цю задачу, щоб зовнішня обгортка могла дочекатися її
+        завершення поза обробником PTB.
+        """
+        @functools.wraps(callback)
+        async def wrapper(update, context):
+            chat = update.effective_chat
+            if chat is None:
+                return await callback(update, context)
+            task = asyncio.create_task(self._run(chat.id, callback, update, context))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+            return task
+        return wrapper
+
+    async def _run(self, chat_id: Hashable, callback, update, context):
+        async with self.turn(chat_id):
+            try:
+                return await callback(update, context)
+            except Exception as e:
+                # Обробник PTB більше не бачить цієї задачі - помилка лише в лог
+                logger.error(f"Помилка обробки оновлення в чаті {chat_id}: {e}")
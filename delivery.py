@@ -0,0 +1,200 @@
+import asyncio
+import io
+import logging
+import time
+from typing import Dict, Hashable, List, Optional
+
+from telegram.error import BadRequest, RetryAfter
+
+logger = logging.getLogger(__name__)
+
+RESULT_HEADER = "📝 **Розпізнаний текст від {user_name}:**\n\n"
+NOT_RECOGNIZED_TEXT = "❌ Не вдалося розпізнати мову"
+UNAVAILABLE_TEXT = "⚠️ Сервіс розпізнавання тимчасово недоступний, спробуйте пізніше"
+RESTART_TEXT = "🔄 Бот перезапускається, розпізнавання продовжиться автоматично"
+RESTART_FAILED_TEXT = "❌ Розпізнавання перервав перезапуск бота, надішліть запис ще раз"
+PROGRESS_SUFFIX = "\n\n⏳ Розпізнаю далі..."
+DOCUMENT_NOTICE = "\n\n📄 Повний текст - у файлі нижче"
+
+# Ліміт Telegram - 4096 символів, із запасом на емодзі (2 одиниці UTF-16)
+MAX_MESSAGE_LENGTH = 4000
+
+def split_text(text: str, limit: int = MAX_MESSAGE_LENGTH) -> List[str]:
+    """Розбиття тексту на частини не довші за limit по межах речень або слів"""
+    chunks = []
+    while len(text) > limit:
+        cut = text.rfind('\n', 0, limit)
+        if cut < limit // 2:
+            cut = max(text.rfind('. ', 0, limit), text.rfind('? ', 0, limit),
+                      text.rfind('! ', 0, limit)) + 1
+        if cut < limit // 2:
+            cut = text.rfind(' ', 0, limit)
+        if cut < limit // 2:
+            cut = limit
+        chunks.append(text[:cut].rstrip())
+        text = text[cut:].lstrip()
+    if text:
+        chunks.append(text)
+    return chunks
+
+class ChatRateLimiter:
+    """
+    Бюджет відправок на чат: не частіше за одне повідомлення або
+    редагування на min_interval секунд, щоб не впертися в flood-ліміти
+    Telegram. Кожен виклик wait резервує наступний вільний слот.
+    """
+
+    def __init__(self, min_interval: float = 1.0):
+        self.min_interval = min_interval
+        self._next_slot: Dict[Hashable, float] = {}
+
+    def delay(self, chat_id: Hashable) -> float:
+        """Скільки секунд до найближчого вільного слота"""
+        return max(0.0, self._next_slot.get(chat_id, 0.0) - time.monotonic())
+
+    async def wait(self, chat_id: Hashable):
+        now = time.monotonic()
+        slot = max(now, self._next_slot.get(chat_id, 0.0))
+        self._next_slot[chat_id] = slot + self.min_interval
+        if len(self._next_slot) > 10000:
+            self._prune(now)
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+    def _prune(self, now: float):
+        for chat_id in [chat_id for chat_id, slot in self._next_slot.items() if slot < now]:
+            del self._next_slot[chat_id]
+
+class ProgressiveMessage:
+    """
+    Поступова доставка транскрипту в одне повідомлення-заглушку.
+
+    update() лише запам'ятовує найсвіжіший частковий текст; редагування
+    відправляється, коли дозволяє ChatRateLimiter, тож проміжні версії
+    між слотами зливаються в одну. Текст, що не змінився (зокрема після
+    обрізання до межі повідомлення), повторно не відправляється і не
+    займає слот. finish() скасовує незавершене
+    часткове редагування і доставляє повний текст: довгий - кількома
+    повідомленнями, а понад max_messages частин - файлом .txt.
+    Без message_id перша частина відправляється новим повідомленням.
+    """
+
+    def __init__(self, bot, chat_id: int, message_id: Optional[int], limiter: ChatRateLimiter,
+                 header: str = '', max_messages: int = 3, reply_to: Optional[int] = None,
+                 max_length: int = MAX_MESSAGE_LENGTH):
+        self.bot = bot
+        self.chat_id = chat_id
+        self.message_id = message_id
+        self.limiter = limiter
+        self.header = header
+        self.max_messages = max_messages
+        self.reply_to = reply_to or message_id
+        self.max_length = max_length
+
+        self._pending: Optional[str] = None
+        self._shown: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._finished = False
+
+    def update(self, text: str):
+        """Новий частковий текст (не блокує)"""
+        if self._finished or self.message_id is None:
+            return
+        self._pending = text
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_partial())
+
+    def _render_partial(self, text: str) -> str:
+        body = self.header + text
+        room = self.max_length - len(PROGRESS_SUFFIX)
+        if len(body) > room:
+            body = body[:room - 1] + '…'
+        return body + PROGRESS_SUFFIX
+
+    async def _flush_partial(self):
+        while self._pending is not None and not self._finished:
+            if self._render_partial(self._pending) == self._shown:
+                # Показаний текст уже такий самий (або обрізаний до тієї ж межі)
+                self._pending = None
+                return
+            await self.limiter.wait(self.chat_id)
+            text, self._pending = self._pending, None
+            if text is None or self._finished:
+                return
+            body = self._render_partial(text)
+            if body == self._shown:
+                continue
+            try:
+                await self.bot.edit_message_text(body, chat_id=self.chat_id,
+                                                 message_id=self.message_id)
+                self._shown = body
+            except Exception as e:
+                # Проміжна версія не критична: наступна або фінальна її замінить
+                logger.warning(f"Не вдалося оновити проміжний текст у чаті {self.chat_id}: {e}")
+
+    def cancel(self):
+        """Зупинка проміжних оновлень"""
+        self._finished = True
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+
+    async def _settle(self):
+        self.cancel()
+        if self._task is not None:
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def show(self, text: str):
+        """Заміна заглушки коротким службовим текстом"""
+        await self._settle()
+        await self._send_first(text)
+
+    async def finish(self, text: str):
+        """Доставка повного транскрипту"""
+        await self._settle()
+        chunks = split_text(self.header + text, self.max_length)
+
+        if len(chunks) > self.max_messages:
+            # Задовгий текст: початок у повідомленні, повністю - файлом
+            preview = split_text(self.header + text, self.max_length // 4)[0]
+            await self._send_first(preview + '…' + DOCUMENT_NOTICE)
+            await self.limiter.wait(self.chat_id)
+            await self._call(
+                self.bot.send_document, chat_id=self.chat_id,
+                document=io.BytesIO(text.encode('utf-8')), filename='transcript.txt',
+                reply_to_message_id=self.reply_to
+            )
+            return
+
+        await self._send_first(chunks[0])
+        for chunk in chunks[1:]:
+            await self.limiter.wait(self.chat_id)
+            await self._call(self.bot.send_message, chat_id=self.chat_id, text=chunk,
+                             reply_to_message_id=self.reply_to)
+
+    async def _send_first(self, text: str):
+        await self.limiter.wait(self.chat_id)
+        if self.message_id is None:
+            message = await self._call(self.bot.send_message, chat_id=self.chat_id, text=text,
+                                       reply_to_message_id=self.reply_to)
+            self.message_id = message.message_id
+            return
+        try:
+            await self._call(self.bot.edit_message_text, text, chat_id=self.chat_id,
+                             message_id=self.message_id)
+        except BadRequest as e:
+            # Останнє проміжне оновлення могло вже показати цей самий текст
+            if 'not modified' not in str(e).lower():
+                raise
+
+    @staticmethod
+    async def _call(method, *args, **kwargs):
+        """Виклик Bot API з одним повтором після flood-ліміту"""
+        try:
+            return await method(*args, **kwargs)
+        except RetryAfter as e:
+            logger.warning(f"Flood-ліміт Telegram, повтор через {e.retry_after} с")
+            await asyncio.sleep(e.retry_after)
+            return await method(*args, **kwargs)
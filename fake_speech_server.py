@@ -0,0 +1,134 @@
+"""
+Локальна заміна Google Speech API для тестів і бенчмарків.
+
+Приймає ті самі запити, що й speech-api/v2/recognize (FLAC у тілі POST),
+і відповідає у форматі Google після заданої затримки. Частину запитів
+можна завершувати помилкою сервера або порожнім результатом.
+
+    python3 fake_speech_server.py --port 8090 --latency 0.3
+    GOOGLE_SPEECH_ENDPOINT=http://127.0.0.1:8090/speech-api/v2/recognize python3 bot.py
+"""
+import argparse
+import json
+import logging
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WORDS = (
+    'я думаю що це добре але ми ще не знаємо як це зробити '
+    'сьогодні була цікава лекція про нові технології'
+).split()
+
+class FakeSpeechServer:
+    """HTTP-сервер, що імітує Google Speech API"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 latency_per_kb: float = 0.0, error_rate: float = 0.0,
+                 unknown_rate: float = 0.0, seed: int = 0):
+        self.latency = latency
+        self.latency_per_kb = latency_per_kb
+        self.error_rate = error_rate
+        self.unknown_rate = unknown_rate
+        self.requests = 0
+        self.errors = 0
+
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def endpoint(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/speech-api/v2/recognize'
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+                status, payload = server.respond(body)
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json; charset=utf-8')
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def respond(self, body: bytes):
+        """Відповідь на один запит розпізнавання: (HTTP-статус, тіло)"""
+        with self._lock:
+            self.requests += 1
+            roll = self._random.random()
+            # FLAC 16 кГц займає близько 16 КБ/с, а мовлення - близько 2 слів/с
+            n_words = max(1, len(body) // 8000)
+            words = [self._random.choice(DEFAULT_WORDS) for _ in range(n_words)]
+
+        time.sleep(self.latency + self.latency_per_kb * len(body) / 1024)
+
+        if roll < self.error_rate:
+            with self._lock:
+                self.errors += 1
+            return 500, b'{"error": "internal"}'
+        if roll < self.error_rate + self.unknown_rate:
+            return 200, b'{"result":[]}\n'
+
+        result = {
+            'result': [{
+                'alternative': [{'transcript': ' '.join(words), 'confidence': 0.9}],
+                'final': True
+            }],
+            'result_index': 0
+        }
+        payload = '{"result":[]}\n' + json.dumps(result, ensure_ascii=False) + '\n'
+        return 200, payload.encode('utf-8')
+
+    def start(self) -> 'FakeSpeechServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description="Локальна заміна Google Speech API")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8090)
+    parser.add_argument('--latency', type=float, default=0.2, help="Базова затримка, с")
+    parser.add_argument('--latency-per-kb', type=float, default=0.0, help="Додаткова затримка на КБ, с")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="Частка відповідей 500")
+    parser.add_argument('--unknown-rate', type=float, default=0.0, help="Частка порожніх результатів")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    server = FakeSpeechServer(args.host, args.port, args.latency, args.latency_per_kb,
+                              args.error_rate, args.unknown_rate)
+    logger.info(f"Заміна Google Speech API слухає {server.endpoint}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,249 @@
+"""
+Локальна заміна Telegram Bot API для навантажувальних тестів.
+
+Реалізує методи, якими користується бот: getMe, getUpdates (довге
+опитування), getFile, sendMessage, editMessageText, sendDocument, а
+також файловий сервер /file/bot<token>/<шлях>. Оновлення додаються з
+тесту через push_update, а кожна відповідь бота передається в listener.
+Бот підключається до нього через TELEGRAM_API_URL і TELEGRAM_FILE_URL
+(див. load_test.py).
+"""
+import email.parser
+import email.policy
+import itertools
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+logger = logging.getLogger(__name__)
+
+BOT_USER = {'id': 1, 'is_bot': True, 'first_name': 'VoiceBot', 'username': 'voicebot_loadtest_bot',
+            'can_join_groups': False, 'can_read_all_group_messages': False,
+            'supports_inline_queries': False}
+
+# Поля медіа в повідомленні Telegram за типом
+MEDIA_FIELDS = {
+    'voice': {'mime_type': 'audio/ogg'},
+    'audio': {'mime_type': 'audio/ogg', 'title': 'Навантажувальний тест'},
+    'video': {'mime_type': 'video/mp4', 'width': 320, 'height': 240},
+    'video_note': {'length': 240},
+}
+
+class FakeTelegramServer:
+    """HTTP-сервер, що імітує Telegram Bot API"""
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency: float = 0.0,
+                 listener: Optional[Callable[[str, dict, dict], None]] = None):
+        self.latency = latency
+        # listener(метод, параметри, повідомлення-результат) для sendMessage,
+        # editMessageText і sendDocument; викликається з потоків сервера
+        self.listener = listener
+        self.requests: Dict[str, int] = {}
+
+        self._files: Dict[str, bytes] = {}
+        self._file_ids: Dict[str, dict] = {}
+        self._updates: List[dict] = []
+        self._update_ids = itertools.count(1)
+        self._message_ids = itertools.count(1)
+        self._condition = threading.Condition()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/bot'
+
+    @property
+    def base_file_url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/file/bot'
+
+    def add_file(self, file_path: str, data: bytes):
+        """Файл, який бот зможе завантажити за шляхом file_path"""
+        self._files[file_path] = data
+
+    def push_update(self, kind: str, chat_id: int, file_path: str, duration: int,
+                    file_unique_id: Optional[str] = None, first_name: str = 'Тестувальник') -> dict:
+        """
+        Нове повідомлення з медіа типу kind у приватному чаті chat_id
+
+        Returns:
+            dict: Повідомлення Telegram (message_id, chat, медіа)
+        """
+        update_id = next(self._update_ids)
+        file_id = f'{kind}-{update_id}'
+        media = {
+            'file_id': file_id,
+            'file_unique_id': file_unique_id or file_id,
+            'file_size': len(self._files[file_path]),
+            'duration': duration,
+            **MEDIA_FIELDS[kind]
+        }
+        self._file_ids[file_id] = {'file_id': file_id, 'file_unique_id': media['file_unique_id'],
+                                   'file_size': media['file_size'], 'file_path': file_path}
+        message = {
+            'message_id': next(self._message_ids),
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private', 'first_name': first_name},
+            'from': {'id': chat_id, 'is_bot': False, 'first_name': first_name},
+            kind: media
+        }
+        with self._condition:
+            self._updates.append({'update_id': update_id, 'message': message})
+            self._condition.notify_all()
+        return message
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                self._dispatch(b'')
+
+            def do_POST(self):
+                self._dispatch(self.rfile.read(int(self.headers.get('Content-Length', 0))))
+
+            def _dispatch(self, body: bytes):
+                path = urlsplit(self.path).path
+                if path.startswith('/file/bot'):
+                    data = server._files.get(path.split('/', 3)[3] if path.count('/') >= 3 else '')
+                    if data is None:
+                        self.send_error(404)
+                        return
+                    self._reply(200, data, 'application/octet-stream')
+                    return
+
+                method = path.rsplit('/', 1)[-1]
+                params = dict(parse_qsl(urlsplit(self.path).query))
+                params.update(server._parse_body(self.headers.get('Content-Type', ''), body))
+                status, payload = server.respond(method, params)
+                self._reply(status, json.dumps(payload, ensure_ascii=False).encode('utf-8'),
+                            'application/json')
+
+            def _reply(self, status: int, payload: bytes, content_type: str):
+                self.send_response(status)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                try:
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    # Клієнт перервав довге опитування під час зупинки
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    @staticmethod
+    def _parse_body(content_type: str, body: bytes) -> dict:
+        """Параметри методу: form-urlencoded, multipart (sendDocument) або JSON"""
+        if not body:
+            return {}
+        if content_type.startswith('application/json'):
+            return json.loads(body)
+        if content_type.startswith('multipart/form-data'):
+            message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+                b'Content-Type: ' + content_type.encode('latin-1') + b'\r\n\r\n' + body
+            )
+            params = {}
+            for part in message.iter_parts():
+                name = part.get_param('name', header='content-disposition')
+                if part.get_filename() is None:
+                    params[name] = part.get_payload(decode=True).decode('utf-8')
+                else:
+                    params[name] = part.get_payload(decode=True)
+            return params
+        return dict(parse_qsl(body.decode('utf-8'), keep_blank_values=True))
+
+    def respond(self, method: str, params: dict):
+        """Відповідь на один виклик Bot API: (HTTP-статус, тіло)"""
+        with self._condition:
+            self.requests[method] = self.requests.get(method, 0) + 1
+        if self.latency and method != 'getUpdates':
+            time.sleep(self.latency)
+
+        handler = getattr(self, f'_method_{method}', None)
+        if handler is None:
+            # Службові виклики (deleteWebhook, setMyCommands тощо) просто успішні
+            return 200, {'ok': True, 'result': True}
+        try:
+            return 200, {'ok': True, 'result': handler(params)}
+        except KeyError as e:
+            return 400, {'ok': False, 'error_code': 400, 'description': f'Bad Request: {e}'}
+
+    def _method_getMe(self, params: dict):
+        return BOT_USER
+
+    def _method_getUpdates(self, params: dict):
+        offset = int(params.get('offset') or 0)
+        limit = int(params.get('limit') or 100)
+        deadline = time.monotonic() + float(params.get('timeout') or 0)
+        with self._condition:
+            # Оновлення з id < offset підтверджені ботом
+            while self._updates and self._updates[0]['update_id'] < offset:
+                self._updates.pop(0)
+            while not self._updates and time.monotonic() < deadline:
+                self._condition.wait(deadline - time.monotonic())
+            return self._updates[:limit]
+
+    def _method_getFile(self, params: dict):
+        return self._file_ids[params['file_id']]
+
+    def _message(self, params: dict, message_id: Optional[int] = None) -> dict:
+        chat_id = int(params['chat_id'])
+        message = {
+            'message_id': message_id or next(self._message_ids),
+            'date': int(time.time()),
+            'chat': {'id': chat_id, 'type': 'private'},
+            'from': BOT_USER
+        }
+        if 'text' in params:
+            message['text'] = params['text']
+        return message
+
+    def _notify(self, method: str, params: dict, message: dict):
+        if self.listener:
+            self.listener(method, params, message)
+
+    def _method_sendMessage(self, params: dict):
+        message = self._message(params)
+        self._notify('sendMessage', params, message)
+        return message
+
+    def _method_editMessageText(self, params: dict):
+        message = self._message(params, int(params['message_id']))
+        message['edit_date'] = int(time.time())
+        self._notify('editMessageText', params, message)
+        return message
+
+    def _method_sendDocument(self, params: dict):
+        message = self._message(params)
+        document = params.get('document')
+        message['document'] = {'file_id': f'document-{message["message_id"]}',
+                               'file_unique_id': f'document-{message["message_id"]}',
+                               'file_size': len(document) if isinstance(document, bytes) else 0}
+        self._notify('sendDocument', params, message)
+        return message
+
+    def start(self) -> 'FakeTelegramServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
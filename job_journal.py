@@ -0,0 +1,64 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import List
+
+from job_queue import Job
+
+logger = logging.getLogger(__name__)
+
+class JobJournal:
+    """
+    Журнал прийнятих завдань режиму inline на SQLite (WAL).
+
+    Запис додається одразу після надсилання заглушки "Обробляю..." і
+    видаляється, коли в ній з'явився остаточний результат або помилка.
+    Тож після перезапуску (деплой, падіння процесу) в журналі лишаються
+    саме ті завдання, користувачі яких досі бачать заглушку: бот продовжує
+    їх або повідомляє, що запис треба надіслати ще раз. attempts - скільки
+    разів завдання вже продовжували після перезапуску.
+    """
+
+    def __init__(self, db_path: str = 'journal.db'):
+        self.db_path = db_path
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, timeout=30, isolation_level=None,
+                                   check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS journal ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL, '
+            'attempts INTEGER NOT NULL DEFAULT 0, created_at REAL NOT NULL)'
+        )
+
+    def record(self, payload: dict) -> int:
+        """Запис прийнятого завдання (file_id, чат, id заглушки тощо)"""
+        with self._lock:
+            cursor = self._db.execute(
+                'INSERT INTO journal (payload, created_at) VALUES (?, ?)',
+                (json.dumps(payload, ensure_ascii=False), time.time())
+            )
+        return cursor.lastrowid
+
+    def resumed(self, entry_id: int):
+        """Завдання продовжено після перезапуску"""
+        with self._lock:
+            self._db.execute('UPDATE journal SET attempts = attempts + 1 WHERE id = ?', (entry_id,))
+
+    def finish(self, entry_id: int):
+        """У заглушці остаточний результат, запис більше не потрібен"""
+        with self._lock:
+            self._db.execute('DELETE FROM journal WHERE id = ?', (entry_id,))
+
+    def pending(self) -> List[Job]:
+        """Незавершені завдання в порядку прийняття"""
+        with self._lock:
+            rows = self._db.execute('SELECT id, payload, attempts FROM journal ORDER BY id').fetchall()
+        return [Job(entry_id, json.loads(payload), attempts) for entry_id, payload, attempts in rows]
+
+    def close(self):
+        with self._lock:
+            self._db.close()
@@ -0,0 +1,221 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class Job(NamedTuple):
+    id: int
+    payload: dict
+    attempts: int
+
+class JobQueue:
+    """
+    Надійна локальна черга завдань розпізнавання на SQLite.
+
+    Бот додає завдання (file_id, чат, id повідомлення-заглушки), воркери в
+    окремих процесах забирають їх по одному: спочатку коротші записи, але
+    кожна секунда очікування додає завданню aging_rate секунд переваги,
+    тож довгі не голодують. Взяте завдання орендується на lease_seconds,
+    і воркер продовжує оренду (renew), поки працює над ним. Якщо воркер
+    впав, після закінчення оренди завдання знову стає доступним, доки не
+    вичерпано max_attempts; після цього claim позначає його проваленим і
+    віддає через exhausted(), щоб воркер повідомив користувача. Завершити,
+    провалити чи повернути завдання може лише воркер, що його орендує.
+    WAL дозволяє процесам на одному хості читати і писати одночасно.
+    """
+
+    def __init__(self, db_path: str = 'jobs.db', lease_seconds: float = 600,
+                 max_attempts: int = 3, aging_rate: float = 1.0):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.aging_rate = aging_rate
+
+        self._lock = threading.Lock()
+        # Завдання з вичерпаними спробами, провалені під час claim цього процесу
+        self._exhausted: List[Job] = []
+        self._db = sqlite3.connect(db_path, timeout=30, isolation_level=None,
+                                   check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS jobs ('
+            'id INTEGER PRIMARY KEY AUTOINCREMENT, payload TEXT NOT NULL, '
+            "status TEXT NOT NULL DEFAULT 'queued', attempts INTEGER NOT NULL DEFAULT 0, "
+            'worker TEXT, error TEXT, created_at REAL NOT NULL, '
+            'updated_at REAL NOT NULL, lease_until REAL, priority REAL NOT NULL DEFAULT 0)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS jobs_priority ON jobs (status, priority, id)')
+
+    def enqueue(self, payload: dict, duration: float = 0.0) -> int:
+        """Додавання завдання тривалістю duration секунд"""
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                'INSERT INTO jobs (payload, created_at, updated_at, priority) VALUES (?, ?, ?, ?)',
+                (json.dumps(payload, ensure_ascii=False), now, now, duration + self.aging_rate * now)
+            )
+        return cursor.lastrowid
+
+    def claim(self, worker: str) -> Optional[Job]:
+        """
+        Взяття найпріоритетнішого доступного завдання в оренду
+
+        Завдання з простроченою орендою після останньої спроби (воркер
+        падав на ньому щоразу) не видається знову, а позначається
+        проваленим і потрапляє в exhausted().
+        """
+        now = time.time()
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                expired = self._db.execute(
+                    "SELECT id, payload, attempts FROM jobs WHERE status = 'running' "
+                    'AND lease_until < ? AND attempts >= ?',
+                    (now, self.max_attempts)
+                ).fetchall()
+                for job_id, _, attempts in expired:
+                    self._db.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, worker = NULL, updated_at = ?, "
+                        'lease_until = NULL WHERE id = ?',
+                        (f"Оренда закінчилась після {attempts} спроб", now, job_id)
+                    )
+                row = self._db.execute(
+                    "SELECT id, payload, attempts FROM jobs WHERE status = 'queued' "
+                    "OR (status = 'running' AND lease_until < ?) ORDER BY priority, id LIMIT 1",
+                    (now,)
+                ).fetchone()
+                if row is not None:
+                    self._db.execute(
+                        "UPDATE jobs SET status = 'running', attempts = attempts + 1, worker = ?, "
+                        'updated_at = ?, lease_until = ? WHERE id = ?',
+                        (worker, now, now + self.lease_seconds, row[0])
+                    )
+                self._db.execute('COMMIT')
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+            for job_id, payload, attempts in expired:
+                logger.warning(f"Завдання {job_id} провалено: оренда закінчилась після {attempts} спроб")
+                self._exhausted.append(Job(job_id, json.loads(payload), attempts))
+        if row is None:
+            return None
+        job_id, payload, attempts = row
+        return Job(job_id, json.loads(payload), attempts + 1)
+
+    def exhausted(self) -> List[Job]:
+        """Завдання, які claim провалив через вичерпані спроби (кожне видається один раз)"""
+        with self._lock:
+            jobs, self._exhausted = self._exhausted, []
+        return jobs
+
+    def renew(self, job_id: int, worker: str) -> bool:
+        """
+        Продовження оренди завдання, над яким воркер ще працює
+
+        Returns:
+            bool: False, якщо завдання вже не належить воркеру
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._db.execute(
+                'UPDATE jobs SET lease_until = ?, updated_at = ? '
+                "WHERE id = ? AND worker = ? AND status = 'running'",
+                (now + self.lease_seconds, now, job_id, worker)
+            )
+        return cursor.rowcount > 0
+
+    def complete(self, job_id: int, worker: str) -> bool:
+        """
+        Завдання виконано
+
+        Returns:
+            bool: False, якщо завдання вже не належить воркеру (результат не записано)
+        """
+        return self._finish(job_id, worker, "'done'", None)
+
+    def fail(self, job_id: int, worker: str, error: str) -> bool:
+        """
+        Невдала спроба: завдання повертається в чергу, доки є спроби
+
+        Returns:
+            bool: True, якщо завдання остаточно провалене цим воркером
+        """
+        with self._lock:
+            self._db.execute('BEGIN IMMEDIATE')
+            try:
+                owned = self._update(
+                    job_id, worker,
+                    "CASE WHEN attempts >= ? THEN 'failed' ELSE 'queued' END", error,
+                    (self.max_attempts, )
+                )
+                row = self._db.execute('SELECT status FROM jobs WHERE id = ?', (job_id,)).fetchone()
+                self._db.execute('COMMIT')
+            except Exception:
+                self._db.execute('ROLLBACK')
+                raise
+        return owned and row[0] == 'failed'
+
+    def release(self, job_id: int, worker: str) -> bool:
+        """Повернення взятого завдання в чергу без витрати спроби (воркер зупиняється)"""
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE jobs SET status = 'queued', attempts = MAX(attempts - 1, 0), worker = NULL, "
+                "updated_at = ?, lease_until = NULL WHERE id = ? AND worker = ? AND status = 'running'",
+                (time.time(), job_id, worker)
+            )
+        return cursor.rowcount > 0
+
+    def _finish(self, job_id: int, worker: str, status: str, error: Optional[str]) -> bool:
+        with self._lock:
+            return self._update(job_id, worker, status, error)
+
+    def _update(self, job_id: int, worker: str, status: str, error: Optional[str],
+                status_args: tuple = ()) -> bool:
+        """Зміна стану завдання, якщо його досі орендує worker (status - SQL-вираз)"""
+        cursor = self._db.execute(
+            f'UPDATE jobs SET status = {status}, error = ?, updated_at = ?, lease_until = NULL '
+            "WHERE id = ? AND worker = ? AND status = 'running'",
+            (*status_args, error, time.time(), job_id, worker)
+        )
+        if not cursor.rowcount:
+            logger.warning(f"Завдання {job_id} вже не належить воркеру {worker}, стан не змінено")
+        return cursor.rowcount > 0
+
+    def depth(self) -> int:
+        """Кількість завдань, що чекають на воркера"""
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM jobs WHERE status = 'queued'").fetchone()[0]
+
+    def backlog(self, chat_id, user_id, default_duration: float = 0.0) -> Tuple[float, int, int]:
+        """
+        Незавершені завдання (в черзі і в роботі) для планувальника бота
+
+        Returns:
+            Tuple: (секунди аудіо всіх завдань, завдань чату, завдань користувача)
+        """
+        with self._lock:
+            row = self._db.execute(
+                "SELECT COALESCE(SUM(COALESCE(json_extract(payload, '$.duration'), ?)), 0), "
+                "COUNT(CASE WHEN json_extract(payload, '$.chat_id') = ? THEN 1 END), "
+                "COUNT(CASE WHEN json_extract(payload, '$.user_id') = ? THEN 1 END) "
+                "FROM jobs WHERE status IN ('queued', 'running')",
+                (default_duration, chat_id, user_id)
+            ).fetchone()
+        return float(row[0]), row[1], row[2]
+
+    def purge(self, max_age: float = 24 * 3600) -> int:
+        """Видалення завершених завдань, старших за max_age секунд"""
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND updated_at < ?",
+                (time.time() - max_age,)
+            )
+        return cursor.rowcount
+
+    def close(self):
+        with self._lock:
+            self._db.close()
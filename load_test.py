@@ -0,0 +1,492 @@
+"""
+Офлайн навантажувальний тест VoiceBot.
+
+Бот (а в режимі queue ще й worker.py) запускається окремими процесами
+проти локальних замін Telegram Bot API (fake_telegram_server.py) і Google
+Speech API (fake_speech_server.py). Генератор подає синтетичні голосові,
+аудіо, відео і відеоповідомлення з заданою частотою і рахує пропускну
+здатність, затримки до заглушки, першого проміжного тексту і результату,
+частку помилок, а також перцентилі етапів з /metrics бота і воркерів.
+Якщо розпізнавання завершувались, а гістограми етапів порожні, тест
+повертає код 1.
+
+    python3 load_test.py --count 1000 --rate 20
+    python3 load_test.py --count 2000 --rate 50 --mode queue --workers 4 \\
+        --speech-latency 0.5 --speech-error-rate 0.05 --env RECOGNITION_RETRIES=1
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import shutil
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from typing import Dict, List, Optional, Tuple
+
+from benchmark import SAMPLE_RATE, encode_ogg, generate_speech_pcm
+from delivery import NOT_RECOGNIZED_TEXT, PROGRESS_SUFFIX, RESULT_HEADER, UNAVAILABLE_TEXT
+from fake_speech_server import FakeSpeechServer
+from fake_telegram_server import FakeTelegramServer
+
+logger = logging.getLogger(__name__)
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+RESULT_PREFIX = RESULT_HEADER.split('{')[0]
+# Відмови бота до початку обробки (зайнятий, квота, ліміти розміру і тривалості)
+REJECTION_PREFIXES = ('⏳', '❌ Файл завеликий', '❌ Запис задовгий')
+MEDIA_KINDS = ('voice', 'audio', 'video', 'video_note')
+
+def encode_mp4(pcm: bytes, size: str, ffmpeg_path: str = 'ffmpeg') -> Optional[bytes]:
+    """Відео з однотонною картинкою і заданим звуком (AAC у MP4)"""
+    if not shutil.which(ffmpeg_path):
+        return None
+    with tempfile.NamedTemporaryFile(suffix='.mp4') as output:
+        result = subprocess.run(
+            [ffmpeg_path, '-nostdin', '-hide_banner', '-loglevel', 'error', '-y',
+             '-f', 'lavfi', '-i', f'color=c=gray:s={size}:r=10',
+             '-f', 's16le', '-ar', str(SAMPLE_RATE), '-ac', '1', '-i', 'pipe:0',
+             '-shortest', '-c:v', 'mpeg4', '-c:a', 'aac', '-b:a', '48k', output.name],
+            input=pcm, stdout=subprocess.PIPE, stderr=subprocess.PIPE, check=False
+        )
+        if result.returncode != 0:
+            return None
+        return output.read()
+
+def build_fixtures(durations: List[int], ffmpeg_path: str = 'ffmpeg') -> Dict[Tuple[str, int], bytes]:
+    """Файли для кожного типу медіа і тривалості"""
+    fixtures = {}
+    for seconds in durations:
+        pcm = generate_speech_pcm(seconds, seed=seconds)
+        ogg = encode_ogg(pcm, ffmpeg_path=ffmpeg_path)
+        video = encode_mp4(pcm, '320x240', ffmpeg_path)
+        video_note = encode_mp4(pcm, '240x240', ffmpeg_path)
+        if ogg is None or video is None or video_note is None:
+            raise RuntimeError("Не вдалося закодувати фікстури: потрібен ffmpeg з libopus і aac")
+        fixtures['voice', seconds] = ogg
+        fixtures['audio', seconds] = ogg
+        fixtures['video', seconds] = video
+        fixtures['video_note', seconds] = video_note
+    return fixtures
+
+def percentiles(values: List[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+    return {'p50': pick(0.5), 'p95': pick(0.95), 'p99': pick(0.99),
+            'mean': statistics.mean(ordered), 'max': ordered[-1]}
+
+def histogram_quantiles(metrics_text: str, name: str, label: str,
+                        quantiles=(0.5, 0.95, 0.99)) -> Dict[str, Dict[str, float]]:
+    """
+    Перцентилі гістограми Prometheus з лінійною інтерполяцією в кошику
+
+    Текст може містити вивід кількох процесів (бот і воркери) - однакові
+    кошики сумуються.
+    """
+    buckets: Dict[str, Dict[float, float]] = {}
+    pattern = re.compile(rf'^{name}_bucket\{{(.*)\}} (\S+)$')
+    for line in metrics_text.splitlines():
+        match = pattern.match(line)
+        if not match:
+            continue
+        labels = dict(re.findall(r'(\w+)="([^"]*)"', match.group(1)))
+        bound = float('inf') if labels['le'] == '+Inf' else float(labels['le'])
+        counts = buckets.setdefault(labels[label], {})
+        counts[bound] = counts.get(bound, 0.0) + float(match.group(2))
+
+    result = {}
+    for key, counts in buckets.items():
+        points = sorted(counts.items())
+        total = points[-1][1]
+        if not total:
+            continue
+        stats = {'count': total}
+        for q in quantiles:
+            rank = q * total
+            previous_bound, previous_count = 0.0, 0.0
+            for bound, count in points:
+                if count >= rank:
+                    if bound == float('inf'):
+                        value = previous_bound
+                    elif count == previous_count:
+                        value = bound
+                    else:
+                        value = previous_bound + (bound - previous_bound) * (rank - previous_count) / (count - previous_count)
+                    break
+                previous_bound, previous_count = bound, count
+            stats[f'p{int(q * 100)}'] = value
+        result[key] = stats
+    return result
+
+class _Tracker:
+    """
+    Стан кожного надісланого повідомлення за відповідями бота.
+
+    У приватних чатах бот відповідає без reply_to_message_id, тому
+    відповіді зіставляються з повідомленнями чату по черзі: заглушка
+    містить ім'я користувача, відмови і помилки впізнаються за текстом, а
+    редагування - за id заглушки.
+    """
+
+    def __init__(self, first_name: str = 'Тестувальник'):
+        self.first_name = first_name
+        self.messages: Dict[Tuple[int, int], dict] = {}
+        # Повідомлення чату без жодної відповіді, у порядку надсилання
+        self._unanswered: Dict[int, List[Tuple[int, int]]] = {}
+        self._placeholders: Dict[Tuple[int, int], Tuple[int, int]] = {}
+        self._acked: Dict[int, List[Tuple[int, int]]] = {}
+        self._lock = threading.Lock()
+        self._finished = 0
+        self.all_done = threading.Event()
+        self.expected = None
+
+    def sent(self, chat_id: int, message_id: int, kind: str, seconds: int):
+        with self._lock:
+            self.messages[chat_id, message_id] = {'kind': kind, 'seconds': seconds,
+                                                  'sent': time.monotonic()}
+            self._unanswered.setdefault(chat_id, []).append((chat_id, message_id))
+
+    def _in_flight(self, chat_id: int) -> Optional[dict]:
+        """Найстаріше повідомлення чату із заглушкою, але без результату"""
+        acked = self._acked.get(chat_id, [])
+        while acked and 'outcome' in self.messages[acked[0]]:
+            acked.pop(0)
+        return self.messages[acked[0]] if acked else None
+
+    def _first_unanswered(self, chat_id: int) -> Optional[dict]:
+        pending = self._unanswered.get(chat_id)
+        if not pending:
+            return None
+        key = pending.pop(0)
+        record = self.messages[key]
+        record['key'] = key
+        return record
+
+    def on_event(self, method: str, params: dict, message: dict):
+        now = time.monotonic()
+        chat_id = message['chat']['id']
+        text = params.get('text', '')
+        with self._lock:
+            if method == 'sendMessage':
+                if text.startswith(REJECTION_PREFIXES):
+                    record = self._first_unanswered(chat_id)
+                    if record:
+                        self._finish(record, 'rejected', now)
+                elif text.startswith('❌'):
+                    record = self._in_flight(chat_id) or self._first_unanswered(chat_id)
+                    if record:
+                        self._finish(record, 'error', now)
+                elif text.startswith(RESULT_PREFIX):
+                    # Відповідь з кешу; продовження довгого тексту заголовка не має
+                    if not self._in_flight(chat_id):
+                        record = self._first_unanswered(chat_id)
+                        if record:
+                            self._finish(record, 'ok', now)
+                elif self.first_name in text:
+                    record = self._first_unanswered(chat_id)
+                    if record:
+                        record['ack'] = now
+                        self._placeholders[chat_id, message['message_id']] = record['key']
+                        self._acked.setdefault(chat_id, []).append(record['key'])
+            elif method == 'editMessageText':
+                key = self._placeholders.get((chat_id, message['message_id']))
+                record = self.messages.get(key) if key else None
+                if record is None:
+                    return
+                if text.endswith(PROGRESS_SUFFIX):
+                    record.setdefault('first_progress', now)
+                elif text.startswith(RESULT_PREFIX):
+                    self._finish(record, 'ok', now)
+                elif text == NOT_RECOGNIZED_TEXT:
+                    self._finish(record, 'not_recognized', now)
+                elif text == UNAVAILABLE_TEXT:
+                    self._finish(record, 'unavailable', now)
+                elif text.startswith('❌'):
+                    self._finish(record, 'error', now)
+
+    def _finish(self, record: dict, outcome: str, now: float):
+        if 'outcome' in record:
+            return
+        record['outcome'] = outcome
+        record['done'] = now
+        self._finished += 1
+        if self.expected is not None and self._finished >= self.expected:
+            self.all_done.set()
+
+    def set_expected(self, expected: int):
+        with self._lock:
+            self.expected = expected
+            if self._finished >= expected:
+                self.all_done.set()
+
+    def report(self) -> Dict:
+        with self._lock:
+            records = list(self.messages.values())
+        outcomes: Dict[str, int] = {}
+        for record in records:
+            outcome = record.get('outcome', 'timeout')
+            outcomes[outcome] = outcomes.get(outcome, 0) + 1
+
+        latency = {}
+        for name, start, end in (('end_to_end', 'sent', 'done'), ('placeholder', 'sent', 'ack'),
+                                 ('first_progress', 'sent', 'first_progress')):
+            latency[name] = percentiles([r[end] - r[start] for r in records if end in r])
+        latency_by_kind = {
+            kind: percentiles([r['done'] - r['sent'] for r in records
+                               if r['kind'] == kind and r.get('outcome') == 'ok'])
+            for kind in MEDIA_KINDS
+        }
+        # Реальний час звуку за секунду роботи - наскільки бот встигає за потоком
+        finished = [r for r in records if r.get('outcome') == 'ok']
+        span = (max(r['done'] for r in finished) - min(r['sent'] for r in records)) if finished else 0
+        return {
+            'sent': len(records),
+            'outcomes': outcomes,
+            'error_rate': sum(v for k, v in outcomes.items() if k != 'ok') / max(1, len(records)),
+            'throughput_per_s': len(finished) / span if span else 0.0,
+            'audio_seconds_per_s': sum(r['seconds'] for r in finished) / span if span else 0.0,
+            'latency_s': latency,
+            'latency_by_kind_s': {k: v for k, v in latency_by_kind.items() if v}
+        }
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+def _free_port_range(count: int) -> int:
+    """Перший з count вільних портів поспіль (воркер N слухає базу + N)"""
+    for _ in range(50):
+        base = _free_port()
+        try:
+            for port in range(base, base + count):
+                with socket.socket() as sock:
+                    sock.bind(('127.0.0.1', port))
+        except OSError:
+            continue
+        return base
+    raise RuntimeError(f"Не знайдено {count} вільних портів поспіль")
+
+def _scrape(url: str) -> str:
+    try:
+        with urllib.request.urlopen(url, timeout=10) as response:
+            return response.read().decode('utf-8')
+    except Exception as e:
+        logger.warning(f"Не вдалося зчитати {url}: {e}")
+        return ''
+
+def _spawn(args: List[str], env: dict, log_path: str) -> subprocess.Popen:
+    log = open(log_path, 'wb')
+    try:
+        return subprocess.Popen([sys.executable] + args, cwd=PROJECT_DIR, env=env,
+                                stdout=log, stderr=subprocess.STDOUT)
+    finally:
+        log.close()
+
+def _stop(process: subprocess.Popen, timeout: float = 30.0):
+    if process.poll() is None:
+        process.send_signal(signal.SIGINT)
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            process.kill()
+            process.wait()
+
+def _tail(path: str, lines: int = 20) -> str:
+    with open(path, encoding='utf-8', errors='replace') as f:
+        return ''.join(f.readlines()[-lines:])
+
+def run(count: int = 200, rate: float = 10.0, chats: int = 100,
+        mix: Optional[Dict[str, float]] = None, durations: Tuple[int, ...] = (5, 20, 60),
+        repeat_ratio: float = 0.0, mode: str = 'inline', workers: int = 2,
+        speech_latency: float = 0.2, speech_error_rate: float = 0.0, speech_unknown_rate: float = 0.0,
+        api_latency: float = 0.0, drain_timeout: float = 300.0, extra_env: Optional[dict] = None,
+        ffmpeg_path: str = 'ffmpeg', seed: int = 0) -> Dict:
+    """Один прогін навантаження; повертає звіт"""
+    mix = mix or {'voice': 0.7, 'audio': 0.1, 'video': 0.1, 'video_note': 0.1}
+    rng = random.Random(seed)
+    logger.info("Підготовка фікстур...")
+    fixtures = build_fixtures(list(durations), ffmpeg_path)
+
+    tracker = _Tracker()
+    metrics_port = _free_port()
+    # У режимі черги етапи конвеєра рахують воркери, кожен на своєму порту
+    worker_metrics_port = _free_port_range(workers) if mode == 'queue' else 0
+    with tempfile.TemporaryDirectory() as workdir, \
+            FakeSpeechServer(latency=speech_latency, error_rate=speech_error_rate,
+                             unknown_rate=speech_unknown_rate, seed=seed) as speech_server, \
+            FakeTelegramServer(latency=api_latency, listener=tracker.on_event) as telegram:
+        for (kind, seconds), data in fixtures.items():
+            telegram.add_file(f'{kind}/{seconds}s', data)
+
+        env = dict(os.environ)
+        env.update({
+            'BOT_TOKEN': '0:loadtest',
+            'BOT_MODE': 'polling',
+            'TELEGRAM_API_URL': telegram.base_url,
+            'TELEGRAM_FILE_URL': telegram.base_file_url,
+            'RECOGNIZER_BACKEND': 'google',
+            'GOOGLE_SPEECH_ENDPOINT': speech_server.endpoint,
+            'TRANSCRIBE_MODE': mode,
+            'CACHE_DB_PATH': os.path.join(workdir, 'cache.db'),
+            'JOB_QUEUE_PATH': os.path.join(workdir, 'jobs.db'),
+            'JOURNAL_PATH': os.path.join(workdir, 'journal.db'),
+            'PROFILE_DIR': os.path.join(workdir, 'profiles'),
+            'METRICS_HOST': '127.0.0.1',
+            'METRICS_PORT': str(metrics_port),
+            'WORKER_METRICS_PORT': str(worker_metrics_port),
+            'FFMPEG_PATH': ffmpeg_path,
+        })
+        env.update(extra_env or {})
+
+        processes = [_spawn(['bot.py'], env, os.path.join(workdir, 'bot.log'))]
+        if mode == 'queue':
+            processes.append(_spawn(['worker.py', '--processes', str(workers)], env,
+                                    os.path.join(workdir, 'worker.log')))
+        try:
+            # Бот готовий, коли почав опитувати getUpdates
+            deadline = time.monotonic() + 60
+            while not telegram.requests.get('getUpdates'):
+                if processes[0].poll() is not None or time.monotonic() > deadline:
+                    raise RuntimeError("Бот не запустився:\n" + _tail(os.path.join(workdir, 'bot.log')))
+                time.sleep(0.1)
+
+            logger.info(f"Подаю {count} повідомлень з частотою {rate}/с...")
+            kinds = list(mix)
+            weights = [mix[kind] for kind in kinds]
+            started = time.monotonic()
+            previous_files: List[Tuple[str, int, str]] = []
+            for i in range(count):
+                delay = started + i / rate - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+                if previous_files and rng.random() < repeat_ratio:
+                    # Повтор уже надісланого файлу (пересилання) - перевірка кешу
+                    kind, seconds, unique_id = rng.choice(previous_files)
+                else:
+                    kind, seconds, unique_id = rng.choices(kinds, weights)[0], rng.choice(durations), None
+                chat_id = 1000 + rng.randrange(chats)
+                message = telegram.push_update(kind, chat_id, f'{kind}/{seconds}s', seconds,
+                                               file_unique_id=unique_id)
+                tracker.sent(chat_id, message['message_id'], kind, seconds)
+                previous_files.append((kind, seconds, message[kind]['file_unique_id']))
+            send_seconds = time.monotonic() - started
+
+            tracker.set_expected(count)
+            if not tracker.all_done.wait(drain_timeout):
+                logger.warning(f"Не всі повідомлення завершились за {drain_timeout} с")
+
+            ports = [metrics_port]
+            if mode == 'queue':
+                ports += [worker_metrics_port + index for index in range(workers)]
+            metrics_text = '\n'.join(_scrape(f'http://127.0.0.1:{port}/metrics') for port in ports)
+        finally:
+            for process in reversed(processes):
+                _stop(process)
+
+        report = tracker.report()
+        stages = histogram_quantiles(metrics_text, 'voicebot_stage_seconds', 'stage')
+        if report['outcomes'].get('ok') and 'recognition' not in stages:
+            # Без етапів звіт мовчки показав би лише затримки - це помилка прогону
+            logger.error("Гістограми етапів порожні, хоча розпізнавання завершувались: "
+                         f"перевірте /metrics на портах {ports}")
+        report.update({
+            'config': {'count': count, 'rate': rate, 'chats': chats, 'mix': mix,
+                       'durations': list(durations), 'repeat_ratio': repeat_ratio, 'mode': mode,
+                       'workers': workers, 'speech_latency': speech_latency,
+                       'speech_error_rate': speech_error_rate, 'api_latency': api_latency,
+                       'env': extra_env or {}},
+            'send_seconds': send_seconds,
+            'stages_s': stages,
+            'speech_api': {'requests': speech_server.requests, 'errors': speech_server.errors},
+            'bot_api': dict(telegram.requests)
+        })
+    return report
+
+def print_report(report: Dict):
+    print(f"Надіслано {report['sent']} повідомлень за {report['send_seconds']:.1f} с")
+    print(f"Пропускна здатність: {report['throughput_per_s']:.2f} повідомлень/с, "
+          f"{report['audio_seconds_per_s']:.1f} с аудіо/с")
+    outcomes = ', '.join(f"{name} {value} ({100 * value / max(1, report['sent']):.1f}%)"
+                         for name, value in sorted(report['outcomes'].items()))
+    print(f"Результати: {outcomes}; частка помилок {100 * report['error_rate']:.1f}%")
+
+    def row(name: str, stats: Dict[str, float], extra: str = ''):
+        if stats:
+            print(f"  {name:28s} p50 {stats['p50']:7.2f}  p95 {stats['p95']:7.2f}  "
+                  f"p99 {stats['p99']:7.2f} с{extra}")
+
+    print("Затримка:")
+    for name, stats in report['latency_s'].items():
+        row(name, stats)
+    for name, stats in report['latency_by_kind_s'].items():
+        row(f'end_to_end/{name}', stats)
+    if report['stages_s']:
+        print("Етапи (/metrics бота і воркерів):")
+        for name, stats in sorted(report['stages_s'].items()):
+            row(name, stats, f"  ({stats['count']:.0f})")
+    print(f"Speech API: запитів {report['speech_api']['requests']}, помилок {report['speech_api']['errors']}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Офлайн навантажувальний тест VoiceBot")
+    parser.add_argument('--count', type=int, default=200, help="Кількість повідомлень")
+    parser.add_argument('--rate', type=float, default=10.0, help="Повідомлень за секунду")
+    parser.add_argument('--chats', type=int, default=100, help="Кількість різних чатів")
+    parser.add_argument('--mix', default='voice=0.7,audio=0.1,video=0.1,video_note=0.1',
+                        help="Частки типів медіа")
+    parser.add_argument('--durations', default='5,20,60', help="Тривалості записів, с")
+    parser.add_argument('--repeat-ratio', type=float, default=0.0,
+                        help="Частка повторно надісланих файлів (перевірка кешу)")
+    parser.add_argument('--mode', choices=('inline', 'queue'), default='inline')
+    parser.add_argument('--workers', type=int, default=2, help="Процеси worker.py для режиму queue")
+    parser.add_argument('--speech-latency', type=float, default=0.2, help="Затримка Speech API, с")
+    parser.add_argument('--speech-error-rate', type=float, default=0.0, help="Частка відповідей 500")
+    parser.add_argument('--speech-unknown-rate', type=float, default=0.0, help="Частка порожніх результатів")
+    parser.add_argument('--api-latency', type=float, default=0.0, help="Затримка Bot API, с")
+    parser.add_argument('--drain-timeout', type=float, default=300.0,
+                        help="Скільки чекати на завершення після останнього повідомлення, с")
+    parser.add_argument('--env', action='append', default=[], metavar='KEY=VALUE',
+                        help="Змінна середовища для бота і воркерів")
+    parser.add_argument('--ffmpeg', default=os.getenv('FFMPEG_PATH', 'ffmpeg'))
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', help="Зберегти звіт у JSON-файл")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    mix = {}
+    for item in args.mix.split(','):
+        kind, _, share = item.partition('=')
+        if kind not in MEDIA_KINDS:
+            parser.error(f"Невідомий тип медіа: {kind}")
+        mix[kind] = float(share)
+    extra_env = dict(item.split('=', 1) for item in args.env)
+
+    report = run(count=args.count, rate=args.rate, chats=args.chats, mix=mix,
+                 durations=tuple(int(d) for d in args.durations.split(',')),
+                 repeat_ratio=args.repeat_ratio, mode=args.mode, workers=args.workers,
+                 speech_latency=args.speech_latency, speech_error_rate=args.speech_error_rate,
+                 speech_unknown_rate=args.speech_unknown_rate, api_latency=args.api_latency,
+                 drain_timeout=args.drain_timeout, extra_env=extra_env,
+                 ffmpeg_path=args.ffmpeg, seed=args.seed)
+    print_report(report)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+    if report['outcomes'].get('ok') and 'recognition' not in report['stages_s']:
+        return 1
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,113 @@
+import asyncio
+import logging
+from typing import BinaryIO, Optional
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+class DownloadTooLargeError(Exception):
+    """Файл більший за max_bytes, завантаження перервано"""
+
+class MediaDownloader:
+    """
+    Асинхронне завантаження медіафайлів з файлового сервера Telegram.
+
+    Усі завантаження йдуть через один спільний httpx-клієнт з пулом
+    keep-alive з'єднань, дані пишуться у призначення частинами, а кількість
+    одночасних завантажень обмежена семафором. Файл, більший за max_bytes,
+    не дочитується. Мережеві збої і відповіді 5xx повторюються до retries
+    разів, якщо призначення можна перемотати на початок.
+    """
+
+    def __init__(self, max_concurrent: int = 4, max_connections: int = 10,
+                 timeout: float = 60.0, connect_timeout: float = 10.0,
+                 chunk_size: int = 64 * 1024, max_bytes: Optional[int] = None,
+                 retries: int = 2, backoff: float = 0.5):
+        self.max_concurrent = max_concurrent
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        self.retries = retries
+        self.backoff = backoff
+
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._client: Optional[httpx.AsyncClient] = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        """Лінива ініціалізація спільного клієнта (всередині event loop)"""
+        if self._client is None or self._client.is_closed:
+            self._client = httpx.AsyncClient(
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                    keepalive_expiry=30.0
+                ),
+                timeout=httpx.Timeout(self.timeout, connect=self.connect_timeout),
+                follow_redirects=True
+            )
+        return self._client
+
+    async def warm_up(self, url: str):
+        """
+        Клієнт (SSL-контекст, сертифікати) і keep-alive з'єднання з сервером
+        url до першого завантаження. Статус відповіді не важливий.
+        """
+        parts = httpx.URL(url)
+        await self._get_client().head(f'{parts.scheme}://{parts.netloc.decode()}/')
+
+    async def download_to(self, url: str, destination: BinaryIO) -> int:
+        """
+        Потокове завантаження файлу у відкритий бінарний об'єкт
+
+        Returns:
+            int: Кількість записаних байтів
+
+        Raises:
+            DownloadTooLargeError: Файл більший за max_bytes
+        """
+        async with self._semaphore:
+            start = destination.tell() if destination.seekable() else None
+            attempt = 0
+            while True:
+                try:
+                    return await asyncio.wait_for(self._stream(url, destination), self.timeout)
+                except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                    if attempt >= self.retries or start is None or not self._is_retryable(e):
+                        raise
+                    attempt += 1
+                    delay = self.backoff * 2 ** (attempt - 1)
+                    # У тексті помилки httpx є URL з токеном бота - лише тип
+                    logger.warning(f"Збій завантаження ({type(e).__name__}), повтор {attempt} через {delay:.1f} с")
+                    destination.seek(start)
+                    destination.truncate()
+                    await asyncio.sleep(delay)
+
+    @staticmethod
+    def _is_retryable(error: Exception) -> bool:
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code >= 500
+        return True
+
+    async def _stream(self, url: str, destination: BinaryIO) -> int:
+        written = 0
+        client = self._get_client()
+        async with client.stream('GET', url) as response:
+            response.raise_for_status()
+            length = response.headers.get('Content-Length')
+            if self.max_bytes and length and length.isdigit() and int(length) > self.max_bytes:
+                raise DownloadTooLargeError(f"Файл {length} байт перевищує ліміт {self.max_bytes}")
+            async for chunk in response.aiter_bytes(self.chunk_size):
+                written += len(chunk)
+                if self.max_bytes and written > self.max_bytes:
+                    raise DownloadTooLargeError(f"Файл перевищує ліміт {self.max_bytes} байт")
+                destination.write(chunk)
+        return written
+
+    async def close(self):
+        """Закриття пулу з'єднань"""
+        if self._client is not None and not self._client.is_closed:
+            await self._client.aclose()
+        self._client = None
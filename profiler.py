@@ -0,0 +1,252 @@
+"""
+Профілювання завдань розпізнавання на вимогу.
+
+Частка sample_rate завдань виконується під семплюючим профайлером:
+фоновий потік кожні interval секунд знімає стеки всіх потоків процесу
+(event loop, пул розпізнавання), а tracemalloc на час завдання рахує
+виділення пам'яті. Одночасно профілюється не більше одного завдання, і
+решта часу профайлер нічого не робить, тож малу частку можна лишати
+ввімкненою в продакшені. Стеки знімаються з усього процесу, тому при
+паралельних завданнях у профіль потрапляє й їхня робота. Процеси пулу
+RECOGNITION_POOL=process і сам ffmpeg не семплюються (видно лише
+очікування на них).
+
+Для кожного завдання в каталозі звітів з'являються:
+- <час>-<n>-<завдання>.txt - гарячі функції і найбільші виділення пам'яті;
+- <час>-<n>-<завдання>.folded - стеки у форматі flamegraph.pl / speedscope.
+Сумарні гарячі функції всіх профільованих завдань процесу - у
+hot_functions-<pid>.txt. Знімок tracemalloc, його статистика і запис
+звітів виконуються в окремому потоці, щоб не зупиняти event loop.
+"""
+import collections
+import contextlib
+import itertools
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Counter, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Кадри, на яких потік просто чекає (вільний event loop, вільний воркер пулу)
+IDLE_FRAMES = {('selectors.py', 'select'), ('thread.py', '_worker'), ('threading.py', 'wait')}
+
+def _frame_label(code) -> str:
+    """Коротка назва функції: файл проекту відносно cwd, бібліотека - два останні компоненти шляху"""
+    path = code.co_filename
+    if os.path.isabs(path):
+        relative = os.path.relpath(path)
+        if relative.startswith('..') or 'site-packages' in relative:
+            relative = os.sep.join(path.split(os.sep)[-2:])
+        path = relative
+    return f'{path}:{code.co_name}'
+
+def hot_functions(stacks: Dict[Tuple[str, ...], int]) -> List[Tuple[str, int, int]]:
+    """
+    Функції за кількістю семплів
+
+    Returns:
+        List[Tuple[str, int, int]]: (функція, власні семпли, семпли разом з викликаними),
+            відсортовано за власними
+    """
+    own: Counter[str] = collections.Counter()
+    total: Counter[str] = collections.Counter()
+    for stack, count in stacks.items():
+        own[stack[-1]] += count
+        for label in set(stack):
+            total[label] += count
+    return sorted(((label, own[label], count) for label, count in total.items()),
+                  key=lambda item: (-item[1], -item[2], item[0]))
+
+class StackSampler:
+    """Фоновий потік, що кожні interval секунд знімає стеки всіх інших потоків"""
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 64):
+        self.interval = interval
+        self.max_depth = max_depth
+        # Стек від кореня до листа -> кількість семплів
+        self.stacks: Counter[Tuple[str, ...]] = collections.Counter()
+        self.samples = 0
+
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> 'StackSampler':
+        self._thread = threading.Thread(target=self._run, name='stack-sampler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            self.sample(own_id)
+
+    def sample(self, skip_thread: Optional[int] = None):
+        """Один семпл стеків усіх потоків, крім skip_thread"""
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == skip_thread:
+                continue
+            code = frame.f_code
+            if (os.path.basename(code.co_filename), code.co_name) in IDLE_FRAMES:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            self.stacks[tuple(reversed(stack))] += 1
+        self.samples += 1
+
+class JobProfiler:
+    """
+    Профілювання частки sample_rate завдань (0 - вимкнено).
+
+    sample_rate можна змінювати під час роботи (команда /profile у боті).
+    У каталозі directory зберігається не більше max_reports останніх
+    звітів завдань.
+    """
+
+    def __init__(self, directory: str = 'profiles', sample_rate: float = 0.0,
+                 interval: float = 0.005, trace_memory: bool = True, memory_frames: int = 10,
+                 top: int = 30, max_reports: int = 200):
+        self.directory = directory
+        self.sample_rate = sample_rate
+        self.interval = interval
+        self.trace_memory = trace_memory
+        self.memory_frames = memory_frames
+        self.top = top
+        self.max_reports = max_reports
+        self.jobs = 0
+
+        self._active = False
+        self._writer: Optional[threading.Thread] = None
+        self._sequence = itertools.count(1)
+        self._stacks: Counter[Tuple[str, ...]] = collections.Counter()
+
+    @property
+    def enabled(self) -> bool:
+        return self.sample_rate > 0
+
+    def _should_sample(self) -> bool:
+        return self.enabled and not self._active and random.random() < self.sample_rate
+
+    @contextlib.contextmanager
+    def profile(self, label: str):
+        """Профілювання блоку with, якщо завдання потрапило у вибірку"""
+        if not self._should_sample():
+            yield
+            return
+
+        self._active = True
+        own_tracing = self.trace_memory and not tracemalloc.is_tracing()
+        if own_tracing:
+            tracemalloc.start(self.memory_frames)
+        elif self.trace_memory:
+            tracemalloc.reset_peak()
+        sampler = StackSampler(self.interval).start()
+        started = time.perf_counter()
+        outcome = 'ok'
+        try:
+            yield
+        except BaseException as e:
+            outcome = type(e).__name__
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            sampler.stop()
+            peak = tracemalloc.get_traced_memory()[1] if self.trace_memory else 0
+            # Наступне завдання профілюється лише після запису цього звіту
+            self._writer = threading.Thread(
+                target=self._finish, args=(label, outcome, elapsed, sampler, own_tracing, peak),
+                name='profile-writer', daemon=True
+            )
+            self._writer.start()
+
+    def wait(self, timeout: Optional[float] = None):
+        """Очікування запису останнього звіту (перед завершенням процесу)"""
+        if self._writer is not None:
+            self._writer.join(timeout)
+
+    def _finish(self, label: str, outcome: str, elapsed: float, sampler: StackSampler,
+                own_tracing: bool, peak: int):
+        """Знімок пам'яті і звіт завдання у фоновому потоці"""
+        try:
+            snapshot = None
+            try:
+                if self.trace_memory:
+                    snapshot = tracemalloc.take_snapshot()
+            finally:
+                if own_tracing:
+                    tracemalloc.stop()
+            self._write(label, outcome, elapsed, sampler, snapshot, peak)
+        except Exception as e:
+            logger.error(f"Помилка запису профілю завдання {label}: {e}")
+        finally:
+            self._active = False
+
+    def _write(self, label: str, outcome: str, elapsed: float, sampler: StackSampler,
+               snapshot: Optional[tracemalloc.Snapshot], peak: int):
+        """Звіт завдання і оновлення сумарного звіту процесу"""
+        os.makedirs(self.directory, exist_ok=True)
+        self.jobs += 1
+        self._stacks.update(sampler.stacks)
+        name = f"{time.strftime('%Y%m%d-%H%M%S')}-{next(self._sequence):06d}-{label}"
+
+        with open(os.path.join(self.directory, f'{name}.folded'), 'w', encoding='utf-8') as f:
+            for stack, count in sampler.stacks.most_common():
+                f.write(f"{';'.join(stack)} {count}\n")
+
+        lines = [
+            f"Завдання: {label} ({outcome})",
+            f"Тривалість: {elapsed:.3f} с, семплів: {sampler.samples} "
+            f"(кожні {self.interval * 1000:.0f} мс)",
+        ]
+        if snapshot is not None:
+            lines.append(f"Пік пам'яті (tracemalloc): {peak / 2 ** 20:.1f} МБ")
+        lines += ['', *self._format_hot(sampler.stacks)]
+        if snapshot is not None:
+            snapshot = snapshot.filter_traces([
+                tracemalloc.Filter(False, tracemalloc.__file__),
+                tracemalloc.Filter(False, '<frozen importlib._bootstrap*>'),
+            ])
+            lines += ['', "Живі виділення пам'яті на кінець завдання (за рядком):"]
+            for stat in snapshot.statistics('lineno')[:self.top]:
+                frame = stat.traceback[0]
+                lines.append(f"{stat.size / 1024:10.1f} КБ {stat.count:8d} блоків  "
+                             f"{frame.filename}:{frame.lineno}")
+        with open(os.path.join(self.directory, f'{name}.txt'), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines) + '\n')
+
+        summary = [f"Профільованих завдань: {self.jobs}", '', *self._format_hot(self._stacks)]
+        with open(os.path.join(self.directory, f'hot_functions-{os.getpid()}.txt'), 'w',
+                  encoding='utf-8') as f:
+            f.write('\n'.join(summary) + '\n')
+
+        logger.info(f"Профіль завдання {label}: {elapsed:.2f} с, {sampler.samples} семплів -> {name}.txt")
+        self._prune()
+
+    def _format_hot(self, stacks: Dict[Tuple[str, ...], int]) -> List[str]:
+        samples = sum(stacks.values()) or 1
+        lines = ["Гарячі функції (власні % / разом з викликаними %):"]
+        for label, own, total in hot_functions(stacks)[:self.top]:
+            lines.append(f"{own / samples:7.1%} {total / samples:7.1%}  {label}")
+        return lines
+
+    def _prune(self):
+        """Видалення найстаріших звітів понад max_reports"""
+        reports = sorted(name for name in os.listdir(self.directory)
+                         if name.endswith('.txt') and not name.startswith('hot_functions-'))
+        for name in reports[:max(0, len(reports) - self.max_reports)]:
+            for path in (name, name[:-len('.txt')] + '.folded'):
+                try:
+                    os.remove(os.path.join(self.directory, path))
+                except FileNotFoundError:
+                    pass
@@ -0,0 +1,256 @@
+"""
+Статистична модель ком і кінців речень для UkrainianPunctuationProcessor.
+
+Модель - частоти розділових знаків між сусідніми словами корпусу для
+контекстів від триграми (попереднє, поточне, наступне слово) до окремих
+слів. Вона зберігається в компактному бінарному файлі: заголовок і масив
+слотів відкритої адресації з 64-бітними хешами контекстів замість рядків.
+Під час роботи файл відображається в пам'ять (numpy.memmap) один раз, тож
+воркери в окремих процесах ділять ті самі сторінки кешу ОС. Для кожного
+проміжку між словами береться найдовший контекст, що траплявся в корпусі
+не рідше min_count разів; невідомі контексти лишаються правилам.
+
+Файл створює train_punctuation.py з корпусу українських текстів.
+"""
+import hashlib
+import logging
+import struct
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'UAPUNCT\x00'
+VERSION = 1
+# magic, версія, min_count, кількість слотів
+HEADER = struct.Struct('<8sIII')
+HEADER_SIZE = 32
+SLOT_DTYPE = np.dtype([('key', '<u8'), ('comma', '<u2'), ('end', '<u2'), ('count', '<u4')])
+# Імовірності зберігаються як частки 65535
+PROBABILITY_SCALE = 65535
+# Заповненість таблиці не більше половини - короткі ланцюжки проб
+LOAD_FACTOR = 0.5
+
+# Слово на межі тексту, якого немає в корпусі
+BOUNDARY = '<s>'
+END_MARKS = '.!?…'
+COMMA_MARKS = ',;:'
+WORD_STRIP = '.,!?…;:"\'«»„“”()[]—–-'
+
+COMMA = 'comma'
+END = 'end'
+NONE = 'none'
+
+def normalize_word(token: str) -> str:
+    """Слово без розділових знаків на краях, у нижньому регістрі"""
+    return token.strip(WORD_STRIP).lower()
+
+def word_hash(word: str) -> int:
+    """Стабільний між процесами 64-бітний хеш слова"""
+    return int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little')
+
+_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+_SHIFT = np.uint64(32)
+# Окремі простори ключів для триграм, біграм і слів ліворуч/праворуч
+_SEEDS = [np.uint64(word_hash(f'<{order}>')) for order in ('3', '2', 'L', 'R')]
+
+def _combine(h: np.ndarray, x: np.ndarray) -> np.ndarray:
+    h = (h ^ x) * _MULTIPLIER
+    return h ^ (h >> _SHIFT)
+
+def context_keys(words: List[str]) -> np.ndarray:
+    """
+    Ключі контекстів для проміжків між сусідніми словами
+
+    Кожне слово хешується один раз, ключі контекстів змішуються з хешів
+    слів векторно. Перед першим словом стоїть BOUNDARY.
+
+    Returns:
+        np.ndarray: uint64 розміром (проміжків, 4) - триграма, біграма,
+            слово ліворуч, слово праворуч; 0 зарезервовано для порожнього слота
+    """
+    cache: Dict[str, int] = {}
+    hashes = np.array([cache[word] if word in cache else cache.setdefault(word, word_hash(word))
+                       for word in [BOUNDARY] + list(words)], dtype=np.uint64)
+    prev, word, next_word = hashes[:-2], hashes[1:-1], hashes[2:]
+    trigram, bigram, left, right = (np.full(len(word), seed, dtype=np.uint64) for seed in _SEEDS)
+    keys = np.stack([
+        _combine(_combine(_combine(trigram, prev), word), next_word),
+        _combine(_combine(bigram, word), next_word),
+        _combine(left, word),
+        _combine(right, next_word),
+    ], axis=1)
+    keys[keys == 0] = 1
+    return keys
+
+class NgramCounter:
+    """Підрахунок розділових знаків у проміжках між словами корпусу"""
+
+    def __init__(self):
+        # ключ контексту -> [проміжків, з комою, з кінцем речення]
+        self.counts: Dict[int, List[int]] = {}
+        self.gaps = 0
+
+    def add_text(self, text: str):
+        """Текст з розділовими знаками; порожній рядок (новий абзац) завершує речення"""
+        for paragraph in text.split('\n\n'):
+            words: List[str] = []
+            marks: List[str] = []
+            for token in paragraph.split():
+                word = normalize_word(token)
+                if not word:
+                    # Окреме тире або три крапки належать попередньому слову
+                    if marks and marks[-1] == NONE:
+                        marks[-1] = self._mark(token)
+                    continue
+                words.append(word)
+                marks.append(self._mark(token))
+            self._add_words(words, marks)
+
+    @staticmethod
+    def _mark(token: str) -> str:
+        tail = token[len(token.rstrip(WORD_STRIP)):]
+        if any(mark in tail for mark in END_MARKS):
+            return END
+        if any(mark in tail for mark in COMMA_MARKS + '—–'):
+            return COMMA
+        return NONE
+
+    def _add_words(self, words: List[str], marks: List[str]):
+        if len(words) < 2:
+            return
+        counts = self.counts
+        for row, mark in zip(context_keys(words).tolist(), marks):
+            comma, end = mark == COMMA, mark == END
+            for key in row:
+                entry = counts.get(key)
+                if entry is None:
+                    entry = counts[key] = [0, 0, 0]
+                entry[0] += 1
+                entry[1] += comma
+                entry[2] += end
+        self.gaps += len(words) - 1
+
+def build_table(counts: Dict[int, List[int]], min_count: int = 3) -> np.ndarray:
+    """Масив слотів з лінійним пробуванням для контекстів, що трапились не рідше min_count разів"""
+    entries = [(key, entry) for key, entry in counts.items() if entry[0] >= min_count]
+    slots = 1
+    while slots * LOAD_FACTOR < max(1, len(entries)):
+        slots *= 2
+    table = np.zeros(slots, dtype=SLOT_DTYPE)
+    mask = slots - 1
+    for key, (total, comma, end) in entries:
+        index = key & mask
+        while table['key'][index]:
+            index = (index + 1) & mask
+        table[index] = (key, round(comma / total * PROBABILITY_SCALE),
+                        round(end / total * PROBABILITY_SCALE), min(total, 2 ** 32 - 1))
+    return table
+
+def write_model(path: str, table: np.ndarray, min_count: int):
+    """Збереження таблиці у файл моделі"""
+    with open(path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, min_count, len(table)).ljust(HEADER_SIZE, b'\0'))
+        f.write(table.tobytes())
+
+class PunctuationModel:
+    """
+    Відображена в пам'ять таблиця моделі і рішення для проміжків між словами.
+
+    Кома ставиться, якщо її частка в контексті не менша за comma_threshold,
+    кінець речення - якщо не менша за end_threshold.
+    """
+
+    def __init__(self, path: str, comma_threshold: float = 0.5, end_threshold: float = 0.5):
+        self.path = path
+        self.comma_threshold = comma_threshold
+        self.end_threshold = end_threshold
+
+        with open(path, 'rb') as f:
+            magic, version, self.min_count, slots = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} не є моделлю розділових знаків версії {VERSION}")
+        if slots & (slots - 1):
+            raise ValueError(f"Пошкоджена модель {path}: {slots} слотів")
+        table = np.memmap(path, dtype=SLOT_DTYPE, mode='r', offset=HEADER_SIZE, shape=(slots, ))
+        # Звичайні ndarray-представлення полів того самого відображення (без копіювання)
+        self._keys = np.asarray(table['key'])
+        self._comma = np.asarray(table['comma'])
+        self._end = np.asarray(table['end'])
+        self._count = np.asarray(table['count'])
+        self._mask = slots - 1
+        logger.info(f"Модель розділових знаків {path}: {slots} слотів")
+
+    def _find(self, keys: np.ndarray) -> np.ndarray:
+        """Слоти ключів (-1 - ключа немає); лінійне пробування для всіх ключів разом"""
+        index = (keys & np.uint64(self._mask)).astype(np.intp)
+        found = np.full(len(keys), -1, dtype=np.intp)
+        pending = np.arange(len(keys))
+        while pending.size:
+            slot_keys = self._keys[index[pending]]
+            hit = slot_keys == keys[pending]
+            found[pending[hit]] = index[pending[hit]]
+            pending = pending[~hit & (slot_keys != 0)]
+            index[pending] = (index[pending] + 1) & self._mask
+        return found
+
+    def _predict(self, keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Частки коми і кінця речення для проміжків з ключами context_keys
+
+        Береться триграма, інакше біграма, інакше впевненіше з окремих слів
+        ліворуч і праворуч - серед контекстів, що трапились не рідше min_count.
+
+        Returns:
+            Tuple: (контекст відомий, частка ком, частка кінців речення) - масиви по проміжках
+        """
+        found = self._find(keys.ravel()).reshape(-1, 4)
+        slots = np.maximum(found, 0)
+        known = (found >= 0) & (self._count[slots] >= self.min_count)
+        comma = self._comma[slots] / PROBABILITY_SCALE
+        end = self._end[slots] / PROBABILITY_SCALE
+
+        confidence = np.maximum(np.maximum(comma, end), 1 - comma - end)
+        unigram = np.where(known[:, 2] & (~known[:, 3] | (confidence[:, 2] >= confidence[:, 3])), 2, 3)
+        choice = np.where(known[:, 0], 0, np.where(known[:, 1], 1, unigram))
+        rows = np.arange(len(keys))
+        return known[rows, choice], comma[rows, choice], end[rows, choice]
+
+    def predict(self, prev: str, word: str, next_word: str) -> Optional[Tuple[float, float]]:
+        """
+        Частки коми і кінця речення між word і next_word
+
+        Returns:
+            Optional[Tuple[float, float]]: None, якщо контекст невідомий
+        """
+        known, comma, end = self._predict(context_keys([prev, word, next_word])[1:])
+        return (float(comma[0]), float(end[0])) if known[0] else None
+
+    def decide(self, words: Iterable[str]) -> List[Optional[str]]:
+        """
+        Рішення для кожного проміжку між сусідніми словами за один прохід
+
+        Returns:
+            List[Optional[str]]: 'comma', 'end', 'none' або None (контекст невідомий)
+        """
+        words = [normalize_word(word) or word for word in words]
+        if len(words) < 2:
+            return []
+        known, comma, end = self._predict(context_keys(words))
+        is_end = end >= self.end_threshold
+        is_comma = comma >= self.comma_threshold
+        return [None if not k else END if e else COMMA if c else NONE
+                for k, e, c in zip(known.tolist(), is_end.tolist(), is_comma.tolist())]
+
+    def warm_up(self) -> int:
+        """
+        Читання всієї таблиці, щоб сторінки файлу були в пам'яті до першого запиту
+
+        Returns:
+            int: Кількість збережених контекстів
+        """
+        return int(np.count_nonzero(self._keys))
+
+    def close(self):
+        self._keys = self._comma = self._end = self._count = None
@@ -0,0 +1,140 @@
+import asyncio
+import functools
+import heapq
+import itertools
+import logging
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class QueueFullError(Exception):
+    """Черга пулу переповнена, нову задачу не прийнято"""
+
+class BoundedExecutor:
+    """
+    Пул потоків або процесів для блокуючих задач з обмеженою чергою.
+
+    Event loop лише передає задачі в пул і чекає на результат. Якщо всі
+    воркери зайняті і черга заповнена, нова задача відхиляється з
+    QueueFullError, щоб бот міг одразу відповісти "зайнятий". Задачі вже
+    прийнятого завдання (наприклад, сегменти одного файлу) можуть замість
+    цього чекати на вільного воркера (block=True). Такі задачі чекають у
+    купі за пріоритетом (менший - раніше, за рівного - FIFO) і передаються
+    в пул лише на вільного воркера, тож нова коротка задача обганяє
+    решту сегментів довгого файлу.
+    Лічильники змінюються тільки з потоку event loop.
+    """
+
+    def __init__(self, max_workers: int = 4, max_queue: int = 16, kind: str = 'thread'):
+        if kind not in ('thread', 'process'):
+            raise ValueError(f"Невідомий тип пулу: {kind}")
+
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.kind = kind
+
+        if kind == 'process':
+            self._executor: Executor = ProcessPoolExecutor(max_workers=max_workers)
+        else:
+            self._executor = ThreadPoolExecutor(max_workers=max_workers,
+                                                thread_name_prefix='recognition')
+        self._pending = 0
+        self._waiters: List[Tuple[float, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    @property
+    def pending(self) -> int:
+        """Кількість задач, що вже отримали воркера (у роботі, без тих, що чекають)"""
+        return self._pending
+
+    @property
+    def idle_workers(self) -> int:
+        """Кількість вільних воркерів"""
+        return max(0, self.max_workers - self._pending)
+
+    @property
+    def queue_depth(self) -> int:
+        """Кількість задач, що чекають на вільного воркера"""
+        waiting = sum(1 for _, _, future in self._waiters if not future.done())
+        return waiting + max(0, self._pending - self.max_workers)
+
+    @property
+    def is_full(self) -> bool:
+        """Черга заповнена: задач, що чекають на воркера, не менше max_queue"""
+        return self.queue_depth >= self.max_queue
+
+    async def run(self, func: Callable, *args, block: bool = False, priority: float = 0.0,
+                  timeout: Optional[float] = None, **kwargs):
+        """
+        Виконання функції в пулі
+
+        Для пулу процесів func та аргументи мають підтримувати pickle.
+        Якщо очікування перервано (тайм-аут або скасування), воркер
+        вважається зайнятим, доки функція справді не завершиться.
+
+        Args:
+            block: Чекати на вільного воркера замість відмови
+            priority: Порядок серед задач, що чекають (менший - раніше)
+            timeout: Скільки чекати на результат після старту задачі
+
+        Raises:
+            QueueFullError: Якщо черга пулу заповнена і block=False
+            asyncio.TimeoutError: Якщо задача не завершилась за timeout
+        """
+        if block:
+            await self._acquire(priority)
+        elif self.is_full:
+            raise QueueFullError(f"Черга пулу заповнена ({self.queue_depth}/{self.max_queue})")
+        else:
+            self._pending += 1
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(self._executor, functools.partial(func, *args, **kwargs))
+        except BaseException:
+            self._release()
+            raise
+        try:
+            return await asyncio.wait_for(asyncio.shield(future), timeout)
+        finally:
+            if future.done():
+                self._release()
+            else:
+                future.add_done_callback(self._release_abandoned)
+
+    def _release_abandoned(self, future: asyncio.Future):
+        # Результат уже нікому не потрібен, але виняток треба забрати
+        if not future.cancelled():
+            future.exception()
+        self._release()
+
+    def _release(self):
+        self._pending -= 1
+        self._wake()
+
+    async def _acquire(self, priority: float):
+        """Очікування вільного воркера в порядку пріоритету"""
+        if self._pending < self.max_workers and not self._waiters:
+            self._pending += 1
+            return
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Місце вже видали, але задачу скасували - віддаємо його наступній
+            if future.done() and not future.cancelled():
+                self._release()
+            raise
+
+    def _wake(self):
+        """Видача звільнених місць задачам з найменшим пріоритетом"""
+        while self._waiters and self._pending < self.max_workers:
+            _, _, future = heapq.heappop(self._waiters)
+            if future.done():
+                continue
+            self._pending += 1
+            future.set_result(None)
+
+    def shutdown(self, wait: bool = True):
+        self._executor.shutdown(wait=wait, cancel_futures=True)
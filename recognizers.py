@@ -0,0 +1,152 @@
+import http.client
+import json
+import logging
+import threading
+import urllib.parse
+from collections import deque
+from typing import Dict, Optional
+
+import speech_recognition as sr
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_ENDPOINT = 'http://www.google.com/speech-api/v2/recognize'
+
+class RecognizerBackend:
+    """
+    Базовий клас бекенда розпізнавання мови.
+
+    recognize() блокуючий і виконується в пулі воркерів. Як і
+    speech_recognition, бекенди повідомляють про нерозбірливе аудіо через
+    sr.UnknownValueError, а про помилки сервісу - через sr.RequestError.
+    Для пулу процесів бекенд має підтримувати pickle.
+    """
+
+    name = 'base'
+
+    def __init__(self, language: str = 'uk-UA'):
+        self.language = language
+
+    def recognize(self, audio: sr.AudioData) -> str:
+        raise NotImplementedError
+
+    def warm_up(self):
+        """Підготовка до першого виклику (з'єднання, моделі), блокуюча"""
+
+class GoogleBackend(RecognizerBackend):
+    """Безкоштовний Google Speech API через speech_recognition"""
+
+    name = 'google'
+
+    def __init__(self, language: str = 'uk-UA', endpoint: str = GOOGLE_ENDPOINT,
+                 timeout: Optional[float] = None):
+        super().__init__(language)
+        self.endpoint = endpoint
+        self.recognizer = sr.Recognizer()
+        self.recognizer.operation_timeout = timeout
+
+    def recognize(self, audio: sr.AudioData) -> str:
+        try:
+            return self.recognizer.recognize_google(audio, language=self.language,
+                                                    endpoint=self.endpoint)
+        except OSError as e:
+            # Тайм-аут читання відповіді speech_recognition не перетворює на RequestError
+            raise sr.RequestError(f"Помилка з'єднання з Google Speech API: {e!r}") from e
+
+    def warm_up(self):
+        """
+        Пробне з'єднання з сервісом: DNS-запис і (для https) сертифікати
+        готові до першого запиту. speech_recognition відкриває нове
+        з'єднання на кожен запит, тож саме з'єднання не зберігається.
+        """
+        parts = urllib.parse.urlsplit(self.endpoint)
+        connection_class = (http.client.HTTPSConnection if parts.scheme == 'https'
+                            else http.client.HTTPConnection)
+        connection = connection_class(parts.hostname, parts.port,
+                                      timeout=self.recognizer.operation_timeout or 10)
+        try:
+            connection.connect()
+        finally:
+            connection.close()
+
+# Моделі Vosk займають сотні мегабайт, тому завантажуються один раз на процес
+_vosk_models: Dict[str, object] = {}
+_vosk_lock = threading.Lock()
+
+class VoskBackend(RecognizerBackend):
+    """Офлайн-розпізнавання на CPU через Vosk (потрібен пакет vosk і модель)"""
+
+    name = 'vosk'
+
+    def __init__(self, model_path: str, language: str = 'uk-UA'):
+        super().__init__(language)
+        self.model_path = model_path
+
+    def _model(self):
+        model = _vosk_models.get(self.model_path)
+        if model is None:
+            with _vosk_lock:
+                model = _vosk_models.get(self.model_path)
+                if model is None:
+                    try:
+                        import vosk
+                    except ImportError:
+                        raise sr.RequestError("Пакет vosk не встановлено (pip install vosk)")
+                    vosk.SetLogLevel(-1)
+                    logger.info(f"Завантаження моделі Vosk з {self.model_path}")
+                    model = vosk.Model(self.model_path)
+                    _vosk_models[self.model_path] = model
+        return model
+
+    def warm_up(self):
+        """Завантаження моделі до першого запису"""
+        self._model()
+
+    def recognize(self, audio: sr.AudioData) -> str:
+        import vosk
+
+        # Модель спільна, а KaldiRecognizer має стан - створюємо на кожен виклик
+        recognizer = vosk.KaldiRecognizer(self._model(), audio.sample_rate)
+        recognizer.AcceptWaveform(audio.get_raw_data(convert_width=2))
+        text = json.loads(recognizer.FinalResult()).get('text', '')
+        if not text:
+            raise sr.UnknownValueError()
+        return text
+
+BACKENDS = {
+    GoogleBackend.name: GoogleBackend,
+    VoskBackend.name: VoskBackend
+}
+
+def create_backend(name: str, **options) -> RecognizerBackend:
+    """Створення бекенда за назвою з конфігурації"""
+    backend_class = BACKENDS.get(name)
+    if backend_class is None:
+        raise ValueError(f"Невідомий бекенд розпізнавання: {name}")
+    return backend_class(**options)
+
+class LatencyStats:
+    """Статистика затримки бекенда за останні N викликів"""
+
+    def __init__(self, window: int = 200):
+        self._latencies = deque(maxlen=window)
+        self.calls = 0
+        self.errors = 0
+
+    def record(self, latency: float, error: bool = False):
+        self.calls += 1
+        if error:
+            self.errors += 1
+        self._latencies.append(latency)
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self._latencies:
+            return None
+        ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def summary(self) -> str:
+        if not self._latencies:
+            return "немає даних"
+        return (f"викликів {self.calls}, помилок {self.errors}, "
+                f"p50 {self.percentile(0.5):.2f} с, p95 {self.percentile(0.95):.2f} с")
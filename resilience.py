@@ -0,0 +1,291 @@
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import speech_recognition as sr
+
+from metrics import REGISTRY
+from recognizers import LatencyStats, RecognizerBackend
+
+logger = logging.getLogger(__name__)
+
+BACKEND_SECONDS = REGISTRY.histogram(
+    'voicebot_backend_seconds', 'Тривалість одного виклику бекенда розпізнавання', ['backend']
+)
+BACKEND_CALLS = REGISTRY.counter(
+    'voicebot_backend_calls_total',
+    'Виклики бекендів за результатом (ok, unknown, error, timeout, hedged, hedge_skipped, circuit_open)',
+    ['backend', 'outcome']
+)
+CIRCUIT_TRANSITIONS = REGISTRY.counter(
+    'voicebot_circuit_transitions_total', 'Зміни стану запобіжників бекендів', ['backend', 'state']
+)
+
+def _timed_recognize(backend: RecognizerBackend,
+                     audio: sr.AudioData) -> Tuple[Optional[str], Optional[Exception], float]:
+    """
+    Виклик бекенда у воркері пулу
+
+    Тривалість вимірюється всередині воркера, тож очікування вільного місця
+    в пулі не потрапляє в статистику затримки бекенда.
+
+    Returns:
+        Tuple: (текст, виняток бекенда, тривалість виклику в секундах)
+    """
+    started = time.perf_counter()
+    try:
+        return backend.recognize(audio), None, time.perf_counter() - started
+    except Exception as e:
+        return None, e, time.perf_counter() - started
+
+class CircuitOpenError(sr.RequestError):
+    """Запобіжник бекенда розімкнено, виклик не виконувався"""
+
+class CircuitBreaker:
+    """
+    Запобіжник бекенда за часткою помилок у ковзному вікні.
+
+    Замкнений пропускає всі виклики. Якщо за window секунд було не менше
+    min_calls викликів і частка помилок досягла failure_rate, запобіжник
+    розмикається і cooldown секунд відхиляє виклики одразу. Після цього
+    пропускається один пробний виклик: успіх замикає запобіжник, помилка
+    знову розмикає.
+    """
+
+    CLOSED = 'closed'
+    HALF_OPEN = 'half_open'
+    OPEN = 'open'
+    STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, name: str, failure_rate: float = 0.5, min_calls: int = 10,
+                 window: float = 60.0, cooldown: float = 30.0):
+        self.name = name
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.window = window
+        self.cooldown = cooldown
+
+        self.state = self.CLOSED
+        self._calls = deque()
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe = False
+
+    def allow(self) -> bool:
+        """Чи можна виконати виклик зараз"""
+        if self.state == self.CLOSED:
+            return True
+        if self.state == self.OPEN:
+            if time.monotonic() - self._opened_at < self.cooldown:
+                return False
+            self._set_state(self.HALF_OPEN)
+        if self._probe:
+            return False
+        self._probe = True
+        return True
+
+    def record(self, ok: Optional[bool]):
+        """Результат виклику (None - виклик скасовано, результат невідомий)"""
+        if self.state == self.HALF_OPEN:
+            if ok is None:
+                self._probe = False
+            elif ok:
+                self._reset()
+                self._set_state(self.CLOSED)
+            else:
+                self._open()
+            return
+        if ok is None or self.state == self.OPEN:
+            return
+
+        now = time.monotonic()
+        self._calls.append((now, ok))
+        if not ok:
+            self._failures += 1
+        while self._calls and self._calls[0][0] < now - self.window:
+            if not self._calls.popleft()[1]:
+                self._failures -= 1
+        if len(self._calls) >= self.min_calls and self._failures / len(self._calls) >= self.failure_rate:
+            logger.warning(f"Бекенд {self.name}: {self._failures} помилок з {len(self._calls)} викликів")
+            self._open()
+
+    def _open(self):
+        self._opened_at = time.monotonic()
+        self._reset()
+        self._set_state(self.OPEN)
+
+    def _reset(self):
+        self._calls.clear()
+        self._failures = 0
+        self._probe = False
+
+    def _set_state(self, state: str):
+        if state != self.state:
+            logger.warning(f"Запобіжник бекенда {self.name}: {self.state} -> {state}")
+            CIRCUIT_TRANSITIONS.inc(backend=self.name, state=state)
+        self.state = state
+
+class ResilientRecognizer:
+    """
+    Виклик бекендів розпізнавання з захистом від повільного або
+    недоступного сервісу.
+
+    Кожна спроба обмежена дедлайном. Помилки сервісу повторюються
+    retries разів із затримкою з повним джитером. Якщо задано
+    hedge_percentile, то спроба, що триває довше за цей перцентиль
+    затримки бекенда, дублюється, і береться перша відповідь; дубль не
+    відправляється, якщо в пулі немає вільного воркера (idle_workers),
+    щоб не додавати навантаження вже перевантаженому пулу. Кожен бекенд
+    має свій CircuitBreaker: поки він розімкнений, виклики одразу
+    переходять до наступного бекенда зі списку (резервного).
+    Нерозбірливе аудіо (sr.UnknownValueError) - нормальна відповідь, вона
+    не повторюється і не рахується помилкою.
+    """
+
+    def __init__(self, backends: List[RecognizerBackend], run: Callable[..., Awaitable],
+                 deadline: Optional[float] = 30.0, retries: int = 2, backoff: float = 0.5,
+                 max_backoff: float = 8.0, hedge_percentile: Optional[float] = None,
+                 hedge_min_samples: int = 20, breaker_options: Optional[dict] = None,
+                 idle_workers: Optional[Callable[[], int]] = None):
+        if not backends:
+            raise ValueError("Потрібен хоча б один бекенд розпізнавання")
+
+        self.backends = backends
+        # BoundedExecutor.run або сумісна функція
+        self._run = run
+        # BoundedExecutor.idle_workers або сумісна функція (None - дублювати завжди)
+        self._idle_workers = idle_workers
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+
+        self.breakers: Dict[str, CircuitBreaker] = {
+            backend.name: CircuitBreaker(backend.name, **(breaker_options or {}))
+            for backend in backends
+        }
+        self.latency: Dict[str, LatencyStats] = {backend.name: LatencyStats() for backend in backends}
+
+    @property
+    def name(self) -> str:
+        return self.backends[0].name
+
+    def circuit_states(self) -> Dict[tuple, int]:
+        """Стан запобіжників для метрик: 0 - замкнено, 1 - пробний виклик, 2 - розімкнено"""
+        return {(name, ): CircuitBreaker.STATE_VALUES[breaker.state]
+                for name, breaker in self.breakers.items()}
+
+    async def recognize(self, audio: sr.AudioData, priority: float = 0.0) -> str:
+        """
+        Розпізнавання сегмента першим доступним бекендом
+
+        Raises:
+            sr.UnknownValueError: Мовлення не розпізнано
+            sr.RequestError: Усі бекенди недоступні
+        """
+        last_error: Optional[Exception] = None
+        for backend in self.backends:
+            breaker = self.breakers[backend.name]
+            for attempt in range(self.retries + 1):
+                if not breaker.allow():
+                    BACKEND_CALLS.inc(backend=backend.name, outcome='circuit_open')
+                    last_error = CircuitOpenError(f"Запобіжник бекенда {backend.name} розімкнено")
+                    break
+                try:
+                    return await self._hedged_call(backend, breaker, audio, priority)
+                except sr.UnknownValueError:
+                    raise
+                except Exception as e:
+                    last_error = e
+                    if attempt < self.retries:
+                        delay = random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+                        logger.warning(f"Бекенд {backend.name}: {e!r}, "
+                                       f"повтор {attempt + 1}/{self.retries} через {delay:.2f} с")
+                        await asyncio.sleep(delay)
+            if backend is not self.backends[-1]:
+                logger.warning(f"Бекенд {backend.name} недоступний, перехід на наступний")
+
+        if isinstance(last_error, sr.RequestError):
+            raise last_error
+        raise sr.RequestError(f"Бекенди розпізнавання недоступні: {last_error!r}")
+
+    def _hedge_delay(self, backend: RecognizerBackend) -> Optional[float]:
+        if self.hedge_percentile is None:
+            return None
+        stats = self.latency[backend.name]
+        if stats.calls < self.hedge_min_samples:
+            return None
+        return stats.percentile(self.hedge_percentile)
+
+    async def _hedged_call(self, backend: RecognizerBackend, breaker: CircuitBreaker,
+                           audio: sr.AudioData, priority: float) -> str:
+        """Спроба з можливим дублюванням після перцентиля затримки"""
+        tasks = [asyncio.ensure_future(self._attempt(backend, breaker, audio, priority))]
+        try:
+            hedge_delay = self._hedge_delay(backend)
+            if hedge_delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=hedge_delay)
+                if not done and self._idle_workers is not None and self._idle_workers() <= 0:
+                    BACKEND_CALLS.inc(backend=backend.name, outcome='hedge_skipped')
+                elif not done and breaker.allow():
+                    BACKEND_CALLS.inc(backend=backend.name, outcome='hedged')
+                    tasks.append(asyncio.ensure_future(self._attempt(backend, breaker, audio, priority)))
+
+            error: Optional[BaseException] = None
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return task.result()
+                    if isinstance(task.exception(), sr.UnknownValueError):
+                        raise task.exception()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+
+    async def _attempt(self, backend: RecognizerBackend, breaker: CircuitBreaker,
+                       audio: sr.AudioData, priority: float) -> str:
+        """Один виклик бекенда в пулі з дедлайном (відлічується від старту у воркері)"""
+        stats = self.latency[backend.name]
+        try:
+            text, error, elapsed = await self._run(_timed_recognize, backend, audio, block=True,
+                                                   priority=priority, timeout=self.deadline)
+        except asyncio.CancelledError:
+            breaker.record(None)
+            raise
+        except asyncio.TimeoutError:
+            breaker.record(False)
+            stats.record(self.deadline, error=True)
+            BACKEND_SECONDS.observe(self.deadline, backend=backend.name)
+            BACKEND_CALLS.inc(backend=backend.name, outcome='timeout')
+            raise sr.RequestError(f"Бекенд {backend.name} не відповів за {self.deadline} с") from None
+        except Exception:
+            # Помилка самого пулу, а не бекенда - без тривалості виклику
+            breaker.record(False)
+            BACKEND_CALLS.inc(backend=backend.name, outcome='error')
+            raise
+
+        BACKEND_SECONDS.observe(elapsed, backend=backend.name)
+        if isinstance(error, sr.UnknownValueError):
+            breaker.record(True)
+            stats.record(elapsed)
+            BACKEND_CALLS.inc(backend=backend.name, outcome='unknown')
+            raise error
+        if error is not None:
+            breaker.record(False)
+            stats.record(elapsed, error=True)
+            BACKEND_CALLS.inc(backend=backend.name, outcome='error')
+            raise error
+        breaker.record(True)
+        stats.record(elapsed)
+        BACKEND_CALLS.inc(backend=backend.name, outcome='ok')
+        return text
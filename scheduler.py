@@ -0,0 +1,169 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_current_ticket: contextvars.ContextVar = contextvars.ContextVar('voicebot_ticket', default=None)
+
+class SchedulingRejected(Exception):
+    """Завдання не прийнято планувальником"""
+
+    def __init__(self, reason: str, message: str):
+        super().__init__(message)
+        # budget, too_long, chat_quota або user_quota
+        self.reason = reason
+
+class Ticket:
+    """Прийняте завдання: пріоритет і зарезервована частка бюджету"""
+
+    __slots__ = ('chat_id', 'user_id', 'duration', 'penalty', 'priority', 'released')
+
+    def __init__(self, chat_id: Hashable, user_id: Hashable, duration: float, penalty: float,
+                 priority: float):
+        self.chat_id = chat_id
+        self.user_id = user_id
+        self.duration = duration
+        # Штраф до пріоритету за завдання понад квоту чату або користувача
+        self.penalty = penalty
+        self.priority = priority
+        self.released = False
+
+class DurationScheduler:
+    """
+    Планування розпізнавання за тривалістю медіа.
+
+    Пріоритет завдання - тривалість плюс aging_rate * час прийняття, тобто
+    коротші записи йдуть раніше, а довгий запис, що чекав duration /
+    aging_rate секунд, вже не поступається новим. Пріоритет статичний,
+    тому його можна один раз передати в BoundedExecutor для всіх
+    сегментів завдання.
+
+    Відхиляються завдання понад загальний бюджет секунд аудіо в обробці.
+    Квоти одночасних завдань на чат і на користувача дворівневі: понад
+    м'яку (max_jobs_per_*) кожне завдання лише отримує overquota_penalty
+    секунд до пріоритету, тож активний чат не витісняє інших, але його
+    записи все одно будуть розпізнані; понад жорстку (hard_jobs_per_*)
+    завдання відхиляється, тож один чат не займе весь бюджет.
+
+    Якщо частина завдань живе поза планувальником (режим черги: квиток
+    звільняється одразу після постановки в JobQueue), backlog(chat_id,
+    user_id) повертає їхні секунди аудіо і кількість на чат і
+    користувача, і вони враховуються в бюджеті та квотах.
+    """
+
+    def __init__(self, aging_rate: float = 1.0, max_queued_seconds: float = 3600.0,
+                 max_jobs_per_chat: int = 5, max_jobs_per_user: int = 3,
+                 hard_jobs_per_chat: int = 20, hard_jobs_per_user: int = 10,
+                 default_duration: float = 60.0, overquota_penalty: float = 600.0,
+                 backlog: Optional[Callable[[Hashable, Hashable], Tuple[float, int, int]]] = None):
+        self.aging_rate = aging_rate
+        self.max_queued_seconds = max_queued_seconds
+        self.max_jobs_per_chat = max_jobs_per_chat
+        self.max_jobs_per_user = max_jobs_per_user
+        self.hard_jobs_per_chat = hard_jobs_per_chat
+        self.hard_jobs_per_user = hard_jobs_per_user
+        self.default_duration = default_duration
+        self.overquota_penalty = overquota_penalty
+        # JobQueue.backlog або сумісна функція (None - усі завдання в цьому процесі)
+        self.backlog = backlog
+
+        self.queued_seconds = 0.0
+        self.jobs = 0
+        self._per_chat: Dict[Hashable, int] = {}
+        self._per_user: Dict[Hashable, int] = {}
+
+    def admit(self, chat_id: Hashable, user_id: Hashable, duration: Optional[float]) -> Ticket:
+        """
+        Прийняття завдання
+
+        Raises:
+            SchedulingRejected: Якщо запис довший за бюджет, бюджет вичерпано
+                або перевищено жорстку квоту чату чи користувача
+        """
+        duration = float(duration or self.default_duration)
+        if duration > self.max_queued_seconds:
+            raise SchedulingRejected('too_long', f"Запис {duration:.0f} с довший за бюджет")
+
+        queued_seconds = self.queued_seconds
+        chat_jobs = self._per_chat.get(chat_id, 0)
+        user_jobs = self._per_user.get(user_id, 0)
+        if self.backlog is not None:
+            backlog_seconds, backlog_chat, backlog_user = self.backlog(chat_id, user_id)
+            queued_seconds += backlog_seconds
+            chat_jobs += backlog_chat
+            user_jobs += backlog_user
+        if chat_jobs >= self.hard_jobs_per_chat:
+            raise SchedulingRejected('chat_quota', f"Чат {chat_id} вичерпав квоту завдань ({chat_jobs})")
+        if user_jobs >= self.hard_jobs_per_user:
+            raise SchedulingRejected('user_quota', f"Користувач {user_id} вичерпав квоту завдань ({user_jobs})")
+        if queued_seconds + duration > self.max_queued_seconds:
+            raise SchedulingRejected(
+                'budget', f"Бюджет вичерпано ({queued_seconds:.0f}/{self.max_queued_seconds:.0f} с)"
+            )
+
+        over_quota = max(chat_jobs + 1 - self.max_jobs_per_chat, user_jobs + 1 - self.max_jobs_per_user, 0)
+        penalty = over_quota * self.overquota_penalty
+        if penalty:
+            logger.info(f"Завдання чату {chat_id} понад квоту ({over_quota}), пріоритет знижено на {penalty:.0f} с")
+
+        self.queued_seconds += duration
+        self.jobs += 1
+        self._per_chat[chat_id] = self._per_chat.get(chat_id, 0) + 1
+        self._per_user[user_id] = self._per_user.get(user_id, 0) + 1
+        return Ticket(chat_id, user_id, duration, penalty,
+                      duration + penalty + self.aging_rate * time.monotonic())
+
+    def release(self, ticket: Ticket):
+        """Звільнення квот і бюджету завершеного завдання"""
+        if ticket.released:
+            return
+        ticket.released = True
+        self.queued_seconds = max(0.0, self.queued_seconds - ticket.duration)
+        self.jobs -= 1
+        for counts, key in ((self._per_chat, ticket.chat_id), (self._per_user, ticket.user_id)):
+            counts[key] -= 1
+            if not counts[key]:
+                del counts[key]
+
+    @staticmethod
+    def current() -> Optional[Ticket]:
+        """Завдання, в межах якого виконується поточний обробник"""
+        return _current_ticket.get()
+
+    def wrap(self, callback, duration_of: Callable, on_reject: Callable[..., Awaitable]):
+        """
+        Обгортка обробника PTB: прийняття завдання до черги чату
+
+        Обгортає ChatSequencer.wrap ззовні, щоб бюджет і квоти рахували й
+        повідомлення, що ще чекають своєї черги в чаті. Прийнятий Ticket
+        доступний обробнику через DurationScheduler.current(). Якщо обробник
+        повернув asyncio.Future (обробка триває в окремій задачі), квиток
+        звільняється після її завершення.
+        """
+        @functools.wraps(callback)
+        async def wrapper(update, context):
+            chat = update.effective_chat
+            user = update.effective_user
+            try:
+                ticket = self.admit(chat.id if chat else None, user.id if user else None,
+                                    duration_of(update))
+            except SchedulingRejected as e:
+                logger.warning(f"Завдання відхилено планувальником: {e}")
+                await on_reject(update, e)
+                return
+            token = _current_ticket.set(ticket)
+            result = None
+            try:
+                result = await callback(update, context)
+                return result
+            finally:
+                _current_ticket.reset(token)
+                if isinstance(result, asyncio.Future):
+                    result.add_done_callback(lambda _: self.release(ticket))
+                else:
+                    self.release(ticket)
+        return wrapper
@@ -0,0 +1,144 @@
+import asyncio
+import contextlib
+import heapq
+import itertools
+import logging
+import os
+import tempfile
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+class PcmBuffer:
+    """
+    16-бітний моно PCM у файлі на диску, відображений у пам'ять
+    (numpy.memmap).
+
+    Наступні етапи читають його вікнами-представленнями без копіювання:
+    у пам'яті процесу опиняються лише сторінки, з якими зараз працюють, а
+    копія створюється тільки для сегмента, що йде в бекенд. Файл належить
+    буферу і видаляється в close().
+    """
+
+    sample_width = 2
+
+    def __init__(self, path: str, sample_rate: int):
+        self.path = path
+        self.sample_rate = sample_rate
+        if os.path.getsize(path):
+            self._samples = np.memmap(path, dtype=np.int16, mode='r')
+        else:
+            self._samples = np.zeros(0, dtype=np.int16)
+        self._start, self._end = 0, len(self._samples)
+
+    @classmethod
+    def create(cls, directory: Optional[str] = None) -> str:
+        """Новий порожній файл для PCM (шлях передається декодеру)"""
+        fd, path = tempfile.mkstemp(prefix='voicebot-', suffix='.pcm', dir=directory)
+        os.close(fd)
+        return path
+
+    @property
+    def samples(self) -> np.ndarray:
+        """Поточне вікно відліків (без копіювання)"""
+        return self._samples[self._start:self._end]
+
+    @property
+    def window(self) -> Tuple[int, int]:
+        """Межі поточного вікна у відліках файлу [start, end)"""
+        return self._start, self._end
+
+    @property
+    def nbytes(self) -> int:
+        return (self._end - self._start) * self.sample_width
+
+    @property
+    def duration(self) -> float:
+        return (self._end - self._start) / self.sample_rate
+
+    def trim(self, start: int, end: int):
+        """Звуження вікна до відліків [start, end) поточного вікна"""
+        self._start, self._end = self._start + start, self._start + end
+
+    def close(self):
+        """Звільнення відображення і видалення файлу"""
+        self._samples = np.zeros(0, dtype=np.int16)
+        self._start = self._end = 0
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+class MemoryBudget:
+    """
+    Глобальний бюджет пам'яті для завдань розпізнавання.
+
+    Перед завантаженням завдання резервує прогнозований обсяг пам'яті і
+    чекає, доки той вміститься в limit_bytes. Черга впорядкована за
+    пріоритетом (менший - раніше, за рівного - FIFO), і перше в черзі
+    завдання не обганяють навіть менші, тож великі записи не голодують.
+    Завдання, більше за весь бюджет, виконується лише на самоті.
+    limit_bytes=0 вимикає обмеження. Лічильники змінюються тільки з
+    потоку event loop.
+    """
+
+    def __init__(self, limit_bytes: int = 0):
+        self.limit_bytes = limit_bytes
+        self.used = 0
+        self._waiters: List[Tuple[float, int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+
+    @property
+    def waiting(self) -> int:
+        """Кількість завдань, що чекають на пам'ять"""
+        return sum(1 for *_, future in self._waiters if not future.done())
+
+    @contextlib.asynccontextmanager
+    async def reserve(self, nbytes: int, priority: float = 0.0):
+        """Резервування nbytes байтів на час блоку async with"""
+        if self.limit_bytes:
+            nbytes = min(nbytes, self.limit_bytes)
+        await self._acquire(nbytes, priority)
+        try:
+            yield
+        finally:
+            self._release(nbytes)
+
+    def _fits(self, nbytes: int) -> bool:
+        return not self.limit_bytes or self.used + nbytes <= self.limit_bytes
+
+    async def _acquire(self, nbytes: int, priority: float):
+        if not self._waiters and self._fits(nbytes):
+            self.used += nbytes
+            return
+        logger.info(f"Завдання чекає на пам'ять: {nbytes / 2 ** 20:.1f} МБ, "
+                    f"зайнято {self.used / 2 ** 20:.1f}/{self.limit_bytes / 2 ** 20:.0f} МБ")
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), nbytes, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            # Пам'ять уже видали, але завдання скасували - віддаємо її наступним
+            if future.done() and not future.cancelled():
+                self.used -= nbytes
+            self._wake()
+            raise
+
+    def _release(self, nbytes: int):
+        self.used -= nbytes
+        self._wake()
+
+    def _wake(self):
+        """Допуск завдань з початку черги, поки вони вміщаються"""
+        while self._waiters:
+            _, _, nbytes, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if not self._fits(nbytes):
+                break
+            heapq.heappop(self._waiters)
+            self.used += nbytes
+            future.set_result(None)
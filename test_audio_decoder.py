@@ -0,0 +1,72 @@
+"""
+Тести декодера: ffmpeg (тут - повільна заміна) завершується і
+прибирається після скасування завдання або тайм-ауту.
+
+    python3 test_audio_decoder.py
+"""
+import asyncio
+import os
+import stat
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from audio_decoder import AudioDecodeError, AudioDecoder
+
+@unittest.skipIf(sys.platform == 'win32', "заміна ffmpeg - shell-скрипт")
+class TestDecoderProcess(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        # Заміна ffmpeg, що "декодує" довше за будь-який тест
+        self.ffmpeg = os.path.join(self.tempdir.name, 'ffmpeg')
+        with open(self.ffmpeg, 'w') as f:
+            f.write('#!/bin/sh\nexec sleep 30\n')
+        os.chmod(self.ffmpeg, os.stat(self.ffmpeg).st_mode | stat.S_IXUSR)
+        self.processes = []
+
+    async def asyncTearDown(self):
+        self.tempdir.cleanup()
+
+    async def spawn(self, *args, **kwargs):
+        process = await self.create_subprocess_exec(*args, **kwargs)
+        self.processes.append(process)
+        return process
+
+    async def run_decoder(self, coroutine_factory, timeout: float = 120.0):
+        decoder = AudioDecoder(ffmpeg_path=self.ffmpeg, timeout=timeout)
+        self.create_subprocess_exec = asyncio.create_subprocess_exec
+        with mock.patch('audio_decoder.asyncio.create_subprocess_exec', self.spawn):
+            return await coroutine_factory(decoder)
+
+    def assert_reaped(self):
+        process, = self.processes
+        self.assertIsNotNone(process.returncode)
+        # Процес не лишився зомбі: його вже дочекались
+        with self.assertRaises(ChildProcessError):
+            os.waitpid(process.pid, os.WNOHANG)
+
+    async def test_cancel_kills_and_reaps_ffmpeg(self):
+        task = asyncio.ensure_future(self.run_decoder(lambda decoder: decoder.decode_file('media')))
+        await asyncio.sleep(0.2)
+        self.assertIsNone(self.processes[0].returncode)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assert_reaped()
+
+    async def test_cancel_while_writing_stdin(self):
+        task = asyncio.ensure_future(self.run_decoder(lambda decoder: decoder.decode(b'\0' * 4 * 2 ** 20)))
+        await asyncio.sleep(0.2)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assert_reaped()
+
+    async def test_timeout_kills_and_reaps_ffmpeg(self):
+        with self.assertRaises(AudioDecodeError):
+            await self.run_decoder(lambda decoder: decoder.decode_file('media'), timeout=0.2)
+        self.assert_reaped()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,87 @@
+"""
+Тести підготовки PCM: пік повної шкали -32768 без переповнення int16
+(у пам'яті і у файлі на диску), передискретизація з DECODE_SAMPLE_RATE
+до 16 кГц і обрізання тиші на краях.
+
+    python3 test_audio_preprocessor.py
+"""
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from audio_preprocessor import CHUNK_SAMPLES, AudioPreprocessor, peak_amplitude
+
+def tone(frequency: float, seconds: float, rate: int, amplitude: float = 8000) -> np.ndarray:
+    return (np.sin(2 * np.pi * frequency * np.arange(int(seconds * rate)) / rate) * amplitude).astype(np.int16)
+
+def tone_level(samples: np.ndarray, frequency: float, rate: int) -> float:
+    """Амплітуда складової frequency (проекція на синус і косинус)"""
+    t = np.arange(len(samples)) / rate
+    samples = samples.astype(np.float64)
+    return 2 * abs(np.mean(samples * np.exp(-2j * np.pi * frequency * t)))
+
+class TestPeak(unittest.TestCase):
+    def test_full_scale_negative_peak(self):
+        samples = np.zeros(1000, dtype=np.int16)
+        samples[10] = -32768
+        self.assertEqual(peak_amplitude(samples), 32768.0)
+
+    def test_peak_in_later_chunk(self):
+        samples = np.full(CHUNK_SAMPLES * 2 + 5, 100, dtype=np.int16)
+        samples[CHUNK_SAMPLES + 3] = -32768
+        self.assertEqual(peak_amplitude(samples), 32768.0)
+        self.assertEqual(peak_amplitude(samples[:CHUNK_SAMPLES]), 100.0)
+
+    def test_normalize_does_not_boost_full_scale(self):
+        samples = tone(220, 0.5, 16000, amplitude=20000)
+        samples[100] = -32768
+        normalized = AudioPreprocessor(peak_dbfs=-1).normalize(samples)
+        # Пік уже на повній шкалі - його лише трохи знижено до -1 dBFS, а не підсилено в 20 разів
+        self.assertAlmostEqual(float(np.abs(normalized).max()), 32767 * 10 ** (-1 / 20), delta=2)
+
+    def test_file_with_full_scale_peak_keeps_sign(self):
+        samples = tone(220, 1.0, 16000, amplitude=20000)
+        samples[8000] = -32768
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'audio.pcm')
+            samples.tofile(path)
+            start, end = AudioPreprocessor(peak_dbfs=-1).process_file(path, 16000)
+            processed = np.fromfile(path, dtype=np.int16)[start:end]
+        self.assertLess(processed[8000 - start], -29000)
+        self.assertLessEqual(int(np.abs(processed.astype(np.int32)).max()), 32767)
+
+class TestResample(unittest.TestCase):
+    def setUp(self):
+        self.preprocessor = AudioPreprocessor(target_rate=16000)
+
+    def test_same_rate_unchanged(self):
+        samples = tone(440, 0.1, 16000)
+        self.assertIs(self.preprocessor.resample(samples, 16000), samples)
+
+    def test_downsample_keeps_speech_band_and_filters_alias(self):
+        rate = 48000
+        samples = (tone(1000, 1.0, rate) + tone(10000, 1.0, rate)).astype(np.int16)
+        resampled = self.preprocessor.resample(samples, rate)
+        self.assertEqual(len(resampled), 16000)
+        self.assertAlmostEqual(tone_level(resampled, 1000, 16000), 8000, delta=400)
+        # 10 кГц вище за частоту Найквіста 8 кГц: без фільтра стала б відображеною 6 кГц
+        self.assertLess(tone_level(resampled, 6000, 16000), 400)
+
+    def test_upsample(self):
+        resampled = self.preprocessor.resample(tone(440, 1.0, 8000), 8000)
+        self.assertEqual(len(resampled), 16000)
+        self.assertAlmostEqual(tone_level(resampled, 440, 16000), 8000, delta=400)
+
+    def test_process_returns_target_rate(self):
+        silence = np.zeros(4800, dtype=np.int16)
+        samples = np.concatenate([silence, tone(440, 1.0, 48000), silence])
+        pcm, rate = self.preprocessor.process(samples.tobytes(), 48000)
+        self.assertEqual(rate, 16000)
+        # Тишу по краях обрізано до запасу trim_padding_ms
+        self.assertLess(len(pcm) / 2 / rate, 1.0 + 2 * 0.2 + 0.02)
+        self.assertGreater(len(pcm) / 2 / rate, 0.98)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,38 @@
+"""
+Димовий тест офлайн-бенчмарку: run(quick=True) проходить усі етапи без
+помилок і кожен етап повертає результат, тож зміни в конвеєрі не ламають
+бенчмарк непомітно.
+
+    python3 test_benchmark.py
+"""
+import os
+import shutil
+import unittest
+
+import benchmark
+
+class TestBenchmarkSmoke(unittest.TestCase):
+    def test_quick_run(self):
+        environ = dict(os.environ)
+        results = benchmark.run(quick=True, speech_latency=0.0)
+        self.assertEqual(dict(os.environ), environ)
+        expected = ['punctuation/batch/100w', 'punctuation/model/100w', 'segmentation/5s', 'segmentation/60s']
+        if shutil.which('ffmpeg'):
+            expected += ['download_and_convert_audio/5s', 'recognize_speech/5s', 'spooled_pipeline/5s']
+        for name in expected:
+            with self.subTest(stage=name):
+                self.assertIn(name, results)
+                self.assertGreater(results[name]['mean_s'], 0)
+        self.assertGreater(results['segmentation/5s']['segments'], 0)
+        if shutil.which('ffmpeg'):
+            self.assertGreater(results['download_and_convert_audio/5s']['output_bytes'], 0)
+            self.assertGreater(results['recognize_speech/5s']['text_chars'], 0)
+            self.assertGreater(results['spooled_pipeline/5s']['text_chars'], 0)
+
+    def test_empty_stage_result_aborts(self):
+        with self.assertRaises(RuntimeError):
+            benchmark._require(None, 'recognize_speech/5s')
+        self.assertEqual(benchmark._require('текст', 'recognize_speech/5s'), 'текст')
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+"""
+Тести порядку повідомлень у чаті: обробник PTB повертається одразу,
+повідомлення чату проходять чергу по порядку, а черга звільняється до
+завершення довгої обробки.
+
+    python3 test_chat_sequencer.py
+"""
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+from chat_sequencer import ChatSequencer
+from scheduler import DurationScheduler
+
+def make_update(chat_id, user_id=1):
+    return SimpleNamespace(effective_chat=SimpleNamespace(id=chat_id),
+                           effective_user=SimpleNamespace(id=user_id))
+
+class TestChatSequencer(unittest.IsolatedAsyncioTestCase):
+    async def test_handler_returns_before_turn(self):
+        sequencer = ChatSequencer()
+        release = asyncio.Event()
+        order = []
+
+        async def handler(update, context):
+            order.append(update.effective_chat.id)
+            await release.wait()
+
+        wrapped = sequencer.wrap(handler)
+        tasks = [await asyncio.wait_for(wrapped(make_update(1), None), 1) for _ in range(3)]
+        other = await wrapped(make_update(2), None)
+        await asyncio.sleep(0.01)
+        # Зайнятий чат 1 не затримує чат 2
+        self.assertEqual(order, [1, 2])
+        release.set()
+        await asyncio.gather(*tasks, other)
+        self.assertEqual(order, [1, 2, 1, 1])
+        self.assertEqual((sequencer.active_chats, sequencer.tasks), (0, set()))
+
+    async def test_end_turn_lets_next_message_start(self):
+        sequencer = ChatSequencer()
+        release = asyncio.Event()
+        events = []
+
+        async def handler(update, context):
+            events.append(('заглушка', context))
+            sequencer.end_turn()
+            await release.wait()
+            events.append(('результат', context))
+
+        wrapped = sequencer.wrap(handler)
+        tasks = [await wrapped(make_update(1), n) for n in range(3)]
+        await asyncio.sleep(0.01)
+        self.assertEqual(events, [('заглушка', 0), ('заглушка', 1), ('заглушка', 2)])
+        release.set()
+        await asyncio.gather(*tasks)
+        self.assertEqual(sequencer.active_chats, 0)
+
+    async def test_handler_error_is_logged_not_raised(self):
+        sequencer = ChatSequencer()
+
+        async def handler(update, context):
+            raise RuntimeError('збій')
+
+        task = await sequencer.wrap(handler)(make_update(1), None)
+        with self.assertLogs('chat_sequencer', level='ERROR'):
+            await task
+        self.assertEqual(sequencer.active_chats, 0)
+
+    async def test_scheduler_holds_ticket_until_task_finishes(self):
+        sequencer = ChatSequencer()
+        scheduler = DurationScheduler(max_queued_seconds=100)
+        release = asyncio.Event()
+        tickets = []
+
+        async def handler(update, context):
+            tickets.append(scheduler.current())
+            sequencer.end_turn()
+            await release.wait()
+
+        wrapped = scheduler.wrap(sequencer.wrap(handler), lambda update: 30, None)
+        task = await wrapped(make_update(1), None)
+        await asyncio.sleep(0)
+        self.assertEqual((scheduler.jobs, scheduler.queued_seconds), (1, 30))
+        release.set()
+        await task
+        await asyncio.sleep(0)
+        self.assertEqual(tickets[0].duration, 30)
+        self.assertEqual((scheduler.jobs, scheduler.queued_seconds), (0, 0))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+"""
+Тести поступової доставки: розбиття тексту на повідомлення, бюджет
+редагувань на чат і проміжний текст сегментів.
+
+    python3 test_delivery.py
+"""
+import asyncio
+import time
+import unittest
+from types import SimpleNamespace
+
+from delivery import PROGRESS_SUFFIX, ChatRateLimiter, ProgressiveMessage, split_text
+from transcriber import _OrderedProgress
+
+class FakeBot:
+    """Записує виклики Bot API замість відправки"""
+
+    def __init__(self):
+        self.calls = []
+
+    async def edit_message_text(self, text, chat_id=None, message_id=None):
+        self.calls.append(('edit', text))
+
+    async def send_message(self, chat_id=None, text=None, reply_to_message_id=None):
+        self.calls.append(('send', text))
+        return SimpleNamespace(message_id=len(self.calls) + 100)
+
+    async def send_document(self, chat_id=None, document=None, filename=None, reply_to_message_id=None):
+        self.calls.append(('document', document.getvalue().decode('utf-8')))
+
+class TestSplitText(unittest.TestCase):
+    def test_short_text_unchanged(self):
+        self.assertEqual(split_text('Привіт.', 100), ['Привіт.'])
+        self.assertEqual(split_text('', 100), [])
+
+    def test_prefers_newline_then_sentence_then_word(self):
+        self.assertEqual(split_text('а' * 60 + '\n' + 'б' * 60, 100), ['а' * 60, 'б' * 60])
+        self.assertEqual(split_text('а' * 60 + '. ' + 'б' * 60, 100), ['а' * 60 + '.', 'б' * 60])
+        self.assertEqual(split_text('а' * 60 + ' ' + 'б' * 60, 100), ['а' * 60, 'б' * 60])
+
+    def test_sentence_end_too_early_falls_back_to_word(self):
+        text = 'Так. ' + 'а' * 70 + ' ' + 'б' * 40
+        self.assertEqual(split_text(text, 100), ['Так. ' + 'а' * 70, 'б' * 40])
+
+    def test_hard_cut_without_spaces(self):
+        self.assertEqual(split_text('а' * 250, 100), ['а' * 100, 'а' * 100, 'а' * 50])
+
+    def test_chunks_within_limit_and_words_preserved(self):
+        words = [f'слово{i}' for i in range(2000)]
+        text = ' '.join(f'{word}.' if i % 9 == 8 else word for i, word in enumerate(words))
+        chunks = split_text(text, 500)
+        self.assertTrue(all(len(chunk) <= 500 for chunk in chunks))
+        self.assertEqual(' '.join(chunks).split(), text.split())
+
+class TestChatRateLimiter(unittest.IsolatedAsyncioTestCase):
+    async def test_same_chat_is_spaced(self):
+        limiter = ChatRateLimiter(0.05)
+        started = time.monotonic()
+        for _ in range(3):
+            await limiter.wait(1)
+        self.assertGreaterEqual(time.monotonic() - started, 0.1)
+        self.assertGreater(limiter.delay(1), 0)
+
+    async def test_chats_are_independent(self):
+        limiter = ChatRateLimiter(10)
+        started = time.monotonic()
+        await asyncio.gather(*(limiter.wait(chat_id) for chat_id in range(5)))
+        self.assertLess(time.monotonic() - started, 1)
+
+class TestProgressiveMessage(unittest.IsolatedAsyncioTestCase):
+    async def test_updates_coalesce_between_slots(self):
+        bot = FakeBot()
+        message = ProgressiveMessage(bot, 1, 10, ChatRateLimiter(0.05))
+        for i in range(20):
+            message.update(f'текст {i}')
+            await asyncio.sleep(0.005)
+        await asyncio.sleep(0.15)
+        edits = [text for kind, text in bot.calls]
+        self.assertLess(len(edits), 6)
+        self.assertEqual(edits[-1], 'текст 19' + PROGRESS_SUFFIX)
+
+    async def test_unchanged_partial_is_not_resent(self):
+        bot = FakeBot()
+        message = ProgressiveMessage(bot, 1, 10, ChatRateLimiter(0.01), max_length=100)
+        message.update('коротко')
+        await asyncio.sleep(0.05)
+        message.update('коротко')
+        await asyncio.sleep(0.05)
+        # Після межі повідомлення обрізаний текст уже не змінюється
+        for i in range(5):
+            message.update('а' * 200 + str(i))
+            await asyncio.sleep(0.05)
+        edits = [text for kind, text in bot.calls]
+        self.assertEqual(len(edits), 2)
+        self.assertEqual(edits[0], 'коротко' + PROGRESS_SUFFIX)
+        self.assertTrue(edits[1].endswith('…' + PROGRESS_SUFFIX))
+        self.assertLessEqual(len(edits[1]), 100)
+
+    async def test_finish_replaces_pending_partial(self):
+        bot = FakeBot()
+        message = ProgressiveMessage(bot, 1, 10, ChatRateLimiter(0.05))
+        message.update('частина')
+        message.update('частина друга')
+        await message.finish('Повний текст.')
+        self.assertEqual(bot.calls[-1], ('edit', 'Повний текст.'))
+        message.update('запізніле оновлення')
+        await asyncio.sleep(0.1)
+        self.assertEqual(bot.calls[-1], ('edit', 'Повний текст.'))
+
+    async def test_long_text_split_or_sent_as_document(self):
+        bot = FakeBot()
+        await ProgressiveMessage(bot, 1, 10, ChatRateLimiter(0), max_length=100).finish('а ' * 120)
+        self.assertEqual([kind for kind, _ in bot.calls], ['edit', 'send', 'send'])
+
+        bot = FakeBot()
+        await ProgressiveMessage(bot, 1, 10, ChatRateLimiter(0), max_length=100,
+                                 max_messages=2).finish('а ' * 120)
+        self.assertEqual([kind for kind, _ in bot.calls], ['edit', 'document'])
+        self.assertEqual(bot.calls[1][1], 'а ' * 120)
+
+class TestOrderedProgress(unittest.TestCase):
+    def test_shows_contiguous_prefix_once_punctuated(self):
+        shown = []
+        progress = _OrderedProgress(3, shown.append)
+        progress.done(1, 'другий сегмент')
+        self.assertEqual(shown, [])
+        progress.done(0, 'перший сегмент')
+        self.assertEqual(shown, ['Перший сегмент. Другий сегмент.'])
+        progress.done(2, 'третій')
+        self.assertEqual(len(shown), 1)
+
+if __name__ == '__main__':
+    unittest.main()
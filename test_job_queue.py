@@ -0,0 +1,103 @@
+"""
+Тести черги завдань JobQueue: порядок видачі, оренда, спроби і власність
+завдання воркером.
+
+    python3 test_job_queue.py
+"""
+import os
+import tempfile
+import time
+import unittest
+
+from job_queue import JobQueue
+
+class TestJobQueue(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.queue = self.make_queue()
+
+    def tearDown(self):
+        self.queue.close()
+        self.tempdir.cleanup()
+
+    def make_queue(self, **options) -> JobQueue:
+        options.setdefault('max_attempts', 2)
+        return JobQueue(os.path.join(self.tempdir.name, 'jobs.db'), **options)
+
+    def expire(self, job_id: int):
+        """Оренда завдання закінчилась (воркер впав)"""
+        self.queue._db.execute('UPDATE jobs SET lease_until = ? WHERE id = ?', (time.time() - 1, job_id))
+
+    def test_shorter_jobs_first(self):
+        long_id = self.queue.enqueue({'n': 'long'}, duration=600)
+        short_id = self.queue.enqueue({'n': 'short'}, duration=5)
+        self.assertEqual(self.queue.claim('w1').id, short_id)
+        self.assertEqual(self.queue.claim('w1').id, long_id)
+        self.assertIsNone(self.queue.claim('w1'))
+
+    def test_claimed_job_not_given_twice(self):
+        self.queue.enqueue({})
+        job = self.queue.claim('w1')
+        self.assertEqual(job.attempts, 1)
+        self.assertIsNone(self.queue.claim('w2'))
+        self.assertEqual(self.queue.depth(), 0)
+
+    def test_expired_lease_is_reclaimed(self):
+        job_id = self.queue.enqueue({})
+        self.queue.claim('w1')
+        self.expire(job_id)
+        job = self.queue.claim('w2')
+        self.assertEqual((job.id, job.attempts), (job_id, 2))
+
+    def test_expired_lease_after_max_attempts_fails(self):
+        job_id = self.queue.enqueue({'chat_id': 1})
+        for _ in range(2):
+            self.assertEqual(self.queue.claim('w').id, job_id)
+            self.expire(job_id)
+        self.assertIsNone(self.queue.claim('w'))
+        exhausted = self.queue.exhausted()
+        self.assertEqual([(job.id, job.payload) for job in exhausted], [(job_id, {'chat_id': 1})])
+        self.assertEqual(self.queue.exhausted(), [])
+        self.assertIsNone(self.queue.claim('w'))
+
+    def test_fail_requeues_until_max_attempts(self):
+        job_id = self.queue.enqueue({})
+        self.queue.claim('w1')
+        self.assertFalse(self.queue.fail(job_id, 'w1', 'помилка'))
+        self.assertEqual(self.queue.depth(), 1)
+        self.queue.claim('w1')
+        self.assertTrue(self.queue.fail(job_id, 'w1', 'помилка'))
+        self.assertIsNone(self.queue.claim('w1'))
+
+    def test_release_keeps_attempt(self):
+        job_id = self.queue.enqueue({})
+        self.queue.claim('w1')
+        self.assertTrue(self.queue.release(job_id, 'w1'))
+        self.assertEqual(self.queue.claim('w2').attempts, 1)
+
+    def test_stale_worker_cannot_finish(self):
+        job_id = self.queue.enqueue({})
+        self.queue.claim('w1')
+        self.expire(job_id)
+        self.queue.claim('w2')
+        self.assertFalse(self.queue.complete(job_id, 'w1'))
+        self.assertFalse(self.queue.fail(job_id, 'w1', 'помилка'))
+        self.assertFalse(self.queue.release(job_id, 'w1'))
+        self.assertFalse(self.queue.renew(job_id, 'w1'))
+        self.assertTrue(self.queue.complete(job_id, 'w2'))
+        self.assertFalse(self.queue.complete(job_id, 'w2'))
+
+    def test_renew_extends_lease(self):
+        self.queue.close()
+        self.queue = self.make_queue(lease_seconds=0.2)
+        job_id = self.queue.enqueue({})
+        self.queue.claim('w1')
+        for _ in range(3):
+            time.sleep(0.1)
+            self.assertTrue(self.queue.renew(job_id, 'w1'))
+        self.assertIsNone(self.queue.claim('w2'))
+        time.sleep(0.3)
+        self.assertEqual(self.queue.claim('w2').id, job_id)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+"""
+Тести журналу завдань режиму inline: записи переживають перезапуск,
+продовження редагує ту саму заглушку, а зупинка чекає на завдання в
+роботі (із тимчасовим журналом і заміною Bot API).
+
+    python3 test_journal.py
+"""
+import asyncio
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from bot import VoiceBot
+from delivery import RESTART_FAILED_TEXT, RESTART_TEXT
+from job_journal import JobJournal
+
+class FakeBot:
+    """Записує редагування заглушок замість Bot API"""
+
+    def __init__(self):
+        self.edits = []
+
+    async def edit_message_text(self, text, chat_id=None, message_id=None):
+        self.edits.append((message_id, text))
+
+class FakeTranscriber:
+    """Розпізнавання, що чекає на release"""
+
+    def __init__(self):
+        self.recognizer = object()
+        self.release = asyncio.Event()
+        self.calls = []
+
+    async def transcribe(self, bot, file_id, video=False, on_progress=None, priority=0.0, duration=None):
+        self.calls.append(file_id)
+        await self.release.wait()
+        return 'розпізнаний текст'
+
+def make_payload(message_id: int, **overrides) -> dict:
+    payload = {
+        'kind': 'voice', 'file_id': f'file-{message_id}', 'file_unique_id': f'unique-{message_id}',
+        'chat_id': 1, 'message_id': message_id, 'user_id': 7, 'user_name': 'Тест',
+        'convert_error_text': 'Помилка обробки аудіо', 'error_text': 'Помилка обробки',
+        'video': False, 'duration': 5, 'accepted_at': time.time()
+    }
+    payload.update(overrides)
+    return payload
+
+class TestJobJournal(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.path = os.path.join(self.tempdir.name, 'journal.db')
+
+    def test_entries_survive_restart(self):
+        journal = JobJournal(self.path)
+        first = journal.record(make_payload(10))
+        second = journal.record(make_payload(11))
+        journal.finish(first)
+        journal.close()
+
+        journal = JobJournal(self.path)
+        entries = journal.pending()
+        self.assertEqual([(entry.id, entry.payload['message_id'], entry.attempts) for entry in entries],
+                         [(second, 11, 0)])
+        journal.resumed(second)
+        journal.close()
+
+        journal = JobJournal(self.path)
+        self.assertEqual(journal.pending()[0].attempts, 1)
+        journal.finish(second)
+        self.assertEqual(journal.pending(), [])
+        journal.close()
+
+class BotJournalTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        env = {
+            'BOT_TOKEN': '0:test',
+            'TRANSCRIBE_MODE': 'inline',
+            'CACHE_DB_PATH': os.path.join(self.tempdir.name, 'cache.db'),
+            'JOURNAL_PATH': os.path.join(self.tempdir.name, 'journal.db'),
+            'DELIVERY_MIN_INTERVAL': '0',
+            'SHUTDOWN_GRACE_SECONDS': '1',
+        }
+        with mock.patch.dict(os.environ, env):
+            self.bot = VoiceBot()
+        self.transcriber = self.bot.transcriber = FakeTranscriber()
+        self.bot.ready.set()
+        self.telegram = FakeBot()
+
+    async def asyncTearDown(self):
+        self.bot.cache.close()
+        self.bot.journal.close()
+        self.tempdir.cleanup()
+
+    def start_job(self, message_id: int) -> asyncio.Task:
+        payload = make_payload(message_id)
+        entry_id = self.bot.journal.record(payload)
+        return asyncio.ensure_future(self.bot._run_job(self.telegram, entry_id, payload, 0.0))
+
+class TestResume(BotJournalTestCase):
+    async def test_resume_edits_original_placeholder(self):
+        entry_id = self.bot.journal.record(make_payload(42))
+        entry, = self.bot.journal.pending()
+        self.transcriber.release.set()
+        await self.bot._resume_job(self.telegram, entry)
+        self.assertEqual(self.transcriber.calls, ['file-42'])
+        message_id, text = self.telegram.edits[-1]
+        self.assertEqual(message_id, 42)
+        self.assertIn('розпізнаний текст', text)
+        self.assertEqual(self.bot.journal.pending(), [])
+        self.assertEqual((self.bot.scheduler.jobs, entry.id), (0, entry_id))
+
+    async def test_stale_entry_is_not_resumed(self):
+        self.bot.journal.record(make_payload(43, accepted_at=time.time() - 2 * self.bot.journal_max_age))
+        entry, = self.bot.journal.pending()
+        with self.assertLogs('bot', level='WARNING'):
+            await self.bot._resume_job(self.telegram, entry)
+        self.assertEqual(self.telegram.edits, [(43, RESTART_FAILED_TEXT)])
+        self.assertEqual(self.transcriber.calls, [])
+        self.assertEqual(self.bot.journal.pending(), [])
+
+class TestDrain(BotJournalTestCase):
+    async def drain(self):
+        loop = asyncio.get_running_loop()
+        with mock.patch.object(loop, 'stop') as stop:
+            await self.bot._drain_and_stop()
+        stop.assert_called_once()
+
+    async def test_drain_waits_for_in_flight_job(self):
+        job = self.start_job(20)
+        await asyncio.sleep(0.01)
+        drain = asyncio.ensure_future(self.drain())
+        await asyncio.sleep(0.1)
+        self.assertFalse(drain.done())
+        self.transcriber.release.set()
+        await asyncio.wait_for(drain, 1)
+        self.assertTrue(await job)
+        self.assertIn('розпізнаний текст', self.telegram.edits[-1][1])
+        self.assertEqual(self.bot.journal.pending(), [])
+
+    async def test_job_past_grace_is_interrupted_and_kept(self):
+        self.bot.shutdown_grace = 0.05
+        job = self.start_job(21)
+        await asyncio.sleep(0.01)
+        with self.assertLogs('bot', level='WARNING'):
+            await asyncio.wait_for(self.drain(), 1)
+        self.assertTrue(job.cancelled())
+        self.assertEqual(self.telegram.edits[-1], (21, RESTART_TEXT))
+        # Запис лишається - після перезапуску завдання продовжиться
+        self.assertEqual([entry.payload['message_id'] for entry in self.bot.journal.pending()], [21])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+"""
+Тести завантажувача медіа проти локального HTTP-сервера: потокове
+завантаження частинами, ліміт розміру (за Content-Length і під час
+читання) і повтор після відповіді 5xx.
+
+    python3 test_media_downloader.py
+"""
+import io
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+from media_downloader import DownloadTooLargeError, MediaDownloader
+
+class FileServer:
+    """Віддає файли; для шляху з failures спочатку відповідає 503"""
+
+    def __init__(self):
+        self.files = {}
+        self.failures = {}
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server.requests.append(self.path)
+                if server.failures.get(self.path):
+                    server.failures[self.path] -= 1
+                    self.send_response(503)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                body = server.files.get(self.path)
+                if body is None:
+                    self.send_response(404)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                if self.path.startswith('/chunked'):
+                    # Без Content-Length: розмір видно лише під час читання
+                    self.send_header('Transfer-Encoding', 'chunked')
+                    self.end_headers()
+                    for first in range(0, len(body), 1000):
+                        chunk = body[first:first + 1000]
+                        self.wfile.write(f'{len(chunk):x}\r\n'.encode() + chunk + b'\r\n')
+                    self.wfile.write(b'0\r\n\r\n')
+                    return
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def url(self, path: str) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f'http://{host}:{port}{path}'
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+class TestMediaDownloader(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.server = FileServer().__enter__()
+        self.data = bytes(range(256)) * 400
+
+    async def asyncTearDown(self):
+        self.server.__exit__(None, None, None)
+
+    def make(self, **options) -> MediaDownloader:
+        options.setdefault('backoff', 0.01)
+        downloader = MediaDownloader(chunk_size=4096, **options)
+        self.addAsyncCleanup(downloader.close)
+        return downloader
+
+    async def test_streams_file_in_chunks(self):
+        self.server.files['/file'] = self.data
+        destination = io.BytesIO()
+        written = await self.make().download_to(self.server.url('/file'), destination)
+        self.assertEqual(written, len(self.data))
+        self.assertEqual(destination.getvalue(), self.data)
+
+    async def test_declared_size_over_cap_is_not_read(self):
+        self.server.files['/file'] = self.data
+        destination = io.BytesIO()
+        with self.assertRaises(DownloadTooLargeError):
+            await self.make(max_bytes=1000).download_to(self.server.url('/file'), destination)
+        self.assertEqual(destination.getvalue(), b'')
+
+    async def test_streamed_size_over_cap_stops_reading(self):
+        self.server.files['/chunked'] = self.data
+        destination = io.BytesIO()
+        with self.assertRaises(DownloadTooLargeError):
+            await self.make(max_bytes=len(self.data) - 1).download_to(self.server.url('/chunked'), destination)
+        self.assertLess(len(destination.getvalue()), len(self.data))
+
+        destination = io.BytesIO()
+        await self.make(max_bytes=len(self.data)).download_to(self.server.url('/chunked'), destination)
+        self.assertEqual(destination.getvalue(), self.data)
+
+    async def test_server_error_is_retried_from_start(self):
+        self.server.files['/file'] = self.data
+        self.server.failures['/file'] = 2
+        destination = io.BytesIO(b'old')
+        destination.seek(3)
+        with self.assertLogs('media_downloader', level='WARNING'):
+            await self.make(retries=2).download_to(self.server.url('/file'), destination)
+        self.assertEqual(destination.getvalue(), b'old' + self.data)
+        self.assertEqual(self.server.requests, ['/file'] * 3)
+
+    async def test_retries_exhausted_and_client_error_not_retried(self):
+        self.server.files['/file'] = self.data
+        self.server.failures['/file'] = 5
+        with self.assertRaises(httpx.HTTPStatusError):
+            await self.make(retries=1).download_to(self.server.url('/file'), io.BytesIO())
+        self.assertEqual(len(self.server.requests), 2)
+
+        with self.assertRaises(httpx.HTTPStatusError):
+            await self.make(retries=3).download_to(self.server.url('/missing'), io.BytesIO())
+        self.assertEqual(self.server.requests[2:], ['/missing'])
+
+if __name__ == '__main__':
+    unittest.main()
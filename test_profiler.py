@@ -0,0 +1,104 @@
+"""
+Тести профілювання завдань: частка завдань у вибірці, звіт із гарячими
+функціями, стеками і пам'яттю, сумарний звіт процесу і ліміт звітів.
+
+    python3 test_profiler.py
+"""
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from profiler import JobProfiler, hot_functions
+
+def busy_work(seconds: float) -> int:
+    deadline = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < deadline:
+        total += sum(range(200))
+    return total
+
+class TestSampling(unittest.TestCase):
+    def run_jobs(self, profiler: JobProfiler, count: int) -> int:
+        sampled = 0
+        for i in range(count):
+            with mock.patch.object(profiler, '_finish') as finish:
+                with profiler.profile(f'job-{i}'):
+                    pass
+            if finish.called:
+                sampled += 1
+                profiler._active = False
+        return sampled
+
+    def test_disabled_by_default(self):
+        profiler = JobProfiler()
+        self.assertFalse(profiler.enabled)
+        self.assertEqual(self.run_jobs(profiler, 50), 0)
+
+    def test_sample_rate_selects_fraction(self):
+        profiler = JobProfiler(sample_rate=0.25, trace_memory=False)
+        with mock.patch('profiler.random.random', side_effect=[0.1, 0.3, 0.24, 0.9, 0.26]):
+            self.assertEqual(self.run_jobs(profiler, 5), 2)
+
+    def test_one_job_at_a_time(self):
+        profiler = JobProfiler(sample_rate=1.0, trace_memory=False)
+        profiler._active = True
+        self.assertEqual(self.run_jobs(profiler, 3), 0)
+
+class TestReports(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+        self.profiler = JobProfiler(self.tempdir.name, sample_rate=1.0, interval=0.001)
+
+    def reports(self, suffix: str):
+        return sorted(name for name in os.listdir(self.tempdir.name)
+                      if name.endswith(suffix) and not name.startswith('hot_functions-'))
+
+    def test_report_is_written(self):
+        with self.profiler.profile('voice-5s'):
+            data = [bytearray(1024) for _ in range(256)]
+            busy_work(0.1)
+        self.profiler.wait(5)
+        self.assertEqual(len(data), 256)
+
+        report_name, = self.reports('.txt')
+        self.assertTrue(report_name.endswith('-voice-5s.txt'))
+        with open(os.path.join(self.tempdir.name, report_name), encoding='utf-8') as f:
+            report = f.read()
+        self.assertIn('Завдання: voice-5s (ok)', report)
+        self.assertIn("Пік пам'яті (tracemalloc)", report)
+        self.assertIn('busy_work', report)
+        self.assertIn("Живі виділення пам'яті", report)
+
+        folded, = self.reports('.folded')
+        with open(os.path.join(self.tempdir.name, folded), encoding='utf-8') as f:
+            lines = f.read().splitlines()
+        self.assertTrue(any('test_profiler.py:busy_work' in line for line in lines))
+        self.assertTrue(all(line.rsplit(' ', 1)[1].isdigit() for line in lines))
+
+        with open(os.path.join(self.tempdir.name, f'hot_functions-{os.getpid()}.txt'), encoding='utf-8') as f:
+            self.assertIn('Профільованих завдань: 1', f.read())
+        self.assertEqual(self.profiler.jobs, 1)
+
+    def test_failed_job_outcome_and_report_limit(self):
+        self.profiler.max_reports = 2
+        for i in range(3):
+            with self.assertRaises(ValueError):
+                with self.profiler.profile(f'job{i}'):
+                    raise ValueError('збій')
+            self.profiler.wait(5)
+        reports = self.reports('.txt')
+        self.assertEqual([name.rsplit('-', 1)[1] for name in reports], ['job1.txt', 'job2.txt'])
+        self.assertEqual(len(self.reports('.folded')), 2)
+        with open(os.path.join(self.tempdir.name, reports[-1]), encoding='utf-8') as f:
+            self.assertIn('(ValueError)', f.read())
+
+class TestHotFunctions(unittest.TestCase):
+    def test_own_and_total_samples(self):
+        stacks = {('main', 'decode'): 3, ('main', 'recognize'): 5, ('main',): 1}
+        self.assertEqual(hot_functions(stacks), [('recognize', 5, 5), ('decode', 3, 3), ('main', 1, 9)])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1 +1,127 @@
- 
\ No newline at end of file
+"""
+Регресійні тести обробника розділових знаків.
+
+Порівнюють результат з еталонами з benchmarks/golden_punctuation.json,
+щоб оптимізації не змінювали вихідний текст непомітно.
+
+    python3 test_punctuation.py
+"""
+import json
+import os
+import tempfile
+import unittest
+
+from punctuation_model import NgramCounter, PunctuationModel, build_table, normalize_word, write_model
+from ukrainian_punctuation import IncrementalPunctuator, UkrainianPunctuationProcessor, improve_ukrainian_text
+
+GOLDEN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                           'benchmarks', 'golden_punctuation.json')
+
+def load_golden():
+    with open(GOLDEN_PATH, encoding='utf-8') as f:
+        return json.load(f)
+
+class TestGoldenPunctuation(unittest.TestCase):
+    def test_matches_golden(self):
+        for case in load_golden():
+            with self.subTest(text=case['input'][:60]):
+                self.assertEqual(improve_ukrainian_text(case['input']), case['output'])
+
+    def test_incremental_matches_batch(self):
+        for case in load_golden():
+            words = case['input'].split()
+            punctuator = IncrementalPunctuator()
+            sentences = []
+            for i in range(0, len(words), 3):
+                sentences.extend(punctuator.feed(' '.join(words[i:i + 3])))
+            sentences.extend(punctuator.flush())
+            with self.subTest(text=case['input'][:60]):
+                self.assertEqual(' '.join(sentences), case['output'])
+
+    def test_empty_text(self):
+        self.assertEqual(improve_ukrainian_text(''), '')
+        self.assertEqual(improve_ukrainian_text('   '), '   ')
+
+class _CountingProcessor(UkrainianPunctuationProcessor):
+    """Рахує слова, що пройшли через обробку речень"""
+
+    def __init__(self):
+        super().__init__()
+        self.words = 0
+
+    def _process_sentence(self, sentence: str) -> str:
+        self.words += len(sentence.split())
+        return super()._process_sentence(sentence)
+
+class TestIncrementalBounded(unittest.TestCase):
+    def test_period_free_input_is_finalized_by_length(self):
+        # Вихід розпізнавача: довгий текст без жодної крапки
+        words = ' '.join(case['input'] for case in load_golden()).replace('.', '').split()[:2000]
+        processor = _CountingProcessor()
+        punctuator = IncrementalPunctuator(processor, max_words=40)
+        sentences = []
+        for i in range(0, len(words), 6):
+            sentences.extend(punctuator.feed(' '.join(words[i:i + 6])))
+            self.assertLessEqual(len(punctuator.pending_text.split()), 40)
+        sentences.extend(punctuator.flush())
+
+        self.assertGreater(len(sentences), len(words) // 50)
+        for sentence in sentences:
+            self.assertLessEqual(len(sentence.split()), 46)
+        # Кожне слово обробляється один раз - робота лінійна, а не квадратична
+        self.assertEqual(processor.words, len(words))
+        self.assertEqual([normalize_word(w) for w in ' '.join(sentences).split()],
+                         [normalize_word(w) for w in words])
+
+class TestPunctuationModel(unittest.TestCase):
+    CORPUS = (
+        "Я люблю каву і чай. Мама купила хліб і молоко.\n\n"
+        "Він прийшов додому, але було вже пізно. Ми гуляли в парку і говорили."
+    )
+
+    @classmethod
+    def setUpClass(cls):
+        counter = NgramCounter()
+        for _ in range(3):
+            counter.add_text(cls.CORPUS)
+        cls.directory = tempfile.TemporaryDirectory()
+        path = os.path.join(cls.directory.name, 'punctuation.bin')
+        write_model(path, build_table(counter.counts, min_count=2), min_count=2)
+        cls.model = PunctuationModel(path)
+        cls.processor = UkrainianPunctuationProcessor(model=cls.model)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.model.close()
+        cls.directory.cleanup()
+
+    def test_seen_contexts_override_rules(self):
+        text = 'я люблю каву і чай мама купила хліб і молоко'
+        self.assertEqual(improve_ukrainian_text(text), 'Я люблю каву, і чай мама купила хліб, і молоко.')
+        self.assertEqual(self.processor.process_text(text), 'Я люблю каву і чай. Мама купила хліб і молоко.')
+
+    def test_unseen_contexts_fall_back_to_rules(self):
+        vocabulary = {normalize_word(token) for token in self.CORPUS.split()}
+        for case in load_golden():
+            if not {normalize_word(token) for token in case['input'].split()} & vocabulary:
+                with self.subTest(text=case['input'][:60]):
+                    self.assertEqual(self.processor.process_text(case['input']), case['output'])
+
+    def test_incremental_matches_batch(self):
+        text = 'він прийшов додому але було вже пізно я люблю каву і чай'
+        punctuator = IncrementalPunctuator(self.processor)
+        sentences = []
+        for fragment in ('він прийшов додому але', 'було вже пізно я люблю', 'каву і чай'):
+            sentences.extend(punctuator.feed(fragment))
+        sentences.extend(punctuator.flush())
+        self.assertEqual(' '.join(sentences), self.processor.process_text(text))
+
+    def test_long_tail_ends_at_model_sentence_end(self):
+        text = 'я люблю каву і чай мама купила хліб і молоко'
+        punctuator = IncrementalPunctuator(self.processor, max_words=5)
+        self.assertEqual(punctuator.feed(text), ['Я люблю каву і чай.'])
+        self.assertEqual(punctuator.pending_text, 'мама купила хліб і молоко')
+        self.assertEqual(punctuator.flush(), ['Мама купила хліб і молоко.'])
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,85 @@
+"""
+Тести пулу розпізнавання BoundedExecutor: порядок задач за пріоритетом,
+відмова при заповненій черзі і звільнення воркера після тайм-ауту або
+скасування.
+
+    python3 test_recognition_pool.py
+"""
+import asyncio
+import threading
+import time
+import unittest
+
+from recognition_pool import BoundedExecutor, QueueFullError
+
+class TestBoundedExecutor(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.executor = BoundedExecutor(max_workers=1)
+
+    async def asyncTearDown(self):
+        self.executor.shutdown()
+
+    async def test_waiting_tasks_start_by_priority(self):
+        gate = threading.Event()
+        order = []
+        blocker = asyncio.ensure_future(self.executor.run(gate.wait, block=True))
+        await asyncio.sleep(0)
+        tasks = [asyncio.ensure_future(self.executor.run(order.append, label, block=True, priority=priority))
+                 for label, priority in (('довгий', 60), ('короткий', 5), ('середній', 20), ('ще короткий', 5))]
+        await asyncio.sleep(0.05)
+        self.assertEqual(self.executor.queue_depth, 4)
+        gate.set()
+        await asyncio.gather(blocker, *tasks)
+        self.assertEqual(order, ['короткий', 'ще короткий', 'середній', 'довгий'])
+        self.assertEqual(self.executor.pending, 0)
+
+    async def test_full_queue_rejects_new_task(self):
+        self.executor.shutdown()
+        self.executor = BoundedExecutor(max_workers=1, max_queue=2)
+        gate = threading.Event()
+        tasks = [asyncio.ensure_future(self.executor.run(gate.wait, block=True)) for _ in range(3)]
+        await asyncio.sleep(0.05)
+        self.assertEqual((self.executor.pending, self.executor.queue_depth), (1, 2))
+        self.assertTrue(self.executor.is_full)
+        with self.assertRaises(QueueFullError):
+            await self.executor.run(time.monotonic)
+        gate.set()
+        await asyncio.gather(*tasks)
+        self.assertFalse(self.executor.is_full)
+        self.assertIsInstance(await self.executor.run(time.monotonic), float)
+
+    async def test_timed_out_task_holds_worker_until_it_finishes(self):
+        gate = threading.Event()
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.executor.run(gate.wait, block=True, timeout=0.05)
+        # Функція ще виконується - воркер зайнятий, наступна задача чекає
+        self.assertEqual(self.executor.pending, 1)
+        self.assertEqual(self.executor.idle_workers, 0)
+        waiting = asyncio.ensure_future(self.executor.run(time.monotonic, block=True))
+        await asyncio.sleep(0.05)
+        self.assertFalse(waiting.done())
+        gate.set()
+        await asyncio.wait_for(waiting, 1)
+        self.assertEqual(self.executor.pending, 0)
+
+    async def test_cancelled_waiter_does_not_leak_slot(self):
+        gate = threading.Event()
+        blocker = asyncio.ensure_future(self.executor.run(gate.wait, block=True))
+        await asyncio.sleep(0)
+        waiting = asyncio.ensure_future(self.executor.run(time.monotonic, block=True))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        gate.set()
+        await blocker
+        with self.assertRaises(asyncio.CancelledError):
+            await waiting
+        self.assertEqual(self.executor.pending, 0)
+        self.assertEqual(await asyncio.wait_for(self.executor.run(sum, [1, 2]), 1), 3)
+
+    async def test_function_error_releases_worker(self):
+        with self.assertRaises(ZeroDivisionError):
+            await self.executor.run(divmod, 1, 0)
+        self.assertEqual(self.executor.pending, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+"""
+Тести бекенда Google проти локальної заміни Speech API: текст
+розпізнавання, помилка сервера, порожній результат і тайм-аут.
+
+    python3 test_recognizers.py
+"""
+import unittest
+
+import speech_recognition as sr
+
+from fake_speech_server import DEFAULT_WORDS, FakeSpeechServer
+from recognizers import GoogleBackend
+
+def make_audio(seconds: float = 2.0) -> sr.AudioData:
+    return sr.AudioData(b'\0\1' * int(16000 * seconds), 16000, 2)
+
+class TestGoogleBackend(unittest.TestCase):
+    def serve(self, **options) -> FakeSpeechServer:
+        server = FakeSpeechServer(**options).start()
+        self.addCleanup(server.stop)
+        return server
+
+    def test_recognized_text(self):
+        server = self.serve()
+        backend = GoogleBackend(endpoint=server.endpoint, timeout=5)
+        backend.warm_up()
+        words = backend.recognize(make_audio()).split()
+        self.assertTrue(words)
+        self.assertTrue(set(words) <= set(DEFAULT_WORDS))
+        self.assertEqual(server.requests, 1)
+
+    def test_server_error(self):
+        server = self.serve(error_rate=1.0)
+        with self.assertRaises(sr.RequestError):
+            GoogleBackend(endpoint=server.endpoint, timeout=5).recognize(make_audio())
+        self.assertEqual(server.errors, 1)
+
+    def test_empty_result_is_unknown_value(self):
+        server = self.serve(unknown_rate=1.0)
+        with self.assertRaises(sr.UnknownValueError):
+            GoogleBackend(endpoint=server.endpoint, timeout=5).recognize(make_audio())
+
+    def test_timeout_is_request_error(self):
+        server = self.serve(latency=1.0)
+        with self.assertRaises(sr.RequestError):
+            GoogleBackend(endpoint=server.endpoint, timeout=0.2).recognize(make_audio())
+
+if __name__ == '__main__':
+    unittest.main()
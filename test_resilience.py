@@ -0,0 +1,172 @@
+"""
+Тести захисту викликів бекендів: стани запобіжника, повтори і перехід на
+резервний бекенд, дублювання повільних спроб і вимір затримки без
+очікування місця в пулі.
+
+    python3 test_resilience.py
+"""
+import asyncio
+import time
+import unittest
+
+import speech_recognition as sr
+
+from recognition_pool import BoundedExecutor
+from resilience import CircuitBreaker, CircuitOpenError, ResilientRecognizer
+
+class FakeBackend:
+    """Бекенд із заданими відповідями: текст, виняток або (затримка, текст)"""
+
+    def __init__(self, name, *responses):
+        self.name = name
+        self.responses = list(responses)
+        self.calls = 0
+
+    def recognize(self, audio):
+        self.calls += 1
+        response = self.responses[min(self.calls, len(self.responses)) - 1]
+        if isinstance(response, tuple):
+            delay, response = response
+            time.sleep(delay)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+class TestCircuitBreaker(unittest.TestCase):
+    def make_breaker(self, **options) -> CircuitBreaker:
+        options = {'failure_rate': 0.5, 'min_calls': 4, 'window': 60, 'cooldown': 0.05, **options}
+        return CircuitBreaker('test', **options)
+
+    def trip(self, breaker: CircuitBreaker):
+        for _ in range(breaker.min_calls):
+            self.assertTrue(breaker.allow())
+            breaker.record(False)
+
+    def test_opens_after_min_calls_at_failure_rate(self):
+        breaker = self.make_breaker()
+        for ok in (False, False, True):
+            breaker.record(ok)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        breaker.record(False)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+
+    def test_failure_rate_below_threshold_stays_closed(self):
+        breaker = self.make_breaker()
+        for ok in (False, True, True, True, False, True):
+            breaker.record(ok)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+    def test_half_open_allows_single_probe(self):
+        breaker = self.make_breaker()
+        self.trip(breaker)
+        time.sleep(0.06)
+        self.assertTrue(breaker.allow())
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertFalse(breaker.allow())
+
+    def test_probe_success_closes(self):
+        breaker = self.make_breaker()
+        self.trip(breaker)
+        time.sleep(0.06)
+        breaker.allow()
+        breaker.record(True)
+        self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+        self.assertTrue(breaker.allow())
+
+    def test_probe_failure_reopens(self):
+        breaker = self.make_breaker()
+        self.trip(breaker)
+        time.sleep(0.06)
+        breaker.allow()
+        breaker.record(False)
+        self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+        self.assertFalse(breaker.allow())
+
+    def test_cancelled_probe_frees_slot(self):
+        breaker = self.make_breaker()
+        self.trip(breaker)
+        time.sleep(0.06)
+        breaker.allow()
+        breaker.record(None)
+        self.assertEqual(breaker.state, CircuitBreaker.HALF_OPEN)
+        self.assertTrue(breaker.allow())
+
+class TestResilientRecognizer(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.executor = BoundedExecutor(max_workers=2)
+
+    async def asyncTearDown(self):
+        self.executor.shutdown()
+
+    def make(self, backends, **options) -> ResilientRecognizer:
+        options.setdefault('backoff', 0.001)
+        return ResilientRecognizer(backends, self.executor.run,
+                                   idle_workers=lambda: self.executor.idle_workers, **options)
+
+    async def test_request_error_is_retried(self):
+        backend = FakeBackend('a', sr.RequestError('збій'), 'текст')
+        self.assertEqual(await self.make([backend]).recognize(None), 'текст')
+        self.assertEqual(backend.calls, 2)
+
+    async def test_unknown_value_is_not_retried(self):
+        backend = FakeBackend('a', sr.UnknownValueError(), 'текст')
+        fallback = FakeBackend('b', 'резерв')
+        with self.assertRaises(sr.UnknownValueError):
+            await self.make([backend, fallback]).recognize(None)
+        self.assertEqual((backend.calls, fallback.calls), (1, 0))
+
+    async def test_falls_back_after_retries(self):
+        primary = FakeBackend('a', sr.RequestError('збій'))
+        fallback = FakeBackend('b', 'резерв')
+        recognizer = self.make([primary, fallback], retries=1)
+        self.assertEqual(await recognizer.recognize(None), 'резерв')
+        self.assertEqual(primary.calls, 2)
+
+    async def test_open_circuit_skips_backend(self):
+        primary = FakeBackend('a', 'основний')
+        fallback = FakeBackend('b', 'резерв')
+        recognizer = self.make([primary, fallback])
+        recognizer.breakers['a']._open()
+        self.assertEqual(await recognizer.recognize(None), 'резерв')
+        self.assertEqual(primary.calls, 0)
+
+    async def test_all_backends_unavailable(self):
+        recognizer = self.make([FakeBackend('a', 'текст')])
+        recognizer.breakers['a']._open()
+        with self.assertRaises(CircuitOpenError):
+            await recognizer.recognize(None)
+
+    async def test_deadline_becomes_request_error(self):
+        backend = FakeBackend('a', (0.2, 'пізно'))
+        with self.assertRaises(sr.RequestError):
+            await self.make([backend], deadline=0.05, retries=0).recognize(None)
+
+    async def test_slow_attempt_is_hedged_when_worker_idle(self):
+        backend = FakeBackend('a', (0.3, 'повільно'), 'швидко')
+        recognizer = self.make([backend], hedge_percentile=0.5, hedge_min_samples=1)
+        recognizer.latency['a'].record(0.02)
+        self.assertEqual(await recognizer.recognize(None), 'швидко')
+        self.assertEqual(backend.calls, 2)
+
+    async def test_no_hedge_when_pool_saturated(self):
+        backend = FakeBackend('a', (0.2, 'повільно'), 'швидко')
+        recognizer = self.make([backend], hedge_percentile=0.5, hedge_min_samples=1)
+        recognizer.latency['a'].record(0.02)
+        blocker = asyncio.ensure_future(self.executor.run(time.sleep, 0.3, block=True))
+        await asyncio.sleep(0)
+        self.assertEqual(await recognizer.recognize(None), 'повільно')
+        self.assertEqual(backend.calls, 1)
+        await blocker
+
+    async def test_latency_excludes_pool_wait(self):
+        self.executor.shutdown()
+        self.executor = BoundedExecutor(max_workers=1)
+        backend = FakeBackend('a', (0.1, 'текст'))
+        recognizer = self.make([backend])
+        await asyncio.gather(recognizer.recognize(None), recognizer.recognize(None))
+        self.assertEqual(recognizer.latency['a'].calls, 2)
+        self.assertLess(recognizer.latency['a'].percentile(1.0), 0.18)
+
+if __name__ == '__main__':
+    unittest.main()
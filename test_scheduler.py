@@ -0,0 +1,118 @@
+"""
+Тести планувальника за тривалістю: старіння пріоритету, бюджет секунд
+аудіо, м'яка і жорстка квоти і облік завдань черги.
+
+    python3 test_scheduler.py
+"""
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from job_queue import JobQueue
+from scheduler import DurationScheduler, SchedulingRejected
+
+class TestDurationScheduler(unittest.TestCase):
+    def make_scheduler(self, **options) -> DurationScheduler:
+        options = {'max_queued_seconds': 100, 'max_jobs_per_chat': 2, 'max_jobs_per_user': 2,
+                   'overquota_penalty': 1000, **options}
+        return DurationScheduler(**options)
+
+    def test_shorter_first(self):
+        scheduler = self.make_scheduler()
+        long = scheduler.admit(1, 1, 60)
+        short = scheduler.admit(2, 2, 5)
+        self.assertLess(short.priority, long.priority)
+
+    def test_waiting_long_job_ages_ahead_of_new_short(self):
+        scheduler = self.make_scheduler(aging_rate=2.0)
+        with mock.patch('scheduler.time.monotonic', return_value=1000.0):
+            long = scheduler.admit(1, 1, 60)
+        # 60 с тривалості списуються за 30 с очікування
+        with mock.patch('scheduler.time.monotonic', return_value=1029.0):
+            self.assertGreater(long.priority, scheduler.admit(2, 2, 1).priority)
+        with mock.patch('scheduler.time.monotonic', return_value=1031.0):
+            self.assertLess(long.priority, scheduler.admit(3, 3, 1).priority)
+
+    def test_budget_rejects_and_release_restores(self):
+        scheduler = self.make_scheduler()
+        first = scheduler.admit(1, 1, 60)
+        with self.assertRaises(SchedulingRejected) as caught:
+            scheduler.admit(2, 2, 50)
+        self.assertEqual(caught.exception.reason, 'budget')
+        scheduler.release(first)
+        scheduler.release(first)
+        self.assertEqual((scheduler.queued_seconds, scheduler.jobs), (0.0, 0))
+        scheduler.admit(2, 2, 50)
+
+    def test_too_long(self):
+        with self.assertRaises(SchedulingRejected) as caught:
+            self.make_scheduler().admit(1, 1, 101)
+        self.assertEqual(caught.exception.reason, 'too_long')
+
+    def test_unknown_duration_uses_default(self):
+        ticket = self.make_scheduler(default_duration=30).admit(1, 1, None)
+        self.assertEqual(ticket.duration, 30)
+
+    def test_over_quota_deprioritized_not_rejected(self):
+        scheduler = self.make_scheduler()
+        tickets = [scheduler.admit(1, user, 5) for user in (1, 2, 3)]
+        self.assertEqual([ticket.penalty for ticket in tickets], [0, 0, 1000])
+        other = scheduler.admit(2, 4, 30)
+        self.assertLess(other.priority, tickets[2].priority)
+
+        self.assertEqual(scheduler.admit(3, 1, 5).penalty, 0)
+        self.assertEqual(scheduler.admit(4, 1, 5).penalty, 1000)
+        scheduler.release(tickets[0])
+        self.assertEqual(scheduler.admit(1, 5, 5).penalty, 1000)
+
+    def test_hard_quota_rejects(self):
+        scheduler = self.make_scheduler(hard_jobs_per_chat=3, hard_jobs_per_user=4)
+        for user in (1, 2, 3):
+            scheduler.admit(1, user, 1)
+        with self.assertRaises(SchedulingRejected) as caught:
+            scheduler.admit(1, 4, 1)
+        self.assertEqual(caught.exception.reason, 'chat_quota')
+
+        for chat in (2, 3, 4):
+            scheduler.admit(chat, 9, 1)
+        ticket = scheduler.admit(5, 9, 1)
+        with self.assertRaises(SchedulingRejected) as caught:
+            scheduler.admit(6, 9, 1)
+        self.assertEqual(caught.exception.reason, 'user_quota')
+        scheduler.release(ticket)
+        scheduler.admit(6, 9, 1)
+
+    def test_backlog_counts_towards_budget_and_quota(self):
+        backlog = {'seconds': 80.0, 'jobs': 2}
+        scheduler = self.make_scheduler(
+            backlog=lambda chat_id, user_id: (backlog['seconds'], backlog['jobs'], 0)
+        )
+        with self.assertRaises(SchedulingRejected):
+            scheduler.admit(1, 1, 30)
+        self.assertEqual(scheduler.admit(1, 1, 10).penalty, 1000)
+        backlog.update(seconds=0.0, jobs=20)
+        with self.assertRaises(SchedulingRejected) as caught:
+            scheduler.admit(1, 3, 1)
+        self.assertEqual(caught.exception.reason, 'chat_quota')
+        backlog.update(seconds=0.0, jobs=0)
+        self.assertEqual(scheduler.admit(1, 2, 30).penalty, 0)
+
+class TestJobQueueBacklog(unittest.TestCase):
+    def test_unfinished_jobs_are_counted(self):
+        with tempfile.TemporaryDirectory() as tempdir:
+            queue = JobQueue(os.path.join(tempdir, 'jobs.db'))
+            try:
+                done_id = queue.enqueue({'chat_id': 2, 'user_id': 10, 'duration': 50})
+                queue.enqueue({'chat_id': 1, 'user_id': 10, 'duration': 20})
+                queue.enqueue({'chat_id': 1, 'user_id': 11, 'duration': None})
+                self.assertEqual(queue.backlog(1, 10, default_duration=60), (130.0, 2, 2))
+                self.assertEqual(queue.claim('w').id, done_id)
+                self.assertEqual(queue.backlog(1, 10, default_duration=60), (130.0, 2, 2))
+                queue.complete(done_id, 'w')
+                self.assertEqual(queue.backlog(2, 10, default_duration=60), (80.0, 0, 1))
+            finally:
+                queue.close()
+
+if __name__ == '__main__':
+    unittest.main()
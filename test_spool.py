@@ -0,0 +1,190 @@
+"""
+Тести PCM на диску і бюджету пам'яті: запис великого PCM у файл,
+відображений через numpy.memmap, і його видалення після close(), черга
+резервувань пам'яті за пріоритетом і резервування, більше за весь бюджет.
+
+    python3 test_spool.py
+"""
+import asyncio
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+import numpy as np
+
+from recognition_pool import BoundedExecutor
+from spool import MemoryBudget, PcmBuffer
+from transcriber import Transcriber
+
+class FakeDownloader:
+    def __init__(self, data: bytes):
+        self.data = data
+
+    async def download_to(self, file_path, file):
+        file.write(self.data)
+
+class FakeDecoder:
+    """Декодування - копія вхідного файлу як PCM"""
+
+    sample_rate = 16000
+
+    async def decode_to_file(self, source, destination, max_seconds=None):
+        with open(source, 'rb') as src, open(destination, 'wb') as dst:
+            data = src.read()
+            dst.write(data)
+        return len(data)
+
+class TestPcmBuffer(unittest.TestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tempdir.cleanup)
+
+    def make(self, samples) -> PcmBuffer:
+        path = PcmBuffer.create(self.tempdir.name)
+        np.asarray(samples, dtype=np.int16).tofile(path)
+        return PcmBuffer(path, 16000)
+
+    def test_samples_are_memory_mapped_and_trimmed_without_copy(self):
+        buffer = self.make(np.arange(1000))
+        self.assertIsInstance(buffer.samples, np.memmap)
+        self.assertEqual((buffer.nbytes, buffer.duration), (2000, 1000 / 16000))
+        buffer.trim(100, 900)
+        buffer.trim(100, 700)
+        self.assertEqual(buffer.window, (200, 800))
+        self.assertEqual(buffer.samples[0], 200)
+        self.assertEqual(buffer.nbytes, 1200)
+        buffer.close()
+
+    def test_close_deletes_file(self):
+        buffer = self.make(np.arange(10))
+        self.assertTrue(os.path.exists(buffer.path))
+        buffer.close()
+        self.assertFalse(os.path.exists(buffer.path))
+        self.assertEqual(len(buffer.samples), 0)
+        buffer.close()
+
+    def test_empty_file(self):
+        buffer = self.make([])
+        self.assertEqual((len(buffer.samples), buffer.nbytes), (0, 0))
+        buffer.close()
+
+class TestSpill(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.executor = BoundedExecutor(max_workers=2)
+        self.pcm = (np.arange(48000) % 2000 - 1000).astype(np.int16).tobytes()
+        self.transcriber = Transcriber(
+            FakeDownloader(self.pcm), FakeDecoder(), self.executor,
+            SimpleNamespace(max_segment_seconds=30), None,
+            spool_threshold=64000, spool_dir=self.tempdir.name
+        )
+
+    async def asyncTearDown(self):
+        self.executor.shutdown()
+        self.tempdir.cleanup()
+
+    def test_threshold_decides_spill(self):
+        spool, footprint = self.transcriber.plan_memory(None, 1.0)
+        self.assertFalse(spool)
+        spool, spilled_footprint = self.transcriber.plan_memory(None, 600.0)
+        self.assertTrue(spool)
+        # На диску запис будь-якої довжини займає в пам'яті лише сегменти в роботі
+        self.assertEqual(spilled_footprint, self.transcriber.plan_memory(None, 3600.0)[1])
+
+    async def test_spilled_pcm_is_mapped_from_spool_dir_and_removed(self):
+        buffer = await self.transcriber.download_and_convert_audio('file', spool=True)
+        self.assertIsInstance(buffer, PcmBuffer)
+        self.assertEqual(os.path.dirname(buffer.path), self.tempdir.name)
+        # Тимчасовий файл медіа вже видалено, лишився тільки PCM
+        self.assertEqual(os.listdir(self.tempdir.name), [os.path.basename(buffer.path)])
+        self.assertEqual(buffer.samples.tobytes(), self.pcm)
+        buffer.close()
+        self.assertEqual(os.listdir(self.tempdir.name), [])
+
+class TestMemoryBudget(unittest.IsolatedAsyncioTestCase):
+    async def hold(self, budget, nbytes, order, label, release, priority=0.0):
+        async with budget.reserve(nbytes, priority):
+            order.append(label)
+            await release.wait()
+
+    async def test_waits_then_admits_by_priority(self):
+        budget = MemoryBudget(100)
+        order = []
+        release = {label: asyncio.Event() for label in ('перше', 'довге', 'коротке', 'середнє')}
+        first = asyncio.ensure_future(self.hold(budget, 80, order, 'перше', release['перше']))
+        await asyncio.sleep(0)
+        waiters = [asyncio.ensure_future(self.hold(budget, 60, order, label, release[label], priority))
+                   for label, priority in (('довге', 60), ('коротке', 5), ('середнє', 20))]
+        await asyncio.sleep(0.01)
+        self.assertEqual((order, budget.used, budget.waiting), (['перше'], 80, 3))
+
+        for label in ('перше', 'коротке', 'середнє'):
+            release[label].set()
+            await asyncio.sleep(0.01)
+        self.assertEqual(order, ['перше', 'коротке', 'середнє', 'довге'])
+        release['довге'].set()
+        await asyncio.gather(first, *waiters)
+        self.assertEqual((budget.used, budget.waiting), (0, 0))
+
+    async def test_head_of_queue_is_not_overtaken_by_smaller(self):
+        budget = MemoryBudget(100)
+        order = []
+        release = {label: asyncio.Event() for label in ('перше', 'велике', 'мале')}
+        first = asyncio.ensure_future(self.hold(budget, 50, order, 'перше', release['перше']))
+        await asyncio.sleep(0)
+        big = asyncio.ensure_future(self.hold(budget, 80, order, 'велике', release['велике']))
+        await asyncio.sleep(0)
+        small = asyncio.ensure_future(self.hold(budget, 10, order, 'мале', release['мале']))
+        await asyncio.sleep(0.01)
+        # Мале вмістилося б, але велике стоїть у черзі першим
+        self.assertEqual(order, ['перше'])
+        for event in release.values():
+            event.set()
+        await asyncio.gather(first, big, small)
+        self.assertEqual(order, ['перше', 'велике', 'мале'])
+
+    async def test_reservation_larger_than_budget_runs_alone(self):
+        budget = MemoryBudget(100)
+        order = []
+        release = {label: asyncio.Event() for label in ('мале', 'величезне', 'наступне')}
+        small = asyncio.ensure_future(self.hold(budget, 10, order, 'мале', release['мале']))
+        await asyncio.sleep(0)
+        huge = asyncio.ensure_future(self.hold(budget, 1000, order, 'величезне', release['величезне']))
+        await asyncio.sleep(0.01)
+        self.assertEqual(order, ['мале'])
+        release['мале'].set()
+        await asyncio.sleep(0.01)
+        self.assertEqual((order, budget.used), (['мале', 'величезне'], 100))
+        after = asyncio.ensure_future(self.hold(budget, 1, order, 'наступне', release['наступне']))
+        await asyncio.sleep(0.01)
+        self.assertNotIn('наступне', order)
+        release['величезне'].set()
+        release['наступне'].set()
+        await asyncio.gather(small, huge, after)
+        self.assertEqual(budget.used, 0)
+
+    async def test_cancelled_waiter_frees_its_place(self):
+        budget = MemoryBudget(100)
+        order = []
+        release = {label: asyncio.Event() for label in ('перше', 'скасоване', 'наступне')}
+        first = asyncio.ensure_future(self.hold(budget, 90, order, 'перше', release['перше']))
+        await asyncio.sleep(0)
+        cancelled = asyncio.ensure_future(self.hold(budget, 50, order, 'скасоване', release['скасоване']))
+        waiting = asyncio.ensure_future(self.hold(budget, 50, order, 'наступне', release['наступне']))
+        await asyncio.sleep(0.01)
+        cancelled.cancel()
+        release['перше'].set()
+        release['наступне'].set()
+        await asyncio.gather(first, waiting)
+        self.assertEqual(order, ['перше', 'наступне'])
+        self.assertEqual((budget.used, budget.waiting), (0, 0))
+
+    async def test_zero_limit_never_waits(self):
+        budget = MemoryBudget(0)
+        async with budget.reserve(10 ** 12):
+            async with budget.reserve(10 ** 12):
+                self.assertEqual(budget.waiting, 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,157 @@
+"""
+Тести запуску бота: готовність після створення і прогріву конвеєра (із
+заміною завантажувача Transcriber), прийом повідомлень під час прогріву,
+відповідь "зайнятий" при заповненій черзі пулу і затримка першого
+повідомлення, яка рахується лише для завершеного розпізнавання.
+
+    python3 test_startup.py
+"""
+import os
+import tempfile
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from bot import BUSY_TEXT, VoiceBot
+from metrics import REGISTRY
+
+class FakeTranscriber:
+    """Конвеєр без розпізнавання: лише те, що бот читає після прогріву"""
+
+    def __init__(self):
+        self.recognizer = object()
+        self.executor = SimpleNamespace(pending=0, queue_depth=0, is_full=False)
+        self.memory_budget = SimpleNamespace(used=0, waiting=0)
+        self.resilient = None
+        self.warmed_up = False
+
+    async def warm_up(self, file_url):
+        self.warmed_up = True
+        return {'decode': 0.01}
+
+def make_update(duration=5):
+    media = SimpleNamespace(file_id='file', file_unique_id='unique', file_size=1000, duration=duration)
+    placeholder = SimpleNamespace(chat_id=1, message_id=11, edit_text=mock.AsyncMock())
+    message = SimpleNamespace(chat_id=1, message_id=10, from_user=SimpleNamespace(id=7, first_name='Тест'),
+                              voice=media, audio=None, video=None, video_note=None,
+                              reply_text=mock.AsyncMock(return_value=placeholder))
+    return SimpleNamespace(message=message, effective_message=message), media
+
+class StartupTestCase(unittest.IsolatedAsyncioTestCase):
+    warmup_mode = 'background'
+
+    async def asyncSetUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        env = {
+            'BOT_TOKEN': '0:test',
+            'TRANSCRIBE_MODE': 'inline',
+            'WARMUP_MODE': self.warmup_mode,
+            'CACHE_DB_PATH': os.path.join(self.tempdir.name, 'cache.db'),
+            'JOURNAL_PATH': os.path.join(self.tempdir.name, 'journal.db'),
+        }
+        with mock.patch.dict(os.environ, env):
+            self.bot = VoiceBot()
+        self.transcriber = FakeTranscriber()
+        patcher = mock.patch.object(VoiceBot, '_load_transcriber', return_value=self.transcriber)
+        self.load_transcriber = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        self.bot.cache.close()
+        self.bot.journal.close()
+        self.tempdir.cleanup()
+
+    def ready_metric(self) -> str:
+        return REGISTRY.get('voicebot_ready').render()[-1]
+
+class TestReadiness(StartupTestCase):
+    async def test_ready_after_pipeline_warm_up(self):
+        self.assertFalse(self.bot.is_ready)
+        self.assertEqual(self.ready_metric(), 'voicebot_ready 0.0')
+        await self.bot._warm_up()
+        self.assertTrue(self.transcriber.warmed_up)
+        self.assertTrue(self.bot.is_ready)
+        self.assertEqual(self.ready_metric(), 'voicebot_ready 1.0')
+        self.assertLessEqual({'import', 'init', 'pipeline', 'warmup', 'warmup_decode', 'ready'},
+                             set(self.bot.startup_seconds))
+
+    async def test_loader_error_stops_bot_without_ready(self):
+        self.load_transcriber.side_effect = RuntimeError('немає моделі')
+        with mock.patch.object(self.bot, '_request_stop') as request_stop, \
+                self.assertLogs('bot', level='ERROR'):
+            await self.bot._warm_up()
+        request_stop.assert_called_once()
+        self.assertIsInstance(self.bot._warmup_error, RuntimeError)
+        self.assertFalse(self.bot.is_ready)
+
+class TestSkippedWarmUp(StartupTestCase):
+    warmup_mode = 'off'
+
+    async def test_ready_without_warm_up(self):
+        await self.bot._warm_up()
+        self.assertFalse(self.transcriber.warmed_up)
+        self.assertTrue(self.bot.is_ready)
+        self.assertNotIn('warmup', self.bot.startup_seconds)
+
+class TestBusyPool(StartupTestCase):
+    async def process(self):
+        update, media = make_update()
+        with mock.patch.object(self.bot, '_run_job', mock.AsyncMock(return_value=True)) as run_job:
+            await self.bot._process_media(update, SimpleNamespace(bot=mock.AsyncMock()), media,
+                                          processing_text="Обробляю {user_name}...",
+                                          convert_error_text="Помилка обробки аудіо",
+                                          error_text="Помилка обробки")
+        return update, run_job
+
+    async def test_message_during_warm_up_is_accepted(self):
+        update, run_job = await self.process()
+        run_job.assert_awaited_once()
+        self.assertEqual(update.message.reply_text.await_args.args[0], "Обробляю Тест...")
+
+    async def test_full_pool_queue_replies_busy(self):
+        await self.bot._warm_up()
+        self.transcriber.executor.is_full = True
+        with self.assertLogs('bot', level='WARNING'):
+            update, run_job = await self.process()
+        run_job.assert_not_awaited()
+        self.assertEqual(update.message.reply_text.await_args.args[0], BUSY_TEXT)
+
+class TestFirstMessage(StartupTestCase):
+    async def asyncSetUp(self):
+        await super().asyncSetUp()
+        await self.bot._warm_up()
+
+    async def process(self, completed: bool):
+        update, media = make_update()
+        with mock.patch.object(self.bot, '_run_job', mock.AsyncMock(return_value=completed)) as run_job:
+            await self.bot._process_media(update, SimpleNamespace(bot=mock.AsyncMock()), media,
+                                          processing_text="Обробляю {user_name}...",
+                                          convert_error_text="Помилка обробки аудіо",
+                                          error_text="Помилка обробки")
+        run_job.assert_awaited_once()
+
+    async def test_failed_job_does_not_count(self):
+        await self.process(completed=False)
+        self.assertIsNone(self.bot.first_message_seconds)
+        self.assertEqual(REGISTRY.get('voicebot_first_message_seconds').render()[-1],
+                         'voicebot_first_message_seconds 0.0')
+
+    async def test_first_completed_job_is_recorded_once(self):
+        await self.process(completed=True)
+        first = self.bot.first_message_seconds
+        self.assertIsNotNone(first)
+        await self.process(completed=True)
+        self.assertEqual(self.bot.first_message_seconds, first)
+
+    async def test_rejection_does_not_count(self):
+        update, media = make_update()
+        media.file_size = self.bot.max_file_size + 1
+        await self.bot._process_media(update, SimpleNamespace(bot=mock.AsyncMock()), media,
+                                      processing_text="Обробляю {user_name}...",
+                                      convert_error_text="Помилка обробки аудіо",
+                                      error_text="Помилка обробки")
+        update.message.reply_text.assert_awaited_once()
+        self.assertIsNone(self.bot.first_message_seconds)
+
+if __name__ == '__main__':
+    unittest.main()
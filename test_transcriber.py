@@ -0,0 +1,145 @@
+"""
+Тести конвеєра Transcriber без мережі: зупинка решти сегментів після
+непоправної помилки одного з них і обрізання відео до VIDEO_MAX_SECONDS
+(потрібен ffmpeg).
+
+    python3 test_transcriber.py
+"""
+import asyncio
+import io
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import wave
+
+import numpy as np
+import speech_recognition as sr
+
+from audio_decoder import AudioDecoder
+from recognition_pool import BoundedExecutor
+from recognizers import RecognizerBackend
+from resilience import ResilientRecognizer
+from transcriber import RecognitionUnavailableError, Transcriber
+
+class FixedSegmenter:
+    """Межі сегментів задані наперед"""
+
+    def __init__(self, bounds):
+        self.bounds = bounds
+
+    def split(self, samples, sample_rate):
+        return self.bounds
+
+class SegmentBackend(RecognizerBackend):
+    """Перший сегмент - помилка сервісу, решта чекають на gate"""
+
+    name = 'fake'
+
+    def __init__(self):
+        super().__init__()
+        self.calls = 0
+        self.gate = threading.Event()
+
+    def recognize(self, audio):
+        self.calls += 1
+        if audio.frame_data[:2] == b'\x01\x00':
+            raise sr.RequestError('сервіс недоступний')
+        self.gate.wait(5)
+        return 'текст'
+
+class FakeDownloader:
+    """Віддає файл із пам'яті і запам'ятовує, куди його записано"""
+
+    def __init__(self, data: bytes):
+        self.data = data
+        self.paths = []
+
+    async def download_to(self, file_path, file):
+        self.paths.append(getattr(file, 'name', None))
+        file.write(self.data)
+
+def make_wav(seconds: float, sample_rate: int = 16000) -> bytes:
+    tone = (np.sin(2 * np.pi * 220 * np.arange(int(seconds * sample_rate)) / sample_rate) * 8000)
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(tone.astype(np.int16).tobytes())
+    return buffer.getvalue()
+
+@unittest.skipUnless(shutil.which(os.getenv('FFMPEG_PATH', 'ffmpeg')), "потрібен ffmpeg")
+class TestVideoLimit(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.executor = BoundedExecutor(max_workers=1)
+
+    async def asyncTearDown(self):
+        self.executor.shutdown()
+        self.tempdir.cleanup()
+
+    def make(self, seconds: float, **options) -> Transcriber:
+        self.downloader = FakeDownloader(make_wav(seconds))
+        decoder = AudioDecoder(ffmpeg_path=os.getenv('FFMPEG_PATH', 'ffmpeg'))
+        return Transcriber(self.downloader, decoder, self.executor, FixedSegmenter([]), None,
+                           spool_dir=self.tempdir.name, **options)
+
+    async def test_video_is_cut_at_limit(self):
+        transcriber = self.make(3.0, video_max_seconds=1.0)
+        audio = await transcriber.download_and_convert_audio('video', video=True)
+        self.assertAlmostEqual(len(audio.frame_data) / 2 / audio.sample_rate, 1.0, delta=0.05)
+        # Тимчасовий файл відео створено в SPOOL_DIR і вже видалено
+        self.assertEqual(os.path.dirname(self.downloader.paths[0]), self.tempdir.name)
+        self.assertEqual(os.listdir(self.tempdir.name), [])
+
+    async def test_spooled_video_is_cut_at_limit(self):
+        transcriber = self.make(3.0, video_max_seconds=1.0)
+        buffer = await transcriber.download_and_convert_audio('video', video=True, spool=True)
+        try:
+            self.assertAlmostEqual(buffer.duration, 1.0, delta=0.05)
+        finally:
+            buffer.close()
+
+    async def test_audio_and_short_video_are_not_cut(self):
+        transcriber = self.make(2.0, video_max_seconds=1.0)
+        audio = await transcriber.download_and_convert_audio('audio')
+        self.assertAlmostEqual(len(audio.frame_data) / 2 / audio.sample_rate, 2.0, delta=0.05)
+        transcriber = self.make(0.5, video_max_seconds=1.0)
+        audio = await transcriber.download_and_convert_audio('video', video=True)
+        self.assertAlmostEqual(len(audio.frame_data) / 2 / audio.sample_rate, 0.5, delta=0.05)
+
+class TestRecognizeSpeech(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.executor = BoundedExecutor(max_workers=2)
+
+    async def asyncTearDown(self):
+        self.executor.shutdown()
+
+    def make(self, backend, bounds) -> Transcriber:
+        resilient = ResilientRecognizer([backend], self.executor.run, retries=0,
+                                        idle_workers=lambda: self.executor.idle_workers)
+        return Transcriber(None, None, self.executor, FixedSegmenter(bounds), backend, resilient=resilient)
+
+    async def test_first_error_cancels_remaining_segments(self):
+        backend = SegmentBackend()
+        samples = np.zeros(400, dtype=np.int16)
+        samples[0] = 1
+        audio = sr.AudioData(samples.tobytes(), 16000, 2)
+        transcriber = self.make(backend, [(0, 100), (100, 200), (200, 300), (300, 400)])
+        started = time.monotonic()
+        with self.assertLogs('transcriber', level='ERROR'):
+            with self.assertRaises(RecognitionUnavailableError):
+                await asyncio.wait_for(transcriber.recognize_speech(audio), 2)
+        self.assertLess(time.monotonic() - started, 1)
+        backend.gate.set()
+        await asyncio.sleep(0.05)
+        # Вікно, звільнене помилкою, може встигнути взяти наступний сегмент,
+        # але решта сегментів до бекенда вже не доходить
+        self.assertLess(backend.calls, 4)
+        self.assertEqual(self.executor.pending, 0)
+
+if __name__ == '__main__':
+    unittest.main()
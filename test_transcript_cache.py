@@ -0,0 +1,148 @@
+"""
+Тести кешу транскриптів: об'єднання одночасних запитів на той самий
+файл, передача винятку всім очікувачам, TTL, LRU і періодичне
+очищення застарілих записів на диску.
+
+    python3 test_transcript_cache.py
+"""
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from transcript_cache import TranscriptCache
+
+class CacheTestCase(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.cache = self.make_cache()
+
+    def tearDown(self):
+        self.cache.close()
+        self.tempdir.cleanup()
+
+    def make_cache(self, **options) -> TranscriptCache:
+        return TranscriptCache(os.path.join(self.tempdir.name, 'transcripts.db'), **options)
+
+class TestCoalescing(CacheTestCase):
+    async def test_concurrent_requests_compute_once(self):
+        calls = 0
+        release = asyncio.Event()
+
+        async def compute():
+            nonlocal calls
+            calls += 1
+            await release.wait()
+            return 'текст'
+
+        waiters = [asyncio.ensure_future(self.cache.get_or_compute('file', compute)) for _ in range(5)]
+        await asyncio.sleep(0)
+        self.assertTrue(self.cache.is_inflight('file'))
+        release.set()
+        self.assertEqual(await asyncio.gather(*waiters), ['текст'] * 5)
+        self.assertEqual(calls, 1)
+        self.assertEqual((self.cache.misses, self.cache.coalesced), (1, 4))
+        self.assertFalse(self.cache.is_inflight('file'))
+        self.assertEqual(self.cache.get('file'), 'текст')
+
+    async def test_exception_reaches_all_waiters_and_is_not_cached(self):
+        release = asyncio.Event()
+
+        async def compute():
+            await release.wait()
+            raise RuntimeError('бекенд недоступний')
+
+        waiters = [asyncio.ensure_future(self.cache.get_or_compute('file', compute)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+        results = await asyncio.gather(*waiters, return_exceptions=True)
+        self.assertTrue(all(isinstance(result, RuntimeError) for result in results))
+        self.assertFalse(self.cache.is_inflight('file'))
+
+        async def retry():
+            return 'вдруге'
+        self.assertEqual(await self.cache.get_or_compute('file', retry), 'вдруге')
+
+    async def test_cancelled_waiter_does_not_cancel_computation(self):
+        release = asyncio.Event()
+
+        async def compute():
+            await release.wait()
+            return 'текст'
+
+        owner = asyncio.ensure_future(self.cache.get_or_compute('file', compute))
+        waiter = asyncio.ensure_future(self.cache.get_or_compute('file', compute))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        release.set()
+        self.assertEqual(await owner, 'текст')
+
+    async def test_empty_result_is_not_cached(self):
+        async def compute():
+            return None
+        self.assertIsNone(await self.cache.get_or_compute('file', compute))
+        self.assertIsNone(self.cache.get('file'))
+        self.assertEqual(self.cache.misses, 1)
+
+class TestExpiry(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache.close()
+        self.cache = self.make_cache(ttl=60, max_entries=2)
+
+    def test_memory_and_disk_entries_expire(self):
+        with mock.patch('transcript_cache.time.time', return_value=1000.0):
+            self.cache.put('file', 'текст')
+        with mock.patch('transcript_cache.time.time', return_value=1059.0):
+            self.assertEqual(self.cache.get('file'), 'текст')
+        with mock.patch('transcript_cache.time.time', return_value=1061.0):
+            self.assertIsNone(self.cache.get('file'))
+            self.assertEqual(self.cache._db.execute('SELECT COUNT(*) FROM transcripts').fetchone()[0], 0)
+
+    def test_disk_entry_survives_restart_until_ttl(self):
+        with mock.patch('transcript_cache.time.time', return_value=1000.0):
+            self.cache.put('file', 'текст')
+        self.cache.close()
+        self.cache = self.make_cache(ttl=60)
+        with mock.patch('transcript_cache.time.time', return_value=1030.0):
+            self.assertEqual(self.cache.get('file'), 'текст')
+        self.assertEqual((self.cache.disk_hits, self.cache.memory_hits), (1, 0))
+        with mock.patch('transcript_cache.time.time', return_value=1070.0):
+            self.assertIsNone(self.cache.get('file'))
+
+    def test_lru_evicts_from_memory_only(self):
+        for key in ('a', 'b'):
+            self.cache.put(key, key)
+        self.cache.get('a')
+        self.cache.put('c', 'c')
+        self.assertEqual(list(self.cache._memory), ['a', 'c'])
+        self.assertEqual(self.cache.get('b'), 'b')
+        self.assertEqual(self.cache.disk_hits, 1)
+
+class TestPurge(CacheTestCase):
+    def count(self) -> int:
+        return self.cache._db.execute('SELECT COUNT(*) FROM transcripts').fetchone()[0]
+
+    def test_expired_rows_purged_periodically(self):
+        self.cache.close()
+        self.cache = self.make_cache(ttl=60, purge_interval=100)
+        with mock.patch('transcript_cache.time.time', return_value=1000.0):
+            self.cache.put('old', 'текст')
+        with mock.patch('transcript_cache.time.time', return_value=1070.0):
+            self.cache.put('new', 'текст')
+        # Очищення було щойно - застарілий запис лишається до наступного
+        self.assertEqual(self.count(), 2)
+        with mock.patch('transcript_cache.time.time', return_value=1100.0):
+            self.cache.put('newer', 'текст')
+        self.assertEqual(self.count(), 2)
+        self.assertIsNone(self.cache._db.execute(
+            "SELECT 1 FROM transcripts WHERE file_unique_id = 'old'").fetchone())
+
+    def test_purge_uses_created_at_index(self):
+        plan = self.cache._db.execute(
+            'EXPLAIN QUERY PLAN DELETE FROM transcripts WHERE created_at < ?', (0,)).fetchall()
+        self.assertIn('transcripts_created_at', ' '.join(str(row[-1]) for row in plan))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+"""
+Навчання статистичної моделі розділових знаків (punctuation_model.py).
+
+Корпус - українські тексти з розділовими знаками (UTF-8, файли .txt або
+каталоги з ними, абзаци розділені порожнім рядком). Результат - бінарна
+таблиця, яку бот підключає змінною PUNCTUATION_MODEL.
+
+    python3 train_punctuation.py corpus/ --output punctuation.bin
+    python3 train_punctuation.py news.txt books/ --min-count 5 --output punctuation.bin
+"""
+import argparse
+import logging
+import os
+import time
+from typing import Iterator, List
+
+from punctuation_model import NgramCounter, build_table, write_model
+
+logger = logging.getLogger(__name__)
+
+def corpus_files(paths: List[str]) -> Iterator[str]:
+    """Файли корпусу: задані явно і всі .txt у заданих каталогах"""
+    for path in paths:
+        if os.path.isdir(path):
+            for root, _, names in sorted(os.walk(path)):
+                for name in sorted(names):
+                    if name.endswith('.txt'):
+                        yield os.path.join(root, name)
+        else:
+            yield path
+
+def paragraphs(path: str) -> Iterator[str]:
+    """Абзаци файлу без читання його цілком у пам'ять"""
+    lines: List[str] = []
+    with open(path, encoding='utf-8', errors='replace') as f:
+        for line in f:
+            if line.strip():
+                lines.append(line)
+            elif lines:
+                yield ''.join(lines)
+                lines = []
+    if lines:
+        yield ''.join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Навчання моделі розділових знаків з корпусу текстів")
+    parser.add_argument('corpus', nargs='+', help="Файли .txt або каталоги з ними")
+    parser.add_argument('--output', default='punctuation.bin', help="Файл моделі")
+    parser.add_argument('--min-count', type=int, default=3,
+                        help="Контексти, що трапились рідше, не зберігаються")
+    args = parser.parse_args()
+
+    logging.basicConfig(format='%(asctime)s - %(levelname)s - %(message)s', level=logging.INFO)
+    started = time.perf_counter()
+    counter = NgramCounter()
+    files = 0
+    for path in corpus_files(args.corpus):
+        for paragraph in paragraphs(path):
+            counter.add_text(paragraph)
+        files += 1
+        logger.info(f"{path}: {counter.gaps} проміжків, {len(counter.counts)} контекстів")
+
+    table = build_table(counter.counts, args.min_count)
+    write_model(args.output, table, args.min_count)
+    stored = int((table['key'] != 0).sum())
+    logger.info(f"Модель {args.output}: {files} файлів, {stored} з {len(counter.counts)} контекстів, "
+                f"{len(table)} слотів, {os.path.getsize(args.output) / 2 ** 20:.1f} МБ "
+                f"за {time.perf_counter() - started:.1f} с")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,562 @@
+import asyncio
+import io
+import logging
+import os
+import tempfile
+import time
+import wave
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+import speech_recognition as sr
+
+from audio_decoder import AudioDecoder, AudioDecodeError
+from audio_preprocessor import CHUNK_SAMPLES, AudioPreprocessor
+from audio_segmenter import SilenceSegmenter
+from media_downloader import MediaDownloader
+from metrics import track_stage
+from profiler import JobProfiler
+from recognition_pool import BoundedExecutor
+from recognizers import GOOGLE_ENDPOINT, RecognizerBackend, create_backend
+from resilience import ResilientRecognizer
+from spool import MemoryBudget, PcmBuffer
+from punctuation_model import PunctuationModel
+from ukrainian_punctuation import (IncrementalPunctuator, improve_ukrainian_text, use_punctuation_model,
+                                   warm_up_punctuation)
+
+logger = logging.getLogger(__name__)
+
+# Оцінка обсягу PCM за розміром стиснутого файлу, якщо тривалість невідома
+PCM_BYTES_PER_FILE_BYTE = 10
+# Піковий обсяг пам'яті обробки в пам'яті відносно PCM: буфер, float32-копії
+# нормалізації і результат
+IN_MEMORY_PCM_FACTOR = 6
+
+# Найдовше речення проміжного тексту, слів
+PROGRESS_MAX_WORDS = 40
+
+class MediaConversionError(Exception):
+    """Медіафайл не вдалося завантажити або декодувати"""
+
+class RecognitionUnavailableError(Exception):
+    """Усі бекенди розпізнавання недоступні (дедлайн, помилки, запобіжник)"""
+
+class _OrderedProgress:
+    """
+    Проміжний текст для поступової доставки: сегменти завершуються в
+    довільному порядку, а показується лише суцільний початок запису,
+    розставлений IncrementalPunctuator.
+
+    Сегменти розділені паузами, тож речення завершується на межі кожного
+    сегмента (і всередині довгого сегмента - за PROGRESS_MAX_WORDS), а
+    вже показані речення більше не обробляються. Фінальний текст
+    розставляється заново для всього запису.
+    """
+
+    def __init__(self, total: int, on_progress: Callable[[str], None]):
+        self.on_progress = on_progress
+        self._results: List[Optional[str]] = [None] * total
+        self._next = 0
+        self._sentences: List[str] = []
+        self._punctuator = IncrementalPunctuator(max_words=PROGRESS_MAX_WORDS)
+
+    def done(self, index: int, text: str):
+        self._results[index] = text
+        advanced = False
+        while self._next < len(self._results) and self._results[self._next] is not None:
+            if self._results[self._next]:
+                self._sentences.extend(self._punctuator.feed(self._results[self._next]))
+                self._sentences.extend(self._punctuator.flush())
+            self._next += 1
+            advanced = True
+        # Після останнього сегмента буде фінальний текст
+        if advanced and self._next < len(self._results):
+            partial = ' '.join(self._sentences)
+            if partial:
+                self.on_progress(partial)
+
+class Transcriber:
+    """
+    Конвеєр розпізнавання одного медіафайлу: завантаження, декодування,
+    підготовка PCM, розбиття по паузах, розпізнавання і пунктуація.
+
+    Не залежить від обробників Telegram, тому однаково працює в процесі
+    бота і в окремих воркерах черги завдань.
+    """
+
+    def __init__(self, downloader: MediaDownloader, decoder: AudioDecoder,
+                 executor: BoundedExecutor, segmenter: SilenceSegmenter,
+                 recognizer: Optional[RecognizerBackend],
+                 preprocessor: Optional[AudioPreprocessor] = None,
+                 video_max_seconds: Optional[float] = None,
+                 resilient: Optional[ResilientRecognizer] = None,
+                 spool_threshold: Optional[int] = None, spool_dir: Optional[str] = None,
+                 memory_budget: Optional[MemoryBudget] = None,
+                 profiler: Optional[JobProfiler] = None):
+        self.downloader = downloader
+        self.decoder = decoder
+        self.preprocessor = preprocessor
+        self.executor = executor
+        self.segmenter = segmenter
+        self.recognizer = recognizer
+        # Довші відео розпізнаються лише до цієї межі
+        self.video_max_seconds = video_max_seconds
+        # Дедлайни, повтори, запобіжники і резервні бекенди навколо recognizer
+        if resilient is None and recognizer is not None:
+            resilient = ResilientRecognizer([recognizer], executor.run,
+                                            idle_workers=lambda: executor.idle_workers)
+        self.resilient = resilient
+        # PCM, більший за spool_threshold байтів, декодується у файл на диску
+        self.spool_threshold = spool_threshold
+        self.spool_dir = spool_dir
+        self.memory_budget = memory_budget or MemoryBudget()
+        # Профілювання частки завдань (за замовчуванням вимкнено)
+        self.profiler = profiler or JobProfiler()
+
+    @classmethod
+    def from_env(cls) -> 'Transcriber':
+        """Конвеєр з налаштуваннями зі змінних середовища"""
+        # Спільний пул з'єднань для завантаження медіафайлів
+        downloader = MediaDownloader(
+            max_concurrent=int(os.getenv('DOWNLOAD_CONCURRENCY', '4')),
+            timeout=float(os.getenv('DOWNLOAD_TIMEOUT', '60')),
+            max_bytes=int(os.getenv('MEDIA_MAX_FILE_SIZE', str(20 * 1024 * 1024))) or None,
+            retries=int(os.getenv('DOWNLOAD_RETRIES', '2'))
+        )
+
+        # Декодер медіа в PCM (один процес ffmpeg на повідомлення)
+        decoder = AudioDecoder(
+            sample_rate=int(os.getenv('DECODE_SAMPLE_RATE', '16000')),
+            ffmpeg_path=os.getenv('FFMPEG_PATH', 'ffmpeg')
+        )
+
+        # Підготовка PCM перед розпізнаванням (AUDIO_PREPROCESS=0 вимикає)
+        preprocessor = None
+        if os.getenv('AUDIO_PREPROCESS', '1') != '0':
+            preprocessor = AudioPreprocessor(
+                trim_threshold_db=float(os.getenv('AUDIO_TRIM_THRESHOLD_DB', '-40')),
+                peak_dbfs=float(os.getenv('AUDIO_PEAK_DBFS', '-1'))
+            )
+
+        # Пул для блокуючого розпізнавання, щоб не зупиняти event loop
+        executor = BoundedExecutor(
+            max_workers=int(os.getenv('RECOGNITION_WORKERS', str(os.cpu_count() or 4))),
+            max_queue=int(os.getenv('RECOGNITION_QUEUE_SIZE', '16')),
+            kind=os.getenv('RECOGNITION_POOL', 'thread')
+        )
+
+        # Розбиття довгих записів по паузах
+        segmenter = SilenceSegmenter(
+            max_segment_seconds=float(os.getenv('SEGMENT_MAX_SECONDS', '30'))
+        )
+
+        # Ініціалізація бекенда розпізнавання (RECOGNIZER_BACKEND=google|vosk)
+        backend_name = os.getenv('RECOGNIZER_BACKEND', 'google')
+        recognizer = cls._create_backend(backend_name)
+
+        # Резервний бекенд на час недоступності основного (RECOGNIZER_FALLBACK)
+        backends = [recognizer] if recognizer else []
+        fallback_name = os.getenv('RECOGNIZER_FALLBACK')
+        if recognizer and fallback_name and fallback_name != backend_name:
+            fallback = cls._create_backend(fallback_name)
+            if fallback:
+                backends.append(fallback)
+
+        resilient = None
+        if backends:
+            deadline = float(os.getenv('RECOGNITION_DEADLINE', '30'))
+            hedge_percentile = float(os.getenv('RECOGNITION_HEDGE_PERCENTILE', '0'))
+            resilient = ResilientRecognizer(
+                backends, executor.run,
+                deadline=deadline or None,
+                retries=int(os.getenv('RECOGNITION_RETRIES', '2')),
+                backoff=float(os.getenv('RECOGNITION_BACKOFF', '0.5')),
+                hedge_percentile=hedge_percentile or None,
+                breaker_options={
+                    'failure_rate': float(os.getenv('CIRCUIT_FAILURE_RATE', '0.5')),
+                    'min_calls': int(os.getenv('CIRCUIT_MIN_CALLS', '10')),
+                    'window': float(os.getenv('CIRCUIT_WINDOW', '60')),
+                    'cooldown': float(os.getenv('CIRCUIT_COOLDOWN', '30')),
+                },
+                idle_workers=lambda: executor.idle_workers
+            )
+
+        # Великі записи декодуються на диск (SPOOL_THRESHOLD_MB=0 - завжди, -1 - ніколи)
+        spool_threshold = int(float(os.getenv('SPOOL_THRESHOLD_MB', '8')) * 2 ** 20)
+        if spool_threshold < 0:
+            spool_threshold = None
+        elif preprocessor is not None and preprocessor.target_rate != decoder.sample_rate:
+            logger.warning("Запис на диск вимкнено: DECODE_SAMPLE_RATE відрізняється від 16000")
+            spool_threshold = None
+        if executor.kind == 'process':
+            if spool_threshold is None:
+                logger.warning("RECOGNITION_POOL=process без запису на диск: "
+                               "PCM кожного запису копіюється в процеси пулу")
+            else:
+                # Процеси пулу відображають файл PCM самі, запис у пам'яті довелося б копіювати
+                spool_threshold = 0
+
+        # Спільний бюджет пам'яті на завдання (MEMORY_BUDGET_MB=0 - без обмеження)
+        memory_budget = MemoryBudget(int(float(os.getenv('MEMORY_BUDGET_MB', '512')) * 2 ** 20))
+
+        # Статистична модель розділових знаків (PUNCTUATION_MODEL), без неї - лише правила
+        model_path = os.getenv('PUNCTUATION_MODEL')
+        if model_path:
+            try:
+                use_punctuation_model(PunctuationModel(
+                    model_path,
+                    comma_threshold=float(os.getenv('PUNCTUATION_COMMA_THRESHOLD', '0.5')),
+                    end_threshold=float(os.getenv('PUNCTUATION_END_THRESHOLD', '0.5'))
+                ))
+            except Exception as e:
+                logger.error(f"Помилка завантаження моделі розділових знаків {model_path}: {e}")
+
+        # Профілювання частки завдань (PROFILE_SAMPLE_RATE=0 - вимкнено)
+        profiler = JobProfiler(
+            directory=os.getenv('PROFILE_DIR', 'profiles'),
+            sample_rate=float(os.getenv('PROFILE_SAMPLE_RATE', '0')),
+            interval=float(os.getenv('PROFILE_INTERVAL_MS', '5')) / 1000,
+            trace_memory=os.getenv('PROFILE_TRACEMALLOC', '1') != '0',
+            max_reports=int(os.getenv('PROFILE_MAX_REPORTS', '200'))
+        )
+
+        return cls(downloader, decoder, executor, segmenter, recognizer, preprocessor,
+                   video_max_seconds=float(os.getenv('VIDEO_MAX_SECONDS', '600')) or None,
+                   resilient=resilient, spool_threshold=spool_threshold,
+                   spool_dir=os.getenv('SPOOL_DIR') or None, memory_budget=memory_budget,
+                   profiler=profiler)
+
+    @classmethod
+    def _create_backend(cls, backend_name: str) -> Optional[RecognizerBackend]:
+        logger.info(f"Ініціалізація бекенда розпізнавання {backend_name}...")
+        try:
+            recognizer = create_backend(backend_name, **cls.backend_options(backend_name))
+            logger.info(f"Бекенд розпізнавання {backend_name} ініціалізовано")
+            return recognizer
+        except Exception as e:
+            logger.error(f"Помилка ініціалізації бекенда розпізнавання {backend_name}: {e}")
+            return None
+
+    @staticmethod
+    def backend_options(backend_name: str) -> dict:
+        """Параметри бекенда розпізнавання зі змінних середовища"""
+        options = {'language': os.getenv('RECOGNIZER_LANGUAGE', 'uk-UA')}
+        if backend_name == 'google':
+            options['endpoint'] = os.getenv('GOOGLE_SPEECH_ENDPOINT', GOOGLE_ENDPOINT)
+            # Без окремого значення HTTP-запит обмежено дедлайном спроби
+            timeout = os.getenv('GOOGLE_SPEECH_TIMEOUT') or os.getenv('RECOGNITION_DEADLINE', '30')
+            options['timeout'] = float(timeout) or None
+        elif backend_name == 'vosk':
+            options['model_path'] = os.getenv('VOSK_MODEL_PATH', 'model')
+        return options
+
+    async def transcribe(self, bot, file_id: str, video: bool = False,
+                         on_progress: Optional[Callable[[str], None]] = None,
+                         priority: float = 0.0, duration: Optional[float] = None) -> Optional[str]:
+        """
+        Отримання файлу, декодування і розпізнавання одного медіа
+
+        priority - пріоритет усіх задач завдання в пулі (менший - раніше),
+        duration - тривалість з метаданих Telegram для оцінки пам'яті
+        """
+        with self.profiler.profile(f"{'video' if video else 'audio'}-{duration or 0:.0f}s"):
+            # Отримання файлу
+            with track_stage('get_file'):
+                media_file = await bot.get_file(file_id)
+
+            # Завдання чекає, доки його прогнозований обсяг пам'яті вміститься в бюджет
+            spool, footprint = self.plan_memory(media_file.file_size, duration, video)
+            async with self.memory_budget.reserve(footprint, priority):
+                # Завантаження та декодування
+                audio = await self.download_and_convert_audio(media_file.file_path, video=video,
+                                                              priority=priority, spool=spool)
+                if not audio:
+                    raise MediaConversionError(file_id)
+
+                # Розпізнавання мови
+                try:
+                    return await self.recognize_speech(audio, on_progress, priority)
+                finally:
+                    if isinstance(audio, PcmBuffer):
+                        audio.close()
+
+    def plan_memory(self, file_size: Optional[int], duration: Optional[float],
+                    video: bool = False) -> Tuple[bool, int]:
+        """
+        Чи писати PCM на диск і скільки пам'яті зарезервувати
+
+        Returns:
+            Tuple[bool, int]: Запис на диск і прогнозований пік пам'яті, байти
+        """
+        if duration:
+            pcm_bytes = int(duration * self.decoder.sample_rate * 2)
+        else:
+            pcm_bytes = (file_size or 0) * PCM_BYTES_PER_FILE_BYTE
+        if video and self.video_max_seconds:
+            pcm_bytes = min(pcm_bytes, int(self.video_max_seconds * self.decoder.sample_rate * 2))
+
+        spool = self.spool_threshold is not None and pcm_bytes >= self.spool_threshold
+        if spool:
+            # У пам'яті лише сегменти в роботі (PCM і FLAC) та float32-шматки обробки
+            segment_bytes = int(self.segmenter.max_segment_seconds * self.decoder.sample_rate * 2)
+            return True, 2 * segment_bytes * self.executor.max_workers + 8 * CHUNK_SAMPLES
+        # Відео завантажується на диск, аудіо - в пам'ять
+        return False, (0 if video else file_size or 0) + IN_MEMORY_PCM_FACTOR * pcm_bytes
+
+    async def download_and_convert_audio(self, file_path: str, video: bool = False,
+                                         priority: float = 0.0,
+                                         spool: bool = False) -> Union[sr.AudioData, PcmBuffer, None]:
+        """
+        Завантаження та декодування аудіо в PCM (аудіо - без тимчасових файлів)
+
+        Зі spool=True файл і PCM пишуться на диск, а повертається PcmBuffer,
+        який потрібно закрити.
+        """
+        audio = None
+        try:
+            if spool:
+                audio = await self._download_and_spool(file_path, video)
+            elif video:
+                audio = await self._download_and_decode_video(file_path)
+            else:
+                # Потокове завантаження в буфер пам'яті
+                buffer = io.BytesIO()
+                with track_stage('download'):
+                    await self.downloader.download_to(file_path, buffer)
+
+                # Один виклик ffmpeg: байти файлу -> 16-бітний моно PCM
+                with track_stage('decode'):
+                    audio = await self.decoder.decode_audio_data(buffer.getbuffer())
+
+            # Моно 16 кГц, без тиші на краях, з нормалізованим піком
+            if self.preprocessor is not None:
+                with track_stage('preprocess'):
+                    if isinstance(audio, PcmBuffer):
+                        start, end = await self.executor.run(
+                            self.preprocessor.process_file, audio.path, audio.sample_rate,
+                            block=True, priority=priority
+                        )
+                        audio.trim(start, end)
+                    else:
+                        audio = await self.executor.run(
+                            self.preprocessor.process_audio_data, audio, block=True, priority=priority
+                        )
+            return audio
+
+        except AudioDecodeError as e:
+            logger.error(f"Помилка декодування аудіо: {e}")
+        except Exception as e:
+            logger.error(f"Помилка конвертації аудіо: {e}")
+        if isinstance(audio, PcmBuffer):
+            audio.close()
+        return None
+
+    async def _download_and_decode_video(self, file_path: str) -> sr.AudioData:
+        """
+        Аудіо з відео: файл завантажується на диск, бо mp4 часто має індекс
+        у кінці і не декодується з каналу. ffmpeg відкидає відеопотік без
+        декодування і зупиняється на video_max_seconds.
+        """
+        with tempfile.NamedTemporaryFile(prefix='voicebot-', suffix='.video',
+                                         dir=self.spool_dir) as video_file:
+            with track_stage('download'):
+                await self.downloader.download_to(file_path, video_file)
+            video_file.flush()
+
+            with track_stage('decode'):
+                return await self.decoder.decode_file_audio_data(video_file.name, self.video_max_seconds)
+
+    async def _download_and_spool(self, file_path: str, video: bool = False) -> PcmBuffer:
+        """
+        Великий запис: файл завантажується на диск, ffmpeg декодує його у
+        файл PCM, який далі читається через numpy.memmap
+        """
+        pcm_path = PcmBuffer.create(self.spool_dir)
+        try:
+            with tempfile.NamedTemporaryFile(prefix='voicebot-', suffix='.media',
+                                             dir=self.spool_dir) as media_file:
+                with track_stage('download'):
+                    await self.downloader.download_to(file_path, media_file)
+                media_file.flush()
+
+                with track_stage('decode'):
+                    size = await self.decoder.decode_to_file(
+                        media_file.name, pcm_path, self.video_max_seconds if video else None
+                    )
+            logger.info(f"PCM записано на диск: {size / 2 ** 20:.1f} МБ")
+            return PcmBuffer(pcm_path, self.decoder.sample_rate)
+        except BaseException:
+            os.unlink(pcm_path)
+            raise
+
+    async def recognize_speech(self, audio: Union[sr.AudioData, PcmBuffer],
+                               on_progress: Optional[Callable[[str], None]] = None,
+                               priority: float = 0.0) -> Optional[str]:
+        """
+        Розпізнавання мови обраним бекендом
+
+        Args:
+            audio: 16-бітний моно PCM (у пам'яті або PcmBuffer на диску)
+            on_progress: Отримує проміжний текст, щойно розпізнано черговий
+                сегмент з початку запису
+            priority: Пріоритет сегментів у пулі (менший - раніше)
+
+        Raises:
+            RecognitionUnavailableError: Бекенди не відповіли попри повтори
+        """
+        try:
+            # Розбиваємо довге аудіо по паузах на сегменти обмеженої довжини
+            # Сегменти - вікна одного масиву, копія створюється лише перед розпізнаванням
+            rate = audio.sample_rate
+            with track_stage('segmentation'):
+                if isinstance(audio, PcmBuffer):
+                    # Воркер сам відображає файл: у пул процесів не копіюється весь запис
+                    samples = audio.samples
+                    start, end = audio.window
+                    bounds = await self.executor.run(
+                        self.segmenter.split_file, audio.path, start, end, rate,
+                        block=True, priority=priority
+                    )
+                else:
+                    samples = np.frombuffer(audio.frame_data, dtype=np.int16)
+                    bounds = await self.executor.run(
+                        self.segmenter.split, samples, rate, block=True, priority=priority
+                    )
+            if not bounds:
+                logger.warning("В аудіо не знайдено мовлення")
+                return None
+
+            logger.info(f"Початок розпізнавання бекендом {self.recognizer.name} ({len(bounds)} сегм.)")
+
+            # Розпізнаємо сегменти паралельно і склеюємо в початковому порядку;
+            # одночасно в пам'яті не більше сегментів, ніж воркерів у пулі
+            window = asyncio.Semaphore(self.executor.max_workers)
+            progress = _OrderedProgress(len(bounds), on_progress) if on_progress else None
+            with track_stage('recognition'):
+                tasks = [
+                    asyncio.ensure_future(
+                        self._recognize_segment(samples[start:end], rate, window, index, progress, priority)
+                    )
+                    for index, (start, end) in enumerate(bounds)
+                ]
+                try:
+                    done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+                finally:
+                    # Після першої непоправної помилки (або скасування завдання) решта
+                    # сегментів не потрібна - вони не займають пул і бекенд
+                    pending = [task for task in tasks if not task.done()]
+                    for task in pending:
+                        task.cancel()
+                    if pending:
+                        await asyncio.wait(pending)
+                for task in tasks:
+                    if task in done and task.exception() is not None:
+                        raise task.exception()
+                results = [task.result() for task in tasks]
+            text = ' '.join(result for result in results if result)
+
+            logger.info(f"Бекенд {self.recognizer.name} розпізнав {len(text)} символів")
+            logger.debug("Розпізнаний текст: %s", text)
+            if logger.isEnabledFor(logging.DEBUG):
+                for name, stats in self.resilient.latency.items():
+                    logger.debug(f"Затримка бекенда {name}: {stats.summary()}")
+
+            if text and text.strip():
+                # Покращуємо український текст
+                with track_stage('punctuation'):
+                    text = improve_ukrainian_text(text.strip())
+                return text
+            else:
+                logger.warning(f"Бекенд {self.recognizer.name} повернув порожній текст")
+                return None
+
+        except sr.RequestError as e:
+            logger.error(f"Помилка запиту до бекенда {self.recognizer.name}: {e}")
+            raise RecognitionUnavailableError(str(e)) from e
+        except Exception as e:
+            logger.error(f"Помилка розпізнавання бекендом {self.recognizer.name}: {e}")
+            return None
+
+    async def _recognize_segment(self, samples: np.ndarray, sample_rate: int,
+                                 window: asyncio.Semaphore, index: int = 0,
+                                 progress: Optional[_OrderedProgress] = None,
+                                 priority: float = 0.0) -> str:
+        """Розпізнавання одного сегмента у пулі воркерів"""
+        try:
+            async with window:
+                segment = sr.AudioData(samples.tobytes(), sample_rate, PcmBuffer.sample_width)
+                with track_stage('recognition_segment'):
+                    text = await self.resilient.recognize(segment, priority)
+        except sr.UnknownValueError:
+            # Сегмент без розбірливого мовлення не зриває все завдання
+            logger.warning(f"Бекенд {self.recognizer.name} не зміг розпізнати сегмент")
+            text = ''
+        if progress is not None:
+            progress.done(index, text)
+        return text
+
+    async def warm_up(self, file_url: Optional[str] = None) -> Dict[str, float]:
+        """
+        Прогрів конвеєра до першого завдання
+
+        Етапи виконуються паралельно: пробний запис проходить ffmpeg,
+        підготовку і розбиття по паузах у пулі, бекенди з'єднуються з
+        сервісом або завантажують моделі, пунктуація читає модель і обробляє
+        пробний текст, завантажувач відкриває з'єднання з file_url. Помилка
+        етапу лише записується в журнал - без прогріву конвеєр теж працює.
+
+        Returns:
+            Dict[str, float]: Тривалість успішних етапів, секунди
+        """
+        steps = {
+            'decoder': self._warm_up_audio(),
+            'recognizer': self._warm_up_recognizer(),
+            'punctuation': asyncio.to_thread(warm_up_punctuation),
+        }
+        if file_url:
+            steps['download'] = self.downloader.warm_up(file_url)
+        timings = await asyncio.gather(*(self._warm_up_step(name, step) for name, step in steps.items()))
+        return {name: seconds for name, seconds in zip(steps, timings) if seconds is not None}
+
+    @staticmethod
+    async def _warm_up_step(name: str, step) -> Optional[float]:
+        started = time.perf_counter()
+        try:
+            await step
+        except Exception as e:
+            logger.warning(f"Прогрів етапу {name} не вдався: {e}")
+            return None
+        elapsed = time.perf_counter() - started
+        logger.info(f"Прогрів етапу {name}: {elapsed:.2f} с")
+        return elapsed
+
+    async def _warm_up_audio(self):
+        """Секунда тону 8 кГц у WAV: запуск ffmpeg з передискретизацією, підготовка і сегментація"""
+        rate = 8000
+        tone = (np.sin(2 * np.pi * 220 * np.arange(rate) / rate) * 8000).astype(np.int16)
+        buffer = io.BytesIO()
+        with wave.open(buffer, 'wb') as wav:
+            wav.setnchannels(1)
+            wav.setsampwidth(PcmBuffer.sample_width)
+            wav.setframerate(rate)
+            wav.writeframes(tone.tobytes())
+
+        audio = await self.decoder.decode_audio_data(buffer.getbuffer())
+        if self.preprocessor is not None:
+            audio = await self.executor.run(self.preprocessor.process_audio_data, audio, block=True)
+        await self.executor.run(self.segmenter.split, np.frombuffer(audio.frame_data, dtype=np.int16),
+                                audio.sample_rate, block=True)
+
+    async def _warm_up_recognizer(self):
+        """Підготовка всіх бекендів у пулі; у пулі процесів - у кожному процесі окремо"""
+        if not self.resilient:
+            return
+        copies = self.executor.max_workers if self.executor.kind == 'process' else 1
+        await asyncio.gather(*(self.executor.run(backend.warm_up, block=True)
+                               for backend in self.resilient.backends for _ in range(copies)))
+
+    async def close(self):
+        """Закриття з'єднань і пулу воркерів"""
+        await self.downloader.close()
+        self.executor.shutdown(wait=False)
+        await asyncio.to_thread(self.profiler.wait, 5.0)
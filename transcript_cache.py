@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import sqlite3
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class TranscriptCache:
+    """
+    Дворівневий кеш готових транскриптів за file_unique_id.
+
+    Перший рівень - LRU в пам'яті процесу на max_entries транскриптів
+    із TTL, другий - SQLite на диску, що переживає перезапуски. Застарілі
+    записи з диска видаляються не частіше за purge_interval секунд. Одночасні запити
+    на той самий файл, поки він ще обробляється, чекають на одне завдання.
+    """
+
+    def __init__(self, db_path: str = 'transcripts.db', max_entries: int = 1000,
+                 ttl: float = 7 * 24 * 3600, purge_interval: float = 3600):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.purge_interval = purge_interval
+        self._purged_at = 0.0
+
+        self._memory: 'OrderedDict[str, Tuple[str, float]]' = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.coalesced = 0
+        self.misses = 0
+
+        self._db = sqlite3.connect(db_path)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute(
+            'CREATE TABLE IF NOT EXISTS transcripts ('
+            'file_unique_id TEXT PRIMARY KEY, text TEXT NOT NULL, created_at REAL NOT NULL)'
+        )
+        self._db.execute('CREATE INDEX IF NOT EXISTS transcripts_created_at ON transcripts (created_at)')
+        self._db.commit()
+
+    def stats(self) -> Dict[str, int]:
+        """Лічильники влучань і промахів"""
+        return {
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'coalesced': self.coalesced,
+            'misses': self.misses,
+            'memory_entries': len(self._memory),
+            'inflight': len(self._inflight)
+        }
+
+    def is_inflight(self, key: str) -> bool:
+        return key in self._inflight
+
+    def get(self, key: str) -> Optional[str]:
+        """Пошук транскрипту спочатку в пам'яті, потім на диску"""
+        now = time.time()
+
+        entry = self._memory.get(key)
+        if entry is not None:
+            text, expires_at = entry
+            if expires_at > now:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return text
+            del self._memory[key]
+
+        row = self._db.execute(
+            'SELECT text, created_at FROM transcripts WHERE file_unique_id = ?', (key,)
+        ).fetchone()
+        if row is not None:
+            text, created_at = row
+            if created_at + self.ttl > now:
+                self._remember(key, text, created_at + self.ttl)
+                self.disk_hits += 1
+                return text
+            self._db.execute('DELETE FROM transcripts WHERE file_unique_id = ?', (key,))
+            self._db.commit()
+
+        return None
+
+    def put(self, key: str, text: str):
+        """Збереження транскрипту в обидва рівні"""
+        now = time.time()
+        self._remember(key, text, now + self.ttl)
+        self._db.execute(
+            'INSERT OR REPLACE INTO transcripts (file_unique_id, text, created_at) VALUES (?, ?, ?)',
+            (key, text, now)
+        )
+        if now - self._purged_at >= self.purge_interval:
+            self._purged_at = now
+            self._db.execute('DELETE FROM transcripts WHERE created_at < ?', (now - self.ttl,))
+        self._db.commit()
+
+    def _remember(self, key: str, text: str, expires_at: float):
+        self._memory[key] = (text, expires_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    async def get_or_compute(self, key: str,
+                             compute: Callable[[], Awaitable[Optional[str]]]) -> Optional[str]:
+        """
+        Отримання транскрипту з кешу або його обчислення
+
+        Якщо такий самий файл уже обробляється, чекаємо на його результат
+        замість запуску другого завдання. Порожній результат (None) не
+        кешується.
+        """
+        text = self.get(key)
+        if text is not None:
+            return text
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            text = await compute()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Позначаємо виняток як отриманий, навіть якщо очікувачів немає
+            future.exception()
+            raise
+        else:
+            future.set_result(text)
+            if text is not None:
+                self.put(key, text)
+            return text
+        finally:
+            del self._inflight[key]
+
+    def close(self):
+        self._db.close()
@@ -1,89 +1,259 @@
 import re
 import logging
-from typing import List, Tuple
+from typing import Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
+# Слова, після яких зазвичай ставиться кома
+COMMA_AFTER_WORDS = frozenset({
+    'так', 'ні', 'можливо', 'звичайно', 'звісно', 'авжеж', 'безумовно',
+    'нарешті', 'наприклад', 'тобто', 'отже', 'однак', 'проте', 'зате',
+    'по-перше', 'по-друге', 'по-третє', 'по-четверте', 'по-п\'яте',
+    'по-шосте', 'по-сьоме', 'по-восьме', 'по-дев\'яте', 'по-десяте',
+    'друже', 'брате', 'сестро', 'мамо', 'тату', 'бабусю', 'дідусю',
+    'дівчино', 'хлопче', 'сину', 'дочко', 'друзі', 'колеги',
+    'на жаль', 'на щастя', 'на диво', 'на превеликий жаль',
+    'чесно кажучи', 'правду кажучи', 'взагалі-то', 'власне кажучи',
+    'між іншим', 'до речі', 'до слова', 'до того ж', 'крім того',
+    'більше того', 'тим більше', 'тим паче', 'особливо', 'головне',
+    'найголовніше', 'насамперед', 'спочатку', 'потім', 'далі',
+    'нарешті', 'врешті-решт', 'в кінці кінців', 'в підсумку',
+    'коротше кажучи', 'одним словом', 'словом', 'значить',
+    'виходить', 'отже', 'от і все', 'ось і все'
+})
+
+# Сполучники, перед якими ставиться кома
+COMMA_BEFORE_CONJUNCTIONS = frozenset({
+    'але', 'проте', 'однак', 'зате', 'а', 'і', 'або', 'чи',
+    'якщо', 'якби', 'хоч', 'хоча', 'незважаючи на те що',
+    'попри те що', 'замість того щоб', 'замість того аби',
+    'щоб', 'аби', 'поки', 'доки', 'коли', 'як', 'як тільки',
+    'щойно', 'лише', 'тільки', 'лишень', 'тільки що',
+    'тому що', 'бо', 'оскільки', 'адже', 'аджеж',
+    'що', 'який', 'яка', 'яке', 'які', 'хто', 'де', 'коли',
+    'куди', 'звідки', 'чому', 'як', 'скільки'
+})
+
+# Слова, що позначають питання
+QUESTION_WORDS = frozenset({
+    'що', 'хто', 'де', 'коли', 'чому', 'як', 'чи', 'куди', 'звідки',
+    'скільки', 'який', 'яка', 'яке', 'які', 'чий', 'чия', 'чиє', 'чиї',
+    'якщо', 'якби', 'чи не', 'чи ж', 'чи то', 'чи може', 'чи можливо',
+    'чи правда', 'чи дійсно', 'чи справді', 'чи точно', 'чи точно що'
+})
+
+# Слова, що позначають оклик
+EXCLAMATION_WORDS = frozenset({
+    'вау', 'о', 'ах', 'ой', 'ух', 'фух', 'боже', 'господи', 'чорт',
+    'блин', 'нехай', 'хай', 'давай', 'давайте', 'стоп', 'стій',
+    'зачекай', 'почекай', 'тримай', 'лови', 'біжи', 'лети',
+    'ура', 'браво', 'молодець', 'чудово', 'відмінно', 'супер',
+    'фантастично', 'неймовірно', 'дивовижно', 'прекрасно'
+})
+
+# Слова, що позначають завершення думки
+ENDING_WORDS = frozenset({
+    'все', 'ось і все', 'от і все', 'от так', 'ось так', 'так ось',
+    'от і все тут', 'ось і все тут', 'більше нічого', 'нічого більше',
+    'все це', 'це все', 'все тут', 'тут все', 'все добре', 'добре все'
+})
+
+# Вступні фрази (кома ставиться після їх першого слова)
+INTRODUCTORY_PHRASES = (
+    'чесно кажучи', 'правду кажучи', 'взагалі то', 'власне кажучи',
+    'між іншим', 'до речі', 'до слова', 'до того ж', 'крім того',
+    'більше того', 'тим більше', 'тим паче', 'на жаль', 'на щастя',
+    'на диво', 'на превеликий жаль', 'коротше кажучи', 'одним словом',
+    'в кінці кінців', 'в підсумку', 'виходить', 'отже', 'от і все',
+    'ось і все', 'незважаючи на те що', 'попри те що', 'замість того щоб'
+)
+
+# Окремі вступні слова
+INTRODUCTORY_WORDS = frozenset({
+    'чесно', 'правду', 'взагалі', 'власне', 'між', 'до', 'крім', 'більше',
+    'тим', 'на', 'коротше', 'одним', 'словом', 'в', 'кінці', 'підсумку',
+    'виходить', 'отже', 'от', 'ось', 'незважаючи', 'попри', 'замість'
+})
+
+# Слова, з яких починається питання (для коми перед "що")
+QUESTION_STARTERS = frozenset({
+    'що', 'хто', 'де', 'коли', 'чому', 'як', 'чи', 'куди', 'звідки', 'скільки',
+    'який', 'яка', 'яке', 'які'
+})
+
+# Слова, що визначають тип речення (пріоритет: питання, оклик, команда)
+SENTENCE_TYPE_WORDS = {
+    'question': (
+        'що', 'хто', 'де', 'коли', 'чому', 'як', 'чи', 'куди', 'звідки', 'скільки',
+        'який', 'яка', 'яке', 'які', 'чий', 'чия', 'чиє', 'чиї', 'якщо', 'якби'
+    ),
+    'exclamation': (
+        'вау', 'о', 'ах', 'ой', 'ух', 'фух', 'боже', 'господи', 'чорт', 'блин',
+        'ура', 'браво', 'молодець', 'чудово', 'відмінно', 'супер', 'фантастично',
+        'неймовірно', 'дивовижно', 'прекрасно',
+        'нехай', 'хай', 'давай', 'давайте',
+        'стоп', 'стій', 'зачекай', 'почекай', 'тримай', 'лови', 'біжи', 'лети'
+    ),
+    'command': (
+        'зроби', 'зробіть', 'напиши', 'напишіть', 'покажи', 'покажіть', 'дай', 'дайте',
+        'принеси', 'принесіть',
+        'йди', 'йдіть', 'іди', 'ідіть', 'біжи', 'біжіть', 'лети', 'летіть', 'їдь', 'їдьте',
+        'закрий', 'закрийте', 'відкрий', 'відкрийте', 'вимкни', 'вимкніть', 'увімкни', 'увімкніть'
+    )
+}
+
+# Пари "можливо це", "звісно так" тощо теж роблять речення питальним
+QUESTION_MODAL_WORDS = frozenset({'можливо', 'може', 'напевно', 'напевне', 'звичайно', 'звісно'})
+QUESTION_MODAL_TAILS = frozenset({'це', 'так', 'воно'})
+
+_WORD_RE = re.compile(r'\w+')
+_STRIP_CHARS = '.,!?;:'
+
+class PunctuationEngine:
+    """
+    Скомпільовані таблиці правил і однопрохідний аналіз речення.
+
+    Усі словники зводяться до одного словника "слово -> прапорці", тож
+    коми і тип речення визначаються за один прохід зліва направо,
+    а вартість обробки лінійна від довжини тексту.
+    """
+
+    COMMA_AFTER = 1
+    COMMA_BEFORE = 2
+    INTRODUCTORY = 4
+
+    TYPE_RANKS = {'question': 3, 'exclamation': 2, 'command': 1}
+    RANK_TYPES = {3: 'question', 2: 'exclamation', 1: 'command', 0: 'statement'}
+
+    def __init__(self, comma_after_words=COMMA_AFTER_WORDS,
+                 comma_before_conjunctions=COMMA_BEFORE_CONJUNCTIONS,
+                 introductory_phrases=INTRODUCTORY_PHRASES,
+                 introductory_words=INTRODUCTORY_WORDS,
+                 sentence_type_words=SENTENCE_TYPE_WORDS):
+        # Правила порівнюють одне слово за раз, тому фраза з кількох слів
+        # спрацьовує лише через своє перше слово
+        self.comma_flags: Dict[str, int] = {}
+        for word in comma_after_words:
+            self._add_flag(word, self.COMMA_AFTER)
+        for word in comma_before_conjunctions:
+            self._add_flag(word, self.COMMA_BEFORE)
+        for word in introductory_words:
+            self._add_flag(word, self.INTRODUCTORY)
+        for phrase in introductory_phrases:
+            self._add_flag(phrase.split()[0], self.INTRODUCTORY)
+
+        self.type_ranks: Dict[str, int] = {}
+        for sentence_type, words in sentence_type_words.items():
+            rank = self.TYPE_RANKS[sentence_type]
+            for word in words:
+                self.type_ranks[word] = max(rank, self.type_ranks.get(word, 0))
+
+    def _add_flag(self, word: str, flag: int):
+        # Слова з пробілом ніколи не збігаються з одним токеном
+        if ' ' not in word:
+            self.comma_flags[word] = self.comma_flags.get(word, 0) | flag
+
+    def scan(self, sentence: str, gaps: Optional[List[Optional[str]]] = None) -> Tuple[str, str]:
+        """
+        Один прохід по реченню
+
+        gaps - рішення статистичної моделі для проміжків між словами
+        ('comma', 'none' або None - контекст невідомий, діють правила)
+
+        Returns:
+            Tuple[str, str]: (тип речення, речення з комами)
+        """
+        words = sentence.split()
+        lower_words = sentence.lower().split()
+        if not words:
+            return 'statement', sentence
+
+        # Перед "що" не ставимо кому в питаннях
+        is_question = lower_words[0] in QUESTION_STARTERS or 'чи' in sentence.lower()
+
+        comma_flags = self.comma_flags
+        type_ranks = self.type_ranks
+        rank = 0
+        modal_pending = False
+        result_words: List[str] = []
+
+        for i, (word, lower_word) in enumerate(zip(words, lower_words)):
+            # Тип речення: порівнюємо цілі слова (\w+) з таблицею
+            if rank < 3:
+                runs = [lower_word] if lower_word.isalpha() else _WORD_RE.findall(lower_word)
+                if runs:
+                    if modal_pending and runs[0] in QUESTION_MODAL_TAILS and lower_word.startswith(runs[0]):
+                        rank = 3
+                    for run in runs:
+                        run_rank = type_ranks.get(run, 0)
+                        if run_rank > rank:
+                            rank = run_rank
+                    modal_pending = runs[-1] in QUESTION_MODAL_WORDS and lower_word.endswith(runs[-1])
+                else:
+                    modal_pending = False
+
+            # Коми
+            current_word = lower_word.strip(_STRIP_CHARS)
+            flags = comma_flags.get(current_word, 0)
+
+            if flags & self.COMMA_AFTER:
+                # Кома після певних слів
+                result_words.append(word if word.endswith(',') else word + ',')
+            elif flags & self.COMMA_BEFORE and i > 0:
+                # Кома перед сполучниками (але не перед "що" в питаннях)
+                if not (current_word == 'що' and is_question) and not result_words[-1].endswith(','):
+                    result_words[-1] = result_words[-1] + ','
+                result_words.append(word)
+            elif flags & self.INTRODUCTORY and i > 0:
+                # Кома після вступних слів і фраз
+                result_words.append(word if word.endswith(',') else word + ',')
+            else:
+                result_words.append(word)
+
+        # У відомих моделі контекстах її рішення переважає правила,
+        # коми, що вже були в тексті, не чіпаємо
+        if gaps:
+            for i, decision in enumerate(gaps):
+                if decision is None or words[i][-1] in _STRIP_CHARS:
+                    continue
+                if decision == 'comma':
+                    if not result_words[i].endswith(','):
+                        result_words[i] += ','
+                elif result_words[i].endswith(','):
+                    result_words[i] = result_words[i][:-1]
+
+        sentence_type = self.RANK_TYPES[rank]
+        if len(words) <= 1:
+            return sentence_type, sentence
+        return sentence_type, ' '.join(result_words)
+
+# Спільний скомпільований рушій для всіх обробників
+_DEFAULT_ENGINE = PunctuationEngine()
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_SENTENCE_END_RE = re.compile(r'[.!?]+')
+_COMMA_RUN_RE = re.compile(r'[,;]+')
+_TRAILING_END_RE = re.compile(r'[.!?]+$')
+_SPACE_BEFORE_MARK_RE = re.compile(r'\s+([.,!?:;])')
+_MARK_RUN_RE = re.compile(r'[.,!?:;]+')
+_COMMA_SPACING_RE = re.compile(r',\s*')
+
 class UkrainianPunctuationProcessor:
     """
     Професійний обробник розділових знаків для української мови
     """
     
-    def __init__(self):
-        # Слова, після яких зазвичай ставиться кома
-        self.comma_after_words = {
-            'так', 'ні', 'можливо', 'звичайно', 'звісно', 'авжеж', 'безумовно',
-            'нарешті', 'наприклад', 'тобто', 'отже', 'однак', 'проте', 'зате',
-            'по-перше', 'по-друге', 'по-третє', 'по-четверте', 'по-п\'яте',
-            'по-шосте', 'по-сьоме', 'по-восьме', 'по-дев\'яте', 'по-десяте',
-            'друже', 'брате', 'сестро', 'мамо', 'тату', 'бабусю', 'дідусю',
-            'дівчино', 'хлопче', 'сину', 'дочко', 'друзі', 'колеги',
-            'на жаль', 'на щастя', 'на диво', 'на превеликий жаль',
-            'чесно кажучи', 'правду кажучи', 'взагалі-то', 'власне кажучи',
-            'між іншим', 'до речі', 'до слова', 'до того ж', 'крім того',
-            'більше того', 'тим більше', 'тим паче', 'особливо', 'головне',
-            'найголовніше', 'насамперед', 'спочатку', 'потім', 'далі',
-            'нарешті', 'врешті-решт', 'в кінці кінців', 'в підсумку',
-            'коротше кажучи', 'одним словом', 'словом', 'значить',
-            'виходить', 'отже', 'от і все', 'ось і все'
-        }
-        
-        # Сполучники, перед якими ставиться кома
-        self.comma_before_conjunctions = {
-            'але', 'проте', 'однак', 'зате', 'а', 'і', 'або', 'чи',
-            'якщо', 'якби', 'хоч', 'хоча', 'незважаючи на те що',
-            'попри те що', 'замість того щоб', 'замість того аби',
-            'щоб', 'аби', 'поки', 'доки', 'коли', 'як', 'як тільки',
-            'щойно', 'лише', 'тільки', 'лишень', 'тільки що',
-            'тому що', 'бо', 'оскільки', 'адже', 'аджеж',
-            'що', 'який', 'яка', 'яке', 'які', 'хто', 'де', 'коли',
-            'куди', 'звідки', 'чому', 'як', 'скільки'
-        }
-        
-        # Слова, що позначають питання
-        self.question_words = {
-            'що', 'хто', 'де', 'коли', 'чому', 'як', 'чи', 'куди', 'звідки',
-            'скільки', 'який', 'яка', 'яке', 'які', 'чий', 'чия', 'чиє', 'чиї',
-            'якщо', 'якби', 'чи не', 'чи ж', 'чи то', 'чи може', 'чи можливо',
-            'чи правда', 'чи дійсно', 'чи справді', 'чи точно', 'чи точно що'
-        }
-        
-        # Слова, що позначають оклик
-        self.exclamation_words = {
-            'вау', 'о', 'ах', 'ой', 'ух', 'фух', 'боже', 'господи', 'чорт',
-            'блин', 'нехай', 'хай', 'давай', 'давайте', 'стоп', 'стій',
-            'зачекай', 'почекай', 'тримай', 'лови', 'біжи', 'лети',
-            'ура', 'браво', 'молодець', 'чудово', 'відмінно', 'супер',
-            'фантастично', 'неймовірно', 'дивовижно', 'прекрасно'
-        }
-        
-        # Слова, що позначають завершення думки
-        self.ending_words = {
-            'все', 'ось і все', 'от і все', 'от так', 'ось так', 'так ось',
-            'от і все тут', 'ось і все тут', 'більше нічого', 'нічого більше',
-            'все це', 'це все', 'все тут', 'тут все', 'все добре', 'добре все'
-        }
-        
-        # Патерни для розпізнавання різних типів речень
-        self.sentence_patterns = {
-            'question': [
-                r'\b(що|хто|де|коли|чому|як|чи|куди|звідки|скільки|який|яка|яке|які|чий|чия|чиє|чиї)\b',
-                r'\bчи\s+(не|ж|то|може|правда|дійсно|справді|точно)\b',
-                r'\b(якщо|якби)\b',
-                r'\b(можливо|може|напевно|напевне|звичайно|звісно)\s+(це|так|воно|воно)\b'
-            ],
-            'exclamation': [
-                r'\b(вау|о|ах|ой|ух|фух|боже|господи|чорт|блин)\b',
-                r'\b(ура|браво|молодець|чудово|відмінно|супер|фантастично|неймовірно|дивовижно|прекрасно)\b',
-                r'\b(нехай|хай|давай|давайте)\b',
-                r'\b(стоп|стій|зачекай|почекай|тримай|лови|біжи|лети)\b'
-            ],
-            'command': [
-                r'\b(зроби|зробіть|напиши|напишіть|покажи|покажіть|дай|дайте|принеси|принесіть)\b',
-                r'\b(йди|йдіть|іди|ідіть|біжи|біжіть|лети|летіть|їдь|їдьте)\b',
-                r'\b(закрий|закрийте|відкрий|відкрийте|вимкни|вимкніть|увімкни|увімкніть)\b'
-            ]
-        }
+    def __init__(self, engine: Optional[PunctuationEngine] = None, model=None):
+        # Таблиці правил спільні для всіх екземплярів і компілюються один раз
+        self.engine = engine or _DEFAULT_ENGINE
+        # Статистична модель ком і кінців речень (punctuation_model.PunctuationModel),
+        # без неї - лише правила
+        self.model = model
+        self.comma_after_words = COMMA_AFTER_WORDS
+        self.comma_before_conjunctions = COMMA_BEFORE_CONJUNCTIONS
+        self.question_words = QUESTION_WORDS
+        self.exclamation_words = EXCLAMATION_WORDS
+        self.ending_words = ENDING_WORDS
     
     def process_text(self, text: str) -> str:
         """
@@ -92,7 +262,7 @@ class UkrainianPunctuationProcessor:
         if not text or not text.strip():
             return text
         
-        logger.info(f"Початок обробки тексту: {text}")
+        logger.debug("Початок обробки тексту: %s", text)
         
         # Крок 1: Базова очистка
         text = self._clean_text(text)
@@ -113,36 +283,49 @@ class UkrainianPunctuationProcessor:
         # Крок 5: Фінальна очистка
         result = self._final_cleanup(result)
         
-        logger.info(f"Результат обробки: {result}")
+        logger.debug("Результат обробки: %s", result)
         return result
     
     def _clean_text(self, text: str) -> str:
         """Очищення тексту від зайвих пробілів та символів"""
         # Видаляємо зайві пробіли
-        text = re.sub(r'\s+', ' ', text)
+        text = _WHITESPACE_RE.sub(' ', text)
         # Видаляємо пробіли на початку та в кінці
         text = text.strip()
         # Видаляємо зайві розділові знаки
-        text = re.sub(r'[.!?]+', '.', text)
-        text = re.sub(r'[,;]+', ',', text)
+        text = _SENTENCE_END_RE.sub('.', text)
+        text = _COMMA_RUN_RE.sub(',', text)
         return text
     
     def _split_into_sentences(self, text: str) -> List[str]:
         """Розділення тексту на речення"""
         # Розділяємо за крапками, знаками оклику та питання
-        sentences = re.split(r'[.!?]+', text)
+        sentences = _SENTENCE_END_RE.split(text)
         return [s.strip() for s in sentences if s.strip()]
     
     def _process_sentence(self, sentence: str) -> str:
         """Обробка окремого речення"""
         if not sentence:
             return sentence
+        if self.model is None:
+            return self._punctuate(sentence)
         
-        # Визначаємо тип речення
-        sentence_type = self._determine_sentence_type(sentence)
-        
-        # Додаємо коми
-        sentence = self._add_commas(sentence)
+        # Модель ділить речення там, де в корпусі зазвичай закінчувалось речення
+        words = sentence.split()
+        gaps = self.model.decide(words)
+        sentences = []
+        start = 0
+        for i, decision in enumerate(gaps):
+            if decision == 'end':
+                sentences.append(self._punctuate(' '.join(words[start:i + 1]), gaps[start:i]))
+                start = i + 1
+        sentences.append(self._punctuate(' '.join(words[start:]), gaps[start:]))
+        return ' '.join(sentences)
+    
+    def _punctuate(self, sentence: str, gaps: Optional[List[Optional[str]]] = None) -> str:
+        """Коми, кінцевий знак і велика літера для одного речення"""
+        # Визначаємо тип речення і додаємо коми за один прохід
+        sentence_type, sentence = self.engine.scan(sentence, gaps)
         
         # Додаємо кінцевий знак
         sentence = self._add_ending_punctuation(sentence, sentence_type)
@@ -152,123 +335,10 @@ class UkrainianPunctuationProcessor:
         
         return sentence
     
-    def _determine_sentence_type(self, sentence: str) -> str:
-        """Визначення типу речення"""
-        sentence_lower = sentence.lower()
-        
-        # Перевіряємо питання
-        for pattern in self.sentence_patterns['question']:
-            if re.search(pattern, sentence_lower):
-                return 'question'
-        
-        # Перевіряємо оклик
-        for pattern in self.sentence_patterns['exclamation']:
-            if re.search(pattern, sentence_lower):
-                return 'exclamation'
-        
-        # Перевіряємо команду
-        for pattern in self.sentence_patterns['command']:
-            if re.search(pattern, sentence_lower):
-                return 'command'
-        
-        return 'statement'
-    
-    def _add_commas(self, sentence: str) -> str:
-        """Додавання ком у речення"""
-        words = sentence.split()
-        if len(words) <= 1:
-            return sentence
-        
-        result_words = []
-        
-        for i, word in enumerate(words):
-            current_word = word.lower().strip('.,!?;:')
-            
-            # Кома після певних слів
-            if current_word in self.comma_after_words:
-                if not word.endswith(','):
-                    result_words.append(word + ',')
-                else:
-                    result_words.append(word)
-            
-            # Кома перед сполучниками (але не перед "що" в питаннях)
-            elif current_word in self.comma_before_conjunctions and i > 0:
-                # Не додаємо кому перед "що" якщо це питання
-                if current_word == 'що' and self._is_question_sentence(sentence):
-                    result_words.append(word)
-                else:
-                    if not result_words[-1].endswith(','):
-                        result_words[-1] = result_words[-1] + ','
-                    result_words.append(word)
-            
-            # Кома після вступних фраз
-            elif self._is_introductory_phrase(words, i):
-                if not word.endswith(','):
-                    result_words.append(word + ',')
-                else:
-                    result_words.append(word)
-            
-            else:
-                result_words.append(word)
-        
-        return ' '.join(result_words)
-    
-    def _is_question_sentence(self, sentence: str) -> bool:
-        """Перевірка чи є речення питанням"""
-        sentence_lower = sentence.lower()
-        
-        # Перевіряємо чи починається з питального слова
-        question_starters = ['що', 'хто', 'де', 'коли', 'чому', 'як', 'чи', 'куди', 'звідки', 'скільки', 'який', 'яка', 'яке', 'які']
-        first_word = sentence_lower.split()[0] if sentence_lower.split() else ""
-        
-        if first_word in question_starters:
-            return True
-        
-        # Перевіряємо чи містить "чи"
-        if 'чи' in sentence_lower:
-            return True
-        
-        return False
-    
-    def _is_introductory_phrase(self, words: List[str], index: int) -> bool:
-        """Перевірка чи є слово частиною вступної фрази"""
-        if index == 0:
-            return False
-        
-        # Перевіряємо фрази з 2-3 слів
-        phrases = [
-            'чесно кажучи', 'правду кажучи', 'взагалі то', 'власне кажучи',
-            'між іншим', 'до речі', 'до слова', 'до того ж', 'крім того',
-            'більше того', 'тим більше', 'тим паче', 'на жаль', 'на щастя',
-            'на диво', 'на превеликий жаль', 'коротше кажучи', 'одним словом',
-            'в кінці кінців', 'в підсумку', 'виходить', 'отже', 'от і все',
-            'ось і все', 'незважаючи на те що', 'попри те що', 'замість того щоб'
-        ]
-        
-        # Перевіряємо фрази назад від поточного слова
-        for phrase in phrases:
-            phrase_words = phrase.split()
-            if len(phrase_words) <= index + 1:
-                # Перевіряємо чи починається фраза з поточного слова
-                if index + len(phrase_words) <= len(words):
-                    current_phrase = ' '.join(words[index:index + len(phrase_words)]).lower()
-                    if current_phrase == phrase:
-                        return True
-        
-        # Перевіряємо окремі вступні слова
-        introductory_words = {
-            'чесно', 'правду', 'взагалі', 'власне', 'між', 'до', 'крім', 'більше',
-            'тим', 'на', 'коротше', 'одним', 'словом', 'в', 'кінці', 'підсумку',
-            'виходить', 'отже', 'от', 'ось', 'незважаючи', 'попри', 'замість'
-        }
-        
-        current_word = words[index].lower().strip('.,!?;:')
-        return current_word in introductory_words
-    
     def _add_ending_punctuation(self, sentence: str, sentence_type: str) -> str:
         """Додавання кінцевого знаку розділового знаку"""
         # Видаляємо існуючі кінцеві знаки
-        sentence = re.sub(r'[.!?]+$', '', sentence)
+        sentence = _TRAILING_END_RE.sub('', sentence)
         
         if sentence_type == 'question':
             return sentence + '?'
@@ -294,19 +364,131 @@ class UkrainianPunctuationProcessor:
     def _final_cleanup(self, text: str) -> str:
         """Фінальна очистка тексту"""
         # Виправляємо зайві пробіли перед знаками
-        text = re.sub(r'\s+([.,!?:;])', r'\1', text)
+        text = _SPACE_BEFORE_MARK_RE.sub(r'\1', text)
         
         # Виправляємо подвійні знаки
-        text = re.sub(r'[.,!?:;]+', lambda m: m.group()[0], text)
+        text = _MARK_RUN_RE.sub(lambda m: m.group()[0], text)
         
         # Виправляємо пробіли після ком
-        text = re.sub(r',\s*', ', ', text)
+        text = _COMMA_SPACING_RE.sub(', ', text)
         
         # Видаляємо зайві пробіли
-        text = re.sub(r'\s+', ' ', text)
+        text = _WHITESPACE_RE.sub(' ', text)
         
         return text.strip()
 
+# Спільний обробник, щоб не створювати таблиці на кожен виклик
+_default_processor = UkrainianPunctuationProcessor()
+
+def use_punctuation_model(model):
+    """Статистична модель для спільного обробника (None - лише правила)"""
+    _default_processor.model = model
+
+_WARMUP_TEXT = "привіт це пробний текст я думаю що все буде добре але треба перевірити"
+
+def warm_up_punctuation():
+    """Сторінки моделі в пам'яті і пробна обробка тексту до першого транскрипту"""
+    if _default_processor.model is not None:
+        contexts = _default_processor.model.warm_up()
+        logger.info(f"Модель розділових знаків прочитано: {contexts} контекстів")
+    _default_processor.process_text(_WARMUP_TEXT)
+
+_LEADING_MARKS_RE = re.compile(r'^[\s.,!?:;]+')
+
+class IncrementalPunctuator:
+    """
+    Потокова розстановка розділових знаків для фрагментів транскрипту.
+
+    Фрагменти (цілі слова, наприклад результати окремих сегментів) подаються
+    по черзі. Завершені речення обробляються одразу і більше не
+    переглядаються, у стані лишається тільки незакінчене речення.
+    
+    Розпізнавачі не ставлять крапок, тож речення завершуються ще й так:
+    - виклик flush() на паузі (наприклад, на межі сегментів запису);
+    - незакінчене речення довше за max_words слів закінчується там, де
+      модель розділових знаків бачить кінець речення, або (без моделі чи
+      рішення моделі) цілком.
+    Тож кожен фрагмент обробляється за час, пропорційний його довжині
+    і max_words, а не довжині всього транскрипту. max_words=None - без
+    обмеження (результат збігається з process_text для всього тексту).
+    """
+    
+    def __init__(self, processor: Optional[UkrainianPunctuationProcessor] = None,
+                 max_words: Optional[int] = None):
+        self.processor = processor or _default_processor
+        self.max_words = max_words
+        self._tail: List[str] = []
+        self._tail_words = 0
+        self._emitted = False
+    
+    @property
+    def pending_text(self) -> str:
+        """Незакінчене речення, що чекає на продовження"""
+        return ' '.join(self._tail)
+    
+    def feed(self, fragment: str) -> List[str]:
+        """
+        Додавання фрагмента транскрипту
+        
+        Returns:
+            List[str]: Речення, завершені цим фрагментом
+        """
+        if not fragment or not fragment.strip():
+            return []
+        
+        # Після очистки всі кінцеві знаки зведені до крапки
+        parts = self.processor._clean_text(fragment).split('.')
+        
+        finished = []
+        for part in parts[:-1]:
+            self._append(part)
+            finished.extend(self.flush())
+        self._append(parts[-1])
+        if self.max_words and self._tail_words > self.max_words:
+            finished.extend(self._split_long_tail())
+        return finished
+    
+    def flush(self) -> List[str]:
+        """
+        Завершення незакінченого речення (кінець транскрипту або довга пауза)
+        
+        Returns:
+            List[str]: Оброблене речення або порожній список
+        """
+        sentence = ' '.join(self._tail)
+        self._tail = []
+        self._tail_words = 0
+        if not sentence:
+            return []
+        
+        sentence = self.processor._final_cleanup(self.processor._process_sentence(sentence))
+        if self._emitted:
+            # Знаки на початку речення зливаються з кінцем попереднього
+            sentence = _LEADING_MARKS_RE.sub('', sentence)
+        self._emitted = True
+        return [sentence] if sentence else []
+    
+    def _split_long_tail(self) -> List[str]:
+        """Завершення задовгого речення на останньому кінці речення за моделлю або цілком"""
+        words = ' '.join(self._tail).split()
+        model = self.processor.model
+        if model is not None:
+            gaps = model.decide(words)
+            ends = [i for i, decision in enumerate(gaps) if decision == 'end']
+            if ends and len(words) - ends[-1] - 1 <= self.max_words:
+                rest = words[ends[-1] + 1:]
+                self._tail = words[:ends[-1] + 1]
+                finished = self.flush()
+                self._tail, self._tail_words = rest, len(rest)
+                return finished
+        return self.flush()
+    
+    def _append(self, part: str):
+        part = part.strip()
+        if part:
+            self._tail.append(part)
+            self._tail_words += part.count(' ') + 1
+
 # Функція для зручного використання
 def improve_ukrainian_text(text: str) -> str:
     """
@@ -318,5 +500,4 @@ def improve_ukrainian_text(text: str) -> str:
     Returns:
         str: Текст з правильно розставленими розділовими знаками
     """
-    processor = UkrainianPunctuationProcessor()
-    return processor.process_text(text) 
\ No newline at end of file
+    return _default_processor.process_text(text) 
\ No newline at end of file
@@ -0,0 +1,246 @@
+"""
+Воркери розпізнавання для режиму черги (TRANSCRIBE_MODE=queue).
+
+Бот лише приймає повідомлення, надсилає заглушку і додає завдання в
+JobQueue. Воркери в окремих процесах забирають завдання, розпізнають
+файл і редагують заглушку через Bot API, тому розпізнавання
+масштабується незалежно від процесу бота.
+
+    python3 worker.py --processes 4
+"""
+import argparse
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from typing import Optional
+
+from dotenv import load_dotenv
+from telegram import Bot
+
+from job_queue import Job, JobQueue
+from metrics import MetricsServer
+from transcript_cache import TranscriptCache
+from delivery import (NOT_RECOGNIZED_TEXT, RESULT_HEADER, UNAVAILABLE_TEXT, ChatRateLimiter,
+                      ProgressiveMessage)
+from transcriber import MediaConversionError, RecognitionUnavailableError, Transcriber
+
+logger = logging.getLogger(__name__)
+
+class TranscriptionWorker:
+    """Цикл одного воркера: взяти завдання, розпізнати, відредагувати заглушку"""
+
+    def __init__(self, name: str, bot: Bot, transcriber: Transcriber, cache: TranscriptCache,
+                 queue: JobQueue, limiter: ChatRateLimiter, max_messages: int = 3,
+                 poll_interval: float = 0.5, shutdown_grace: float = 30.0):
+        self.name = name
+        self.bot = bot
+        self.transcriber = transcriber
+        self.cache = cache
+        self.queue = queue
+        self.limiter = limiter
+        self.max_messages = max_messages
+        self.poll_interval = poll_interval
+        self.shutdown_grace = shutdown_grace
+
+    async def run(self, stop: asyncio.Event):
+        """Обробка завдань до сигналу зупинки (поточне отримує shutdown_grace секунд на завершення)"""
+        logger.info(f"Воркер {self.name} запущено")
+        while not stop.is_set():
+            job = self.queue.claim(self.name)
+            for exhausted in self.queue.exhausted():
+                await self._notify_failed(exhausted, None)
+            if job is None:
+                try:
+                    await asyncio.wait_for(stop.wait(), self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            task = asyncio.ensure_future(self.process(job))
+            heartbeat = asyncio.ensure_future(self._heartbeat(job, task))
+            stopped = asyncio.ensure_future(stop.wait())
+            await asyncio.wait({task, stopped}, return_when=asyncio.FIRST_COMPLETED)
+            stopped.cancel()
+            if not task.done():
+                done, _ = await asyncio.wait({task}, timeout=self.shutdown_grace)
+                if not done:
+                    task.cancel()
+                    await asyncio.wait({task})
+            heartbeat.cancel()
+        logger.info(f"Воркер {self.name} зупинено")
+
+    async def _heartbeat(self, job: Job, task: asyncio.Future):
+        """Продовження оренди, поки завдання в роботі; втрачене завдання скасовується"""
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            if not self.queue.renew(job.id, self.name):
+                logger.warning(f"Воркер {self.name}: оренду завдання {job.id} втрачено, зупиняю його")
+                task.cancel()
+                return
+
+    async def _notify_failed(self, job: Job, error: Optional[Exception]):
+        """Остаточна помилка в заглушці завдання"""
+        payload = job.payload
+        # Недоступність бекендів тимчасова, тож і повідомлення про неї інше
+        if isinstance(error, RecognitionUnavailableError):
+            error_text = UNAVAILABLE_TEXT
+        else:
+            error_text = f"❌ {payload['error_text']}"
+        try:
+            await self.bot.edit_message_text(error_text, chat_id=payload['chat_id'],
+                                             message_id=payload['message_id'])
+        except Exception as edit_error:
+            logger.error(f"Не вдалося повідомити про помилку завдання {job.id}: {edit_error}")
+
+    async def process(self, job: Job):
+        """Виконання одного завдання"""
+        payload = job.payload
+        chat_id, message_id = payload['chat_id'], payload['message_id']
+        logger.info(f"Воркер {self.name}: завдання {job.id} (спроба {job.attempts})")
+        delivery = ProgressiveMessage(
+            self.bot, chat_id, message_id, self.limiter,
+            header=RESULT_HEADER.format(user_name=payload['user_name']),
+            max_messages=self.max_messages
+        )
+        try:
+            try:
+                text = await self.cache.get_or_compute(
+                    payload['file_unique_id'],
+                    lambda: self.transcriber.transcribe(self.bot, payload['file_id'],
+                                                        video=payload.get('video', False),
+                                                        on_progress=delivery.update,
+                                                        duration=payload.get('duration'))
+                )
+            except MediaConversionError:
+                await delivery.show(f"❌ {payload['convert_error_text']}")
+                self.queue.complete(job.id, self.name)
+                return
+
+            if text:
+                await delivery.finish(text)
+            else:
+                await delivery.show(NOT_RECOGNIZED_TEXT)
+            self.queue.complete(job.id, self.name)
+
+        except asyncio.CancelledError:
+            # Воркер зупиняється: завдання одразу дістанеться іншому воркеру, без очікування оренди
+            delivery.cancel()
+            logger.warning(f"Воркер {self.name}: завдання {job.id} перервано зупинкою, повертаю в чергу")
+            self.queue.release(job.id, self.name)
+            raise
+        except Exception as e:
+            delivery.cancel()
+            logger.error(f"{payload['error_text']} (завдання {job.id}): {e}")
+            if self.queue.fail(job.id, self.name, str(e)):
+                await self._notify_failed(job, e)
+
+async def run_worker(index: int):
+    """Один процес-воркер зі своїм конвеєром, кешем і з'єднанням з Bot API"""
+    bot_token = os.getenv('BOT_TOKEN')
+    if not bot_token:
+        raise ValueError("BOT_TOKEN не знайдено в .env файлі")
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    # Кожен процес-воркер має власний реєстр метрик, тож і власний порт: база + номер воркера
+    ready = threading.Event()
+    metrics_server: Optional[MetricsServer] = None
+    metrics_port = int(os.getenv('WORKER_METRICS_PORT', '9101'))
+    if metrics_port:
+        try:
+            metrics_server = MetricsServer(
+                host=os.getenv('METRICS_HOST', '127.0.0.1'), port=metrics_port + index,
+                ready=ready.is_set
+            ).start()
+            logger.info(f"Метрики воркера {index}: {metrics_server.address}")
+        except OSError as e:
+            logger.error(f"Не вдалося запустити сервер метрик воркера на порту {metrics_port + index}: {e}")
+
+    transcriber = Transcriber.from_env()
+    if not transcriber.recognizer:
+        raise RuntimeError("Розпізнавач не ініціалізований")
+    if os.getenv('WARMUP_MODE', 'background') != 'off':
+        # Воркер бере завдання з черги вже з прогрітим конвеєром
+        started = time.perf_counter()
+        await transcriber.warm_up(os.getenv('TELEGRAM_FILE_URL', 'https://api.telegram.org/file/bot'))
+        logger.info(f"Конвеєр прогріто за {time.perf_counter() - started:.2f} с")
+    cache = TranscriptCache(
+        db_path=os.getenv('CACHE_DB_PATH', 'transcripts.db'),
+        max_entries=int(os.getenv('CACHE_MAX_ENTRIES', '1000')),
+        ttl=float(os.getenv('CACHE_TTL_SECONDS', str(7 * 24 * 3600)))
+    )
+    queue = JobQueue(
+        db_path=os.getenv('JOB_QUEUE_PATH', 'jobs.db'),
+        lease_seconds=float(os.getenv('JOB_LEASE_SECONDS', '600')),
+        max_attempts=int(os.getenv('JOB_MAX_ATTEMPTS', '3'))
+    )
+    queue.purge()
+
+    try:
+        async with Bot(bot_token,
+                       base_url=os.getenv('TELEGRAM_API_URL', 'https://api.telegram.org/bot'),
+                       base_file_url=os.getenv('TELEGRAM_FILE_URL', 'https://api.telegram.org/file/bot')) as bot:
+            # Бюджет редагувань рахується в межах процесу
+            worker = TranscriptionWorker(
+                f"{socket.gethostname()}-{os.getpid()}-{index}", bot, transcriber, cache, queue,
+                limiter=ChatRateLimiter(float(os.getenv('DELIVERY_MIN_INTERVAL', '1.0'))),
+                max_messages=int(os.getenv('DELIVERY_MAX_MESSAGES', '3')),
+                poll_interval=float(os.getenv('WORKER_POLL_INTERVAL', '0.5')),
+                shutdown_grace=float(os.getenv('SHUTDOWN_GRACE_SECONDS', '30'))
+            )
+            ready.set()
+            await worker.run(stop)
+    finally:
+        ready.clear()
+        if metrics_server:
+            metrics_server.stop()
+        await transcriber.close()
+        cache.close()
+        queue.close()
+
+def _worker_main(index: int):
+    logging.basicConfig(
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        level=logging.INFO
+    )
+    load_dotenv()
+    asyncio.run(run_worker(index))
+
+def main():
+    parser = argparse.ArgumentParser(description="Воркери розпізнавання для черги завдань VoiceBot")
+    parser.add_argument('--processes', type=int,
+                        default=int(os.getenv('WORKER_PROCESSES', str(os.cpu_count() or 1))),
+                        help="Кількість процесів-воркерів")
+    args = parser.parse_args()
+
+    processes = [
+        multiprocessing.Process(target=_worker_main, args=(index,), name=f'worker-{index}')
+        for index in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+
+    def forward(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, forward)
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        # SIGINT уже отримали всі процеси групи, чекаємо на завершення поточних завдань
+        for process in processes:
+            process.join()
+
+if __name__ == '__main__':
+    load_dotenv()
+    main()